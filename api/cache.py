@@ -0,0 +1,172 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from . import database
+
+CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("API_CACHE_TTL_SECONDS", "3600"))
+# How often the warehouse version stamp is re-read from Postgres
+VERSION_CHECK_SECONDS = float(os.getenv("API_CACHE_VERSION_CHECK_SECONDS", "5"))
+
+# Only report-style endpoints are cached; streaming exports are not
+CACHEABLE_PREFIXES = ("/api/reports/", "/api/channels/", "/api/search/")
+
+
+class CacheEntry:
+    __slots__ = ("body", "media_type", "etag", "expires_at")
+
+    def __init__(self, body: bytes, media_type: str, etag: str, expires_at: float):
+        self.body = body
+        self.media_type = media_type
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of serialized endpoint responses.
+
+    Every entry belongs to one warehouse version; when the version stamp that
+    the pipeline bumps after `dbt run` changes, the whole cache is dropped.
+    """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.version: Optional[int] = None
+        self.version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, body: bytes, media_type: str, etag: str, version: Optional[int]) -> None:
+        """Stores a response computed at `version`; dropped if the warehouse has moved on since."""
+        if version != self.version:
+            return
+        self.entries[key] = CacheEntry(body, media_type, etag, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def set_version(self, version: int) -> None:
+        """Records the current warehouse version, clearing entries from older ones."""
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "warehouse_version": self.version,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def read_warehouse_version() -> int:
+    """Reads the version stamp written by the pipeline (0 if it has never run)."""
+    try:
+        with database.engine.connect() as conn:
+            version = conn.execute(text("SELECT version FROM raw.warehouse_version")).scalar()
+        return version or 0
+    except SQLAlchemyError:
+        return 0
+
+
+async def refresh_version() -> None:
+    now = time.monotonic()
+    if now - response_cache.version_checked_at >= VERSION_CHECK_SECONDS:
+        response_cache.version_checked_at = now
+        response_cache.set_version(await run_in_threadpool(read_warehouse_version))
+
+
+def cache_key(request: Request) -> str:
+    """Endpoint path plus its URL-encoded query parameters in a canonical order."""
+    return f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+
+def make_etag(version: Optional[int], body: bytes) -> str:
+    return f'"v{version}-{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cached_response(request: Request, body: bytes, media_type: str, etag: str,
+                     status: str) -> Response:
+    headers = {"ETag": etag, "X-Cache": status}
+    if etag_matches(request, etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+async def cache_middleware(request: Request, call_next) -> Response:
+    """
+    Serves GET report endpoints from the in-process cache, adds ETag headers
+    and answers matching If-None-Match requests with 304 Not Modified.
+    """
+    if (not CACHE_ENABLED or request.method != "GET"
+            or not request.url.path.startswith(CACHEABLE_PREFIXES)):
+        return await call_next(request)
+
+    await refresh_version()
+    # The version the response is computed at; a bump while it is computed must not relabel it
+    version = response_cache.version
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is not None:
+        return _cached_response(request, entry.body, entry.media_type, entry.etag, "HIT")
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    media_type = response.media_type or response.headers.get("content-type", "application/json")
+    etag = make_etag(version, body)
+    response_cache.put(key, body, media_type, etag, version)
+    return _cached_response(request, body, media_type, etag, "MISS")
+
+
+def cache_stats() -> Dict[str, Optional[int]]:
+    return response_cache.stats()
+
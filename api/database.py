@@ -1,8 +1,14 @@
 import os
+from typing import Any, Dict, List, Optional, Union
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
+from .metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+
 load_dotenv()
 
 # Construct DB URL
@@ -14,17 +20,79 @@ DB_NAME = os.getenv("POSTGRES_DB", "medical_warehouse")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-# Create Engine
-engine = create_engine(DATABASE_URL)
+# "sync" (psycopg2, handlers wait in the threadpool) or "async" (asyncpg)
+DB_MODE = os.getenv("API_DB_MODE", "sync").lower()
+
+# Pool tuning
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# asyncpg keeps this many server-side prepared statements per connection
+PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "256"))
 
+POOL_OPTIONS: Dict[str, Any] = {
+    "pool_size": POOL_SIZE,
+    "max_overflow": POOL_MAX_OVERFLOW,
+    "pool_timeout": POOL_TIMEOUT,
+    "pool_recycle": POOL_RECYCLE,
+    "pool_pre_ping": POOL_PRE_PING,
+}
+
+# Create Engine
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args={"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"},
+    **POOL_OPTIONS
+)
+instrument_engine(engine, "sync")
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+if DB_MODE == "async":
+    ASYNC_DATABASE_URL = (
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        f"?prepared_statement_cache_size={PREPARED_STATEMENT_CACHE_SIZE}"
+    )
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        connect_args={"server_settings": {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}},
+        **POOL_OPTIONS
+    )
+    instrument_engine(async_engine.sync_engine, "async")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+DBSession = Union[Session, AsyncSession]
+
+
 # Dependency to get DB session per request
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+if DB_MODE == "async":
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def fetch_all(db: DBSession, query, params: Optional[Dict[str, Any]] = None) -> List[Row]:
+    """
+    Runs a query and returns all rows, awaiting asyncpg directly in async mode
+    and running the blocking psycopg2 call in the threadpool in sync mode.
+    """
+    if isinstance(db, AsyncSession):
+        result = await db.execute(query, params or {})
+        return result.fetchall()
+    return await run_in_threadpool(lambda: db.execute(query, params or {}).fetchall())
@@ -0,0 +1,132 @@
+import os
+import csv
+import io
+import json
+import zlib
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence
+
+import anyio
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Row
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from . import database
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("API_EXPORT_BATCH_SIZE", "5000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("API_EXPORT_GZIP_LEVEL", "6"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _sync_partitions(query, params: Dict[str, Any]) -> Iterator[Sequence[Row]]:
+    # A dedicated connection: the request's session is closed before the body is sent
+    with database.engine.connect() as conn:
+        # stream_results opens a named cursor; yield_per sets how many rows each FETCH pulls
+        result = conn.execution_options(stream_results=True).execute(query, params)
+        yield from result.yield_per(EXPORT_BATCH_SIZE).partitions()
+
+
+async def stream_partitions(query, params: Dict[str, Any]) -> AsyncIterator[Sequence[Row]]:
+    """
+    Yields result rows in batches of EXPORT_BATCH_SIZE from a server-side cursor
+    (a psycopg2 named cursor or an asyncpg cursor), so memory use does not grow
+    with the size of the result.
+    """
+    if database.async_engine is not None:
+        async with database.async_engine.connect() as conn:
+            result = await conn.stream(query, params)
+            async for partition in result.yield_per(EXPORT_BATCH_SIZE).partitions():
+                yield partition
+    else:
+        partitions = _sync_partitions(query, params)
+        try:
+            async for partition in iterate_in_threadpool(partitions):
+                yield partition
+        finally:
+            # Closing the generator closes the named cursor and returns the connection
+            # to the pool; shielded because a disconnect arrives as a cancellation
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(partitions.close)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def format_ndjson(columns: List[str], rows: Sequence[Row]) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def format_csv(rows: Sequence[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # Arrays (e.g. detected_classes) become one ';'-separated field
+        writer.writerow([";".join(value) if isinstance(value, list) else value for value in row])
+    return buffer.getvalue()
+
+
+async def iter_export(query, params: Dict[str, Any], columns: List[str], fmt: str,
+                      compress: bool) -> AsyncIterator[bytes]:
+    """Encodes streamed rows as NDJSON or CSV (with a header row), optionally gzip-compressed."""
+    gzip = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    def encode(chunk: str) -> bytes:
+        data = chunk.encode()
+        return gzip.compress(data) if gzip else data
+
+    if fmt == "csv":
+        yield encode(format_csv([columns]))
+    async with aclosing(stream_partitions(query, params)) as partitions:
+        async for rows in partitions:
+            chunk = encode(format_csv(rows) if fmt == "csv" else format_ndjson(columns, rows))
+            if chunk:
+                yield chunk
+    if gzip:
+        yield gzip.flush()
+
+
+class ExportResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body generator once the response ends,
+    including when the client disconnects mid-download, so the database cursor
+    is released right away instead of whenever the generator is collected.
+    """
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def accepts_gzip(request: Request) -> bool:
+    encodings = request.headers.get("accept-encoding", "")
+    return any(part.split(";")[0].strip() == "gzip" for part in encodings.split(","))
+
+
+def export_response(request: Request, query, params: Dict[str, Any], columns: List[str],
+                    fmt: str, filename: str) -> ExportResponse:
+    """
+    Streams a query result as a file download, gzip-encoded when the client
+    sends Accept-Encoding: gzip.
+    """
+    compress = accepts_gzip(request)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return ExportResponse(
+        iter_export(query, params, columns, fmt, compress),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers
+    )
@@ -1,8 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from sqlalchemy import text
-from typing import List
-from . import database, schemas
+from typing import List, Literal, Optional, Tuple
+from datetime import date, timedelta
+import base64
+import json
+from fastapi.responses import PlainTextResponse
+from . import database, schemas, cache, metrics, export, replica
 
 app = FastAPI(
     title="Kara Solutions Medical Data API",
@@ -10,114 +13,313 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Cache report responses in-process until the warehouse version changes
+app.middleware("http")(cache.cache_middleware)
+# Registered last so it is outermost and also times cached responses
+app.middleware("http")(metrics.metrics_middleware)
+
+def to_date_key(value: date) -> int:
+    """Converts a date to the YYYYMMDD integer key used by dim_dates."""
+    return int(value.strftime("%Y%m%d"))
+
+
 # Endpoint 1: Top Products (Keywords)
 @app.get("/api/reports/top-products", response_model=List[schemas.TopProduct])
-def get_top_products(limit: int = 10, db: Session = Depends(database.get_db)):
+async def get_top_products(
+    limit: int = 10,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: database.DBSession = Depends(database.get_db)
+):
     """
     Returns the most frequently mentioned words, excluding numbers and common generic terms.
+    Optionally restricted to one channel and/or a date range (inclusive).
     """
-    query = text("""
-        SELECT word, ndoc
-        FROM ts_stat('SELECT to_tsvector(''english'', message_text) FROM fct_messages')
-        WHERE length(word) > 2          -- Remove short words like "2", "6"
-        AND word ~ '^[a-z]+$'           -- Keep only letters (removes '500', '100mg')
-        AND word NOT IN (               -- Remove generic Telegram spam words
-            'telegram', 'channel', 'contact', 'price', 'call', 'address', 
-            'phone', 'birr', 'etb', 'available', 'delivery'
-        )
-        ORDER BY ndoc DESC
+    # Counts are precomputed per day and channel by the agg_keyword_daily mart
+    filters = []
+    params = {"limit": limit}
+    if channel:
+        filters.append("k.channel_key = (SELECT channel_key FROM dim_channels WHERE channel_name = :channel)")
+        params["channel"] = channel
+    if start:
+        filters.append("k.date_key >= :start_key")
+        params["start_key"] = to_date_key(start)
+    if end:
+        filters.append("k.date_key <= :end_key")
+        params["end_key"] = to_date_key(end)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    query = text(f"""
+        SELECT k.word, SUM(k.message_count) AS frequency
+        FROM agg_keyword_daily k
+        {where}
+        GROUP BY k.word
+        ORDER BY frequency DESC, k.word
         LIMIT :limit
     """)
     
-    result = db.execute(query, {"limit": limit}).fetchall()
+    result = await replica.fetch_all(db, query, params)
     
-    return [{"word": row.word, "frequency": row.ndoc} for row in result]
+    return [{"word": row.word, "frequency": row.frequency} for row in result]
 
 
 # Endpoint 2: Channel Activity
 @app.get("/api/channels/{channel_name}/activity",
          response_model=List[schemas.ChannelActivity])
-def get_channel_activity(channel_name: str, db: Session = Depends(database.get_db)):
+async def get_channel_activity(
+    channel_name: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: Literal["day", "week", "month"] = "day",
+    db: database.DBSession = Depends(database.get_db)
+):
     """
-    Returns daily posting volume and view counts for a specific channel.
+    Returns posting volume and engagement for a specific channel per day, week or month,
+    optionally restricted to a date range (inclusive). Weeks start on Monday.
     """
-    # Join Fact Messages with Date Dimension
-    query = text("""
-        SELECT 
-            d.full_date as date,
-            COUNT(m.message_id) as post_count,
-            COALESCE(SUM(m.view_count), 0) as total_views
-        FROM fct_messages m
-        JOIN dim_channels c ON m.channel_key = c.channel_key
-        JOIN dim_dates d ON m.date_key = d.date_key
-        WHERE c.channel_name = :channel_name
-        GROUP BY d.full_date
-        ORDER BY d.full_date DESC
+    # Daily totals are precomputed by the agg_channel_daily mart; weeks and months roll them up
+    filters = ["a.channel_key = (SELECT channel_key FROM dim_channels WHERE channel_name = :channel_name)"]
+    params = {"channel_name": channel_name, "granularity": granularity}
+    if start:
+        filters.append("a.date_key >= :start_key")
+        params["start_key"] = to_date_key(start)
+    if end:
+        filters.append("a.date_key <= :end_key")
+        params["end_key"] = to_date_key(end)
+
+    query = text(f"""
+        SELECT
+            date_trunc(:granularity, a.full_date)::date AS date,
+            SUM(a.post_count) AS post_count,
+            SUM(a.total_views) AS total_views,
+            ROUND(SUM(a.total_views)::numeric / NULLIF(SUM(a.post_count), 0), 2)::float8 AS avg_views,
+            SUM(a.total_forwards) AS total_forwards,
+            SUM(a.media_count) AS media_count
+        FROM agg_channel_daily a
+        WHERE {' AND '.join(filters)}
+        GROUP BY 1
+        ORDER BY 1 DESC
     """)
     
-    result = db.execute(query, {"channel_name": channel_name}).fetchall()
+    result = await replica.fetch_all(db, query, params)
     
     if not result:
         raise HTTPException(status_code=404, detail="Channel not found or no data available")
         
-    return [{"date": row.date, "post_count": row.post_count, "total_views": row.total_views} for row in result]
+    return [
+        {
+            "date": row.date,
+            "post_count": row.post_count,
+            "total_views": row.total_views,
+            "avg_views": row.avg_views or 0.0,
+            "total_forwards": row.total_forwards,
+            "media_count": row.media_count,
+        }
+        for row in result
+    ]
+
+# Endpoint 2b: View Growth
+@app.get("/api/channels/{channel_name}/growth", response_model=List[schemas.GrowthPoint])
+async def get_view_growth(
+    channel_name: str,
+    message_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: Literal["hour", "day", "week"] = "day",
+    db: database.DBSession = Depends(database.get_db)
+):
+    """
+    Returns the view/forward growth curve of a channel, or of one of its messages
+    with message_id, as running totals per hour, day or week. Only scrapes in which
+    the counts changed are stored, so buckets without changes are omitted.
+    """
+    # fct_message_engagement holds one row per captured change; totals before `start`
+    # are still summed so the curve starts at the right level
+    filters = ["e.channel_key = (SELECT channel_key FROM dim_channels WHERE channel_name = :channel_name)"]
+    params = {"channel_name": channel_name, "interval": interval}
+    if message_id is not None:
+        filters.append("e.message_id = :message_id")
+        params["message_id"] = message_id
+    if end:
+        filters.append("e.captured_at < :end_exclusive")
+        params["end_exclusive"] = end + timedelta(days=1)
+    bucket_filter = ""
+    if start:
+        bucket_filter = "WHERE bucket >= :start"
+        params["start"] = start
+
+    query = text(f"""
+        WITH buckets AS (
+            SELECT
+                date_trunc(:interval, e.captured_at) AS bucket,
+                SUM(e.views_gained) AS views_gained,
+                SUM(e.forwards_gained) AS forwards_gained
+            FROM fct_message_engagement e
+            WHERE {' AND '.join(filters)}
+            GROUP BY 1
+        ),
+        curve AS (
+            SELECT
+                bucket, views_gained, forwards_gained,
+                SUM(views_gained) OVER (ORDER BY bucket) AS views,
+                SUM(forwards_gained) OVER (ORDER BY bucket) AS forwards
+            FROM buckets
+        )
+        SELECT * FROM curve
+        {bucket_filter}
+        ORDER BY bucket
+    """)
+
+    result = await replica.fetch_all(db, query, params)
+
+    if not result:
+        raise HTTPException(status_code=404, detail="No engagement history for this channel or message")
+
+    return [
+        {
+            "time": row.bucket,
+            "views": row.views,
+            "forwards": row.forwards,
+            "views_gained": row.views_gained,
+            "forwards_gained": row.forwards_gained,
+        }
+        for row in result
+    ]
+
+def encode_cursor(score: float, channel_key: str, message_id: int) -> str:
+    """
+    Packs the sort key of the last row on a page into an opaque cursor. Message
+    ids are only unique within a channel, so the channel is part of the key.
+    """
+    payload = json.dumps({"score": score, "channel": channel_key, "id": message_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(payload["score"]), str(payload["channel"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 # --- Endpoint 3: Message Search ---
-@app.get("/api/search/messages", response_model=List[schemas.MessageResponse])
-def search_messages(
+@app.get("/api/search/messages", response_model=schemas.MessageSearchPage)
+async def search_messages(
     query: str = Query(..., min_length=3), 
-    limit: int = 20, 
-    db: Session = Depends(database.get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    fuzzy: bool = False,
+    db: database.DBSession = Depends(database.get_db)
 ):
     """
     Full-text search for specific medical products (e.g., 'Paracetamol').
+
+    Matches the stored search_vector (GIN) or a substring of the text (pg_trgm GIN);
+    with fuzzy=true also near-miss spellings of the term. Results are ranked by
+    text relevance weighted by log views, and paged with the returned next_cursor.
     """
-    sql_query = text("""
-        SELECT 
-            m.message_id as id,
-            c.channel_name,
-            d.full_date as date,
-            m.message_text as text,
-            m.view_count as views
-        FROM fct_messages m
-        JOIN dim_channels c ON m.channel_key = c.channel_key
-        JOIN dim_dates d ON m.date_key = d.date_key
-        WHERE m.message_text ILIKE :search_term
-        ORDER BY m.view_count DESC
+    filters = []
+    params = {"query": query, "search_term": f"%{query}%", "limit": limit + 1}
+    if fuzzy:
+        match = "(m.search_vector @@ q.tsq OR m.message_text ILIKE :search_term OR :query <% m.message_text)"
+    else:
+        match = "(m.search_vector @@ q.tsq OR m.message_text ILIKE :search_term)"
+    if channel:
+        filters.append("c.channel_name = :channel")
+        params["channel"] = channel
+    if start:
+        filters.append("m.date_key >= :start_key")
+        params["start_key"] = to_date_key(start)
+    if end:
+        filters.append("m.date_key <= :end_key")
+        params["end_key"] = to_date_key(end)
+
+    page_filter = ""
+    if cursor:
+        params["cursor_score"], params["cursor_channel"], params["cursor_id"] = decode_cursor(cursor)
+        page_filter = "WHERE (score, channel_key, id) < (:cursor_score, :cursor_channel, :cursor_id)"
+
+    sql_query = text(f"""
+        WITH q AS (
+            SELECT websearch_to_tsquery('english', :query) AS tsq
+        ),
+        ranked AS (
+            SELECT 
+                m.message_id as id,
+                m.channel_key,
+                c.channel_name,
+                d.full_date as date,
+                m.message_text as text,
+                m.view_count as views,
+                (ts_rank(m.search_vector, q.tsq) + word_similarity(:query, m.message_text))::float8
+                    * ln(2 + m.view_count) as score
+            FROM fct_messages m
+            CROSS JOIN q
+            JOIN dim_channels c ON m.channel_key = c.channel_key
+            JOIN dim_dates d ON m.date_key = d.date_key
+            WHERE {match}
+            {''.join(f' AND {f}' for f in filters)}
+        )
+        SELECT * FROM ranked
+        {page_filter}
+        ORDER BY score DESC, channel_key DESC, id DESC
         LIMIT :limit
     """)
     
-    result = db.execute(sql_query, {"search_term": f"%{query}%", "limit": limit}).fetchall()
+    result = await database.fetch_all(db, sql_query, params)
+
+    # One extra row was fetched to know whether another page exists
+    rows, has_more = result[:limit], len(result) > limit
     
-    return [
-        {
-            "id": row.id,
-            "channel_name": row.channel_name,
-            "date": row.date,
-            "text": row.text,
-            "views": row.views
-        } 
-        for row in result
-    ]
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "channel_name": row.channel_name,
+                "date": row.date,
+                "text": row.text,
+                "views": row.views
+            } 
+            for row in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1].score, rows[-1].channel_key, rows[-1].id) if has_more else None
+    }
 
 # --- Endpoint 4: Visual Content Stats (Task 3 Integration) ---
 @app.get("/api/reports/visual-content", response_model=List[schemas.VisualStats])
-def get_visual_stats(db: Session = Depends(database.get_db)):
+async def get_visual_stats(
+    object_class: Optional[str] = None,
+    db: database.DBSession = Depends(database.get_db)
+):
     """
-    Returns engagement stats based on YOLO image classification.
+    Returns engagement stats based on YOLO image classification,
+    optionally only for images containing an object class (e.g. bottle).
     """
-    query = text("""
+    params = {}
+    where = ""
+    if object_class:
+        # Containment on the GIN-indexed class array
+        where = "WHERE detected_classes @> ARRAY[:object_class]"
+        params["object_class"] = object_class
+
+    query = text(f"""
         SELECT 
             image_category as category,
             AVG(view_count) as avg_views,
             COUNT(*) as total_images
         FROM fct_image_detections
+        {where}
         GROUP BY image_category
         ORDER BY avg_views DESC
     """)
     
     try:
-        result = db.execute(query).fetchall()
+        result = await replica.fetch_all(db, query, params)
         return [
             {
                 "category": row.category, 
@@ -128,4 +330,219 @@ def get_visual_stats(db: Session = Depends(database.get_db)):
         ]
     except Exception as e:
         # Graceful fallback if Task 3 table doesn't exist yet
-        raise HTTPException(status_code=500, detail="Visual stats not available yet.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Visual stats not available yet.")
+
+
+# --- Endpoint 5: Object Analytics ---
+@app.get("/api/reports/objects", response_model=List[schemas.ObjectStats])
+async def get_object_stats(
+    object_class: Optional[str] = None,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: List[Literal["channel", "date"]] = Query(default=[]),
+    limit: int = Query(50, ge=1, le=1000),
+    db: database.DBSession = Depends(database.get_db)
+):
+    """
+    Returns how often each detected object class appears and the engagement of the
+    images containing it. Always grouped by class; add group_by=channel and/or
+    group_by=date for per-channel or per-day rows.
+    """
+    # Per-box rows from fct_detected_objects, filtered on its (object_class, date_key)
+    # and (channel_key, date_key) indexes
+    filters = []
+    params = {"limit": limit}
+    if object_class:
+        filters.append("o.object_class = :object_class")
+        params["object_class"] = object_class
+    if channel:
+        filters.append("o.channel_key = (SELECT channel_key FROM dim_channels WHERE channel_name = :channel)")
+        params["channel"] = channel
+    if start:
+        filters.append("o.date_key >= :start_key")
+        params["start_key"] = to_date_key(start)
+    if end:
+        filters.append("o.date_key <= :end_key")
+        params["end_key"] = to_date_key(end)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    group_columns = ["i.object_class"]
+    select_columns = ["i.object_class"]
+    joins = []
+    if "channel" in group_by:
+        joins.append("JOIN dim_channels c ON c.channel_key = i.channel_key")
+        group_columns.append("c.channel_name")
+        select_columns.append("c.channel_name")
+    if "date" in group_by:
+        joins.append("JOIN dim_dates d ON d.date_key = i.date_key")
+        group_columns.append("d.full_date")
+        select_columns.append("d.full_date AS date")
+
+    # Collapse boxes to one row per image and class first, so views count once per image
+    query = text(f"""
+        WITH images AS (
+            SELECT
+                o.object_class, o.channel_key, o.message_id, o.date_key,
+                COUNT(*) AS object_count,
+                AVG(o.confidence) AS avg_confidence,
+                MAX(o.view_count) AS view_count
+            FROM fct_detected_objects o
+            {where}
+            GROUP BY o.object_class, o.channel_key, o.message_id, o.date_key
+        )
+        SELECT
+            {', '.join(select_columns)},
+            COUNT(*) AS image_count,
+            SUM(i.object_count) AS object_count,
+            AVG(i.avg_confidence)::float8 AS avg_confidence,
+            COALESCE(AVG(i.view_count), 0)::float8 AS avg_views,
+            COALESCE(SUM(i.view_count), 0) AS total_views
+        FROM images i
+        {' '.join(joins)}
+        GROUP BY {', '.join(group_columns)}
+        ORDER BY object_count DESC, {', '.join(group_columns)}
+        LIMIT :limit
+    """)
+
+    result = await replica.fetch_all(db, query, params)
+
+    return [
+        {
+            "object_class": row.object_class,
+            "channel_name": row.channel_name if "channel" in group_by else None,
+            "date": row.date if "date" in group_by else None,
+            "image_count": row.image_count,
+            "object_count": row.object_count,
+            "avg_confidence": round(row.avg_confidence, 4),
+            "avg_views": round(row.avg_views, 2),
+            "total_views": row.total_views,
+        }
+        for row in result
+    ]
+
+
+# --- Bulk Exports ---
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def export_filters(channel: Optional[str], start: Optional[date], end: Optional[date],
+                   alias: str) -> Tuple[List[str], dict]:
+    """Channel and inclusive date-range predicates on `alias`.channel_key / date_key."""
+    filters, params = [], {}
+    if channel:
+        filters.append(f"{alias}.channel_key = (SELECT channel_key FROM dim_channels WHERE channel_name = :channel)")
+        params["channel"] = channel
+    if start:
+        filters.append(f"{alias}.date_key >= :start_key")
+        params["start_key"] = to_date_key(start)
+    if end:
+        filters.append(f"{alias}.date_key <= :end_key")
+        params["end_key"] = to_date_key(end)
+    return filters, params
+
+
+@app.get("/api/export/messages")
+async def export_messages(
+    request: Request,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    format: ExportFormat = "ndjson"
+):
+    """
+    Streams every matching message as NDJSON or CSV, in no particular order.
+    """
+    filters, params = export_filters(channel, start, end, "m")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    columns = ["message_id", "channel_name", "date", "message_text", "views", "forwards",
+               "has_media", "image_path"]
+    query = text(f"""
+        SELECT m.message_id, c.channel_name, d.full_date, m.message_text, m.view_count,
+               m.forward_count, m.has_media, m.image_path
+        FROM fct_messages m
+        JOIN dim_channels c ON m.channel_key = c.channel_key
+        JOIN dim_dates d ON m.date_key = d.date_key
+        {where}
+    """)
+    return export.export_response(request, query, params, columns, format, "messages")
+
+
+@app.get("/api/export/channel-activity")
+async def export_channel_activity(
+    request: Request,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    format: ExportFormat = "ndjson"
+):
+    """
+    Streams daily activity rows (from agg_channel_daily) for one or all channels.
+    """
+    filters, params = export_filters(channel, start, end, "a")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    columns = ["channel_name", "date", "post_count", "total_views", "avg_views",
+               "total_forwards", "media_count"]
+    query = text(f"""
+        SELECT c.channel_name, a.full_date, a.post_count, a.total_views, a.avg_views::float8,
+               a.total_forwards, a.media_count
+        FROM agg_channel_daily a
+        JOIN dim_channels c ON a.channel_key = c.channel_key
+        {where}
+        ORDER BY a.channel_key, a.date_key
+    """)
+    return export.export_response(request, query, params, columns, format, "channel_activity")
+
+
+@app.get("/api/export/detections")
+async def export_detections(
+    request: Request,
+    channel: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    object_class: Optional[str] = None,
+    format: ExportFormat = "ndjson"
+):
+    """
+    Streams per-image detection rows, optionally only images containing `object_class`.
+    """
+    filters, params = export_filters(channel, start, end, "i")
+    if object_class:
+        filters.append("i.detected_classes @> ARRAY[:object_class]")
+        params["object_class"] = object_class
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    columns = ["message_id", "channel_name", "date", "image_category", "detected_classes",
+               "avg_confidence", "views", "forwards"]
+    query = text(f"""
+        SELECT i.message_id, c.channel_name, d.full_date, i.image_category, i.detected_classes,
+               i.avg_confidence, i.view_count, i.forward_count
+        FROM fct_image_detections i
+        LEFT JOIN dim_channels c ON i.channel_key = c.channel_key
+        LEFT JOIN dim_dates d ON i.date_key = d.date_key
+        {where}
+    """)
+    return export.export_response(request, query, params, columns, format, "detections")
+
+
+# --- Cache Statistics ---
+@app.get("/api/cache/stats", response_model=schemas.CacheStats)
+def get_cache_stats():
+    """
+    Returns hit/miss counters of the in-process response cache.
+    """
+    return cache.cache_stats()
+
+
+# --- Prometheus Metrics ---
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """
+    Request/SQL latency histograms, pool usage and cache counters in Prometheus text format.
+    """
+    stats = cache.cache_stats()
+    cache_lines = metrics.gauge_lines(
+        "api_cache_events", "Response cache counters since start.",
+        [({"event": name}, stats[name]) for name in ("hits", "misses", "not_modified", "evictions")]
+    ) + metrics.gauge_lines("api_cache_entries", "Responses currently cached.", [({}, stats["entries"])])
+    cache_lines += replica.metric_lines()
+    return PlainTextResponse(metrics.render(cache_lines), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.routing import Match
+
+logger = logging.getLogger("api.slow_query")
+
+# Queries slower than this are logged with an EXPLAIN summary (0 disables)
+SLOW_QUERY_MS = float(os.getenv("API_SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts incl. +Inf, sum, count)
+        self.series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self.series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+def gauge_lines(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {value}")
+    return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+QUERY_LATENCY = Histogram(
+    "api_sql_query_duration_seconds", "SQL execution time by statement fingerprint.", ("query",)
+)
+QUERY_ROWS = Histogram(
+    "api_sql_rows_returned", "Rows returned per SQL statement.", ("query",), buckets=ROW_BUCKETS
+)
+SLOW_QUERIES = Counter("api_sql_slow_queries_total", "Statements over API_SLOW_QUERY_MS.", ("query",))
+POOL_WAIT = Histogram(
+    "api_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",)
+)
+
+# Statement fingerprint -> first characters of the statement, exposed as an info metric
+QUERY_TEXT: Dict[str, str] = {}
+INSTRUMENTED_ENGINES: Dict[str, Engine] = {}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    key = hashlib.md5(normalized.encode()).hexdigest()[:12]
+    QUERY_TEXT.setdefault(key, normalized[:120])
+    return key
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, self.metrics_label)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, self.metrics_label)
+
+
+def _explain_summary(conn, statement: str, parameters) -> str:
+    """Top plan node plus any sequential scans, e.g. 'Limit (cost=...) | Seq Scan on fct_messages'."""
+    conn.info["explaining"] = True
+    try:
+        plan = [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        conn.info["explaining"] = False
+    scans = [line.strip().lstrip("-> ") for line in plan[1:] if "Seq Scan" in line]
+    return " | ".join(plan[:1] + scans)
+
+
+def instrument_engine(engine: Engine, label: str) -> None:
+    """Attaches cursor-execute timing, row counts and the slow-query log to an engine."""
+    if label in INSTRUMENTED_ENGINES:
+        return
+    INSTRUMENTED_ENGINES[label] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"]
+        if conn.info.get("explaining"):
+            return
+        key = fingerprint(statement)
+        QUERY_LATENCY.observe(elapsed, key)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            QUERY_ROWS.observe(cursor.rowcount, key)
+
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS and not executemany:
+            SLOW_QUERIES.inc(key)
+            logger.warning(
+                f"Slow query {key} took {elapsed * 1000:.1f} ms | "
+                f"sql={_WHITESPACE.sub(' ', statement).strip()} | params={parameters} | "
+                f"plan={_explain_summary(conn, statement, parameters)}"
+            )
+
+
+def pool_lines() -> List[str]:
+    in_use, idle, overflow, size = [], [], [], []
+    for label, engine in INSTRUMENTED_ENGINES.items():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        labels = {"engine": label}
+        in_use.append((labels, pool.checkedout()))
+        idle.append((labels, pool.checkedin()))
+        overflow.append((labels, max(pool.overflow(), 0)))
+        size.append((labels, pool.size()))
+    return (
+        gauge_lines("api_db_pool_connections_in_use", "Connections checked out of the pool.", in_use)
+        + gauge_lines("api_db_pool_connections_idle", "Idle connections in the pool.", idle)
+        + gauge_lines("api_db_pool_overflow", "Connections opened beyond pool_size.", overflow)
+        + gauge_lines("api_db_pool_size", "Configured pool_size.", size)
+    )
+
+
+def render(extra_lines: Optional[List[str]] = None) -> str:
+    lines: List[str] = []
+    for metric in (REQUEST_LATENCY, QUERY_LATENCY, QUERY_ROWS, SLOW_QUERIES, POOL_WAIT):
+        lines.extend(metric.render())
+    lines.extend(gauge_lines(
+        "api_sql_query_info", "Statement text for each query fingerprint.",
+        [({"query": key, "sql": sql}, 1) for key, sql in sorted(QUERY_TEXT.items())]
+    ))
+    lines.extend(pool_lines())
+    lines.extend(extra_lines or [])
+    return "\n".join(lines) + "\n"
+
+
+def route_template(request: Request) -> str:
+    """
+    The matched route's path template, so labels stay bounded. Responses served
+    by earlier middleware (e.g. cache hits) never reach the router, so match here.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in request.app.router.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+
+async def metrics_middleware(request: Request, call_next) -> Response:
+    """Records request latency labelled by route template (e.g. /api/channels/{channel_name}/activity)."""
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, route_template(request), status)
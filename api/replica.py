@@ -0,0 +1,181 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from . import database, metrics
+
+logger = logging.getLogger("api.replica")
+
+# "duckdb" answers the report endpoints from the snapshot written by
+# src/read_replica.py after each dbt run; "off" sends everything to Postgres
+REPLICA_MODE = os.getenv("API_READ_REPLICA", "off").lower()
+REPLICA_DIR = os.getenv(
+    "READ_REPLICA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "replica")
+)
+POINTER_FILE = "CURRENT"
+# DuckDB threads per query; unset lets each query use every core
+REPLICA_THREADS = os.getenv("API_REPLICA_THREADS")
+
+if REPLICA_MODE == "duckdb":
+    import duckdb
+
+REPLICA_QUERIES = metrics.Counter(
+    "api_replica_queries_total", "Report queries by the backend that answered them.", ("backend",)
+)
+
+# :name placeholders of text() queries, but not ::casts
+_PARAMETER = re.compile(r"(?<![:\w]):(\w+)")
+
+
+class Replica:
+    """
+    The current DuckDB snapshot, opened read-only.
+
+    CURRENT is checked on every query (one stat call), so a new snapshot is
+    served from the first request after the exporter swaps it in, before the
+    response cache notices the warehouse version change. Each threadpool thread
+    queries through its own cursor; a replaced snapshot's connection and
+    cursors are closed once no query is running on them.
+    """
+    def __init__(self, replica_dir: str = REPLICA_DIR):
+        self.replica_dir = replica_dir
+        self.pointer_mtime: Optional[int] = None
+        self.path: Optional[str] = None
+        self.connection = None
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Per connection: queries in flight, and the cursors threads opened on it
+        self._leases: Dict[Any, int] = {}
+        self._cursors: Dict[Any, List[Any]] = {}
+        # Connections to replaced snapshots, closed once their last query finishes
+        self._retired: List[Any] = []
+
+    def _refresh(self) -> None:
+        pointer = os.path.join(self.replica_dir, POINTER_FILE)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.pointer_mtime:
+            return
+        with self._lock:
+            if mtime == self.pointer_mtime:
+                return
+            path = None
+            if mtime is not None:
+                with open(pointer, encoding="utf-8") as f:
+                    path = os.path.join(self.replica_dir, f.read().strip())
+            config = {"threads": int(REPLICA_THREADS)} if REPLICA_THREADS else {}
+            if self.connection is not None:
+                self._retired.append(self.connection)
+            self.connection = duckdb.connect(path, read_only=True, config=config) if path else None
+            if self.connection is not None:
+                try:
+                    # date_trunc buckets in UTC, as Postgres does for the warehouse
+                    self.connection.execute("SET GLOBAL TimeZone = 'UTC'")
+                except duckdb.Error:
+                    pass  # without the icu extension timestamps are UTC anyway
+            self.path = path
+            self.pointer_mtime = mtime
+            self.opened_at = time.time()
+            if path:
+                logger.info(f"Serving reports from {path}")
+            self._close_retired()
+
+    def _close_retired(self) -> None:
+        # Called with the lock held; the snapshot file stays open until every cursor is closed
+        for connection in [c for c in self._retired if not self._leases.get(c)]:
+            for cursor in self._cursors.pop(connection, []):
+                cursor.close()
+            connection.close()
+            self._retired.remove(connection)
+            self._leases.pop(connection, None)
+
+    @contextmanager
+    def cursor(self) -> Iterator[Any]:
+        """
+        This thread's cursor on the current snapshot, or None when there is no
+        snapshot. The snapshot is not closed while the block runs, even if a
+        newer one is swapped in.
+        """
+        self._refresh()
+        with self._lock:
+            connection = self.connection
+            if connection is not None:
+                self._leases[connection] = self._leases.get(connection, 0) + 1
+        if connection is None:
+            yield None
+            return
+        try:
+            local = self._local
+            if getattr(local, "connection", None) is not connection:
+                cursor = connection.cursor()
+                with self._lock:
+                    self._cursors.setdefault(connection, []).append(cursor)
+                local.cursor, local.connection = cursor, connection
+            yield local.cursor
+        finally:
+            with self._lock:
+                self._leases[connection] -= 1
+                self._close_retired()
+
+    def execute(self, query, params: Optional[Dict[str, Any]] = None) -> Optional[List[Tuple]]:
+        """Runs a text() query on the snapshot; None when there is no snapshot to run it on."""
+        statement = str(query)
+        names = set(_PARAMETER.findall(statement))
+        params = {name: value for name, value in (params or {}).items() if name in names}
+        with self.cursor() as cursor:
+            if cursor is None:
+                return None
+            start = time.perf_counter()
+            cursor.execute(_PARAMETER.sub(r"$\1", statement), params)
+            Row = namedtuple("Row", [column[0] for column in cursor.description], rename=True)
+            rows = [Row(*row) for row in cursor.fetchall()]
+        key = metrics.fingerprint(statement)
+        metrics.QUERY_LATENCY.observe(time.perf_counter() - start, key)
+        metrics.QUERY_ROWS.observe(len(rows), key)
+        return rows
+
+
+replica = Replica() if REPLICA_MODE == "duckdb" else None
+
+
+def _execute(query, params: Optional[Dict[str, Any]]) -> Optional[List[Tuple]]:
+    try:
+        return replica.execute(query, params)
+    except duckdb.CatalogException as e:
+        # A mart missing from the snapshot (e.g. detections not run yet) is read from Postgres
+        logger.warning(f"Not in the replica, falling back to Postgres: {e}")
+        return None
+
+
+async def fetch_all(db: database.DBSession, query, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """
+    database.fetch_all for report queries: answered by the DuckDB snapshot when
+    API_READ_REPLICA=duckdb and one exists, otherwise by Postgres.
+    """
+    if replica is not None:
+        rows = await run_in_threadpool(_execute, query, params)
+        if rows is not None:
+            REPLICA_QUERIES.inc("duckdb")
+            return rows
+    REPLICA_QUERIES.inc("postgres")
+    return await database.fetch_all(db, query, params)
+
+
+def metric_lines() -> List[str]:
+    lines = REPLICA_QUERIES.render()
+    if replica is not None and replica.path:
+        lines += metrics.gauge_lines(
+            "api_replica_snapshot_opened", "Unix time the current snapshot was opened.",
+            [({"snapshot": os.path.basename(replica.path)}, replica.opened_at)]
+        )
+    return lines
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Optional
+import datetime as dt
 from datetime import date, datetime
 
 class MessageResponse(BaseModel):
@@ -12,10 +13,27 @@ class MessageResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MessageSearchPage(BaseModel):
+    items: List[MessageResponse]
+    # Opaque keyset cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
 class ChannelActivity(BaseModel):
     date: date
     post_count: int
     total_views: int
+    avg_views: float
+    total_forwards: int
+    media_count: int
+
+class GrowthPoint(BaseModel):
+    # Start of the hour/day/week bucket
+    time: datetime
+    # Running totals at the end of the bucket, and what the bucket added
+    views: int
+    forwards: int
+    views_gained: int
+    forwards_gained: int
 
 class TopProduct(BaseModel):
     word: str
@@ -24,4 +42,24 @@ class TopProduct(BaseModel):
 class VisualStats(BaseModel):
     category: str
     avg_views: float
-    total_images: int
\ No newline at end of file
+    total_images: int
+
+class ObjectStats(BaseModel):
+    object_class: str
+    channel_name: Optional[str] = None
+    # dt.date: a bare `date` annotation would resolve to this field's default
+    date: Optional[dt.date] = None
+    image_count: int
+    object_count: int
+    avg_confidence: float
+    avg_views: float
+    total_views: int
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    not_modified: int
+    evictions: int
+    entries: int
+    max_entries: int
+    warehouse_version: Optional[int] = None
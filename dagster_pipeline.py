@@ -1,91 +1,332 @@
 import os
-import subprocess
-from dagster import job, op, ScheduleDefinition, file_relative_path
+import json
+import asyncio
+import argparse
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+import yaml
+from dagster import (
+    AssetExecutionContext,
+    AssetSelection,
+    BackfillPolicy,
+    DagsterRunStatus,
+    DailyPartitionsDefinition,
+    Definitions,
+    Failure,
+    MaterializeResult,
+    MetadataValue,
+    Output,
+    RunRequest,
+    RunsFilter,
+    ScheduleDefinition,
+    SkipReason,
+    asset,
+    define_asset_job,
+    file_relative_path,
+    in_process_executor,
+    run_status_sensor,
+)
+
+from src import instrumentation
+from src.loader import load_raw_data
+from src.warehouse_version import bump_warehouse_version
+
+DBT_PROJECT_DIR = os.getenv('DBT_PROJECT_DIR', file_relative_path(__file__, "medical_warehouse"))
+
+# One partition per message date (UTC), the same day folders the lake is written in
+daily_partitions = DailyPartitionsDefinition(start_date=os.getenv('PIPELINE_START_DATE', '2024-01-01'))
+
+# Raw assets load and detect each day in its own run, so backfilled days run in
+# parallel; every partition of a dbt_marts backfill goes through one dbt
+# invocation, so runs never race on the same incremental tables
+RAW_BACKFILL_POLICY = BackfillPolicy.multi_run(1)
+DBT_BACKFILL_POLICY = BackfillPolicy.single_run()
+
+# The models downstream of each raw table (run `dbt run` once to build the rest)
+DBT_SELECTORS = {
+    "messages": "source:raw.telegram_messages+ source:raw.engagement_deltas+",
+    "detections": "source:raw.yolo_detections+ source:raw.detection_boxes+",
+}
+# Not downstream of any source, so it is selected on every dbt run; it is
+# incremental and only adds days, so this is a no-op once it exists
+DBT_ALWAYS_SELECTED = "dim_dates"
+
+# Run tags Dagster sets on partitioned and backfill runs
+BACKFILL_ID_TAG = "dagster/backfill"
+PARTITION_NAME_TAG = "dagster/partition"
+PARTITION_RANGE_START_TAG = "dagster/asset_partition_range_start"
+PARTITION_RANGE_END_TAG = "dagster/asset_partition_range_end"
+
 
 # --- Helpers ---
-def run_command(command, cwd=None):
-    """Runs a shell command and raises error if it fails."""
-    result = subprocess.run(
-        command, 
-        cwd=cwd, 
-        shell=True, 
-        capture_output=True, 
-        text=True
-    )
-    if result.returncode != 0:
-        raise Exception(f"Command failed: {command}\nError: {result.stderr}")
-    return result.stdout
-
-# --- Ops (The Steps) ---
-
-@op
-def scrape_telegram_data(context):
-    """Step 1: Run the Telethon Scraper"""
-    context.log.info("Starting Scraper...")
-    # Pointing to the script in scripts/scraper.py
-    script_path = os.path.join("src", "scraper.py")
-    output = run_command(f"python {script_path}")
-    context.log.info(output)
-
-@op
-def load_raw_to_postgres(context, start_trigger):
-    """Step 2: Load JSON data into PostgreSQL"""
-    context.log.info("Loading JSON to DB...")
-    script_path = os.path.join("src", "loader.py")
-    output = run_command(f"python {script_path}")
-    context.log.info(output)
-    return "raw_data_loaded"
-
-@op
-def run_yolo_enrichment(context, start_trigger):
-    """Step 3: Run YOLO Object Detection"""
-    context.log.info("Running YOLO Detection...")
-    # Assuming you moved yolo_detect.py to scripts/ or src/
-    # Adjust this path if your yolo script is in src/
-    script_path = os.path.join("src", "yolo_detect.py") 
-    
-    if os.path.exists(script_path):
-        output = run_command(f"python {script_path}")
-        context.log.info(output)
-    else:
-        context.log.warn(f"YOLO script not found at {script_path}, skipping.")
-    return "yolo_done"
-
-@op
-def run_dbt_transformations(context, yolo_done, raw_loaded):
-    """Step 4: Run dbt (Only runs after Load AND YOLO are done)"""
-    context.log.info("Running dbt models...")
-    dbt_dir = file_relative_path(__file__, "medical_warehouse")
-    
-    # 1. dbt deps (ensure packages are installed)
-    run_command("dbt deps", cwd=dbt_dir)
-    
-    # 2. dbt run
-    output = run_command("dbt run", cwd=dbt_dir)
-    context.log.info(output)
-    
-    # 3. dbt test
-    test_output = run_command("dbt test", cwd=dbt_dir)
-    context.log.info(test_output)
-
-# --- Job (The Flow) ---
-
-@job
-def medical_pipeline_job():
-    # 1. Scrape
-    scraped = scrape_telegram_data()
-    
-    # 2. Load and YOLO run in parallel (or sequential) after Scraping
-    # We pass 'scraped' to ensure they wait for scraping to finish
-    raw_loaded = load_raw_to_postgres(start_trigger=scraped)
-    yolo_done = run_yolo_enrichment(start_trigger=scraped)
-    
-    # 3. Run dbt only after BOTH loading and YOLO are finished
-    run_dbt_transformations(yolo_done=yolo_done, raw_loaded=raw_loaded)
+
+def partition_dates(context: AssetExecutionContext) -> List[date]:
+    """The dates of the partitions this run materializes (several during a single-run backfill)."""
+    return [date.fromisoformat(key) for key in context.partition_keys]
+
+
+def by_partition(context: AssetExecutionContext, value: Any) -> Dict[str, Dict[str, Any]]:
+    """Upstream stats keyed by partition; the IO manager only returns a dict for multi-partition runs."""
+    return value if len(context.partition_keys) > 1 else {context.partition_key: value}
+
+
+def dbt_lookback_days(oldest: date) -> int:
+    """
+    Incremental marts recompute the last `lookback_days` before their newest day;
+    a backfill widens that window back to its oldest partition.
+    """
+    with open(os.path.join(DBT_PROJECT_DIR, "dbt_project.yml"), encoding="utf-8") as f:
+        default = yaml.safe_load(f)["vars"]["lookback_days"]
+    # Partitions are UTC days, so count from today's UTC date
+    return max(default, (datetime.now(timezone.utc).date() - oldest).days + 1)
+
+
+def invoke_dbt(context: AssetExecutionContext, *args: str):
+    """Runs a dbt command in this process and fails the step if it does not succeed."""
+    # Imported here so loading the code location does not pay for dbt
+    from dbt.cli.main import dbtRunner
+
+    context.log.info(f"dbt {' '.join(args)}")
+    with instrumentation.stage(f"dbt_{args[0]}"):
+        result = dbtRunner().invoke([*args, "--project-dir", DBT_PROJECT_DIR, "--profiles-dir", DBT_PROJECT_DIR])
+        if not result.success:
+            raise Failure(f"dbt {args[0]} failed", metadata={"error": str(result.exception or result.result)})
+        instrumentation.count("models", len(getattr(result.result, "results", [])))
+    return result.result
+
+
+@contextmanager
+def asset_report(context: AssetExecutionContext) -> Iterator[instrumentation.RunReport]:
+    """Records the step's stages in a run report named after the asset and tagged with its partitions."""
+    partitioned = context.has_partition_key or context.has_partition_key_range
+    tags = {"partitions": context.partition_keys} if partitioned else {}
+    with instrumentation.run_report(context.asset_key.to_user_string(), context.run_id, tags=tags) as report:
+        yield report
+
+
+def report_metadata(report: instrumentation.RunReport) -> Dict[str, Any]:
+    """
+    The run report as step metadata. Dagster plots numeric entries across
+    materializations, so duration_s and peak_rss_mb show each asset's trend.
+    """
+    data = report.to_dict()
+    return {
+        "duration_s": round(report.seconds, 2),
+        "peak_rss_mb": round(data["peak_rss_mb"], 1),
+        "run_report": MetadataValue.json(data),
+        **({"run_report_path": MetadataValue.path(report.path)} if report.path else {}),
+    }
+
+
+# --- Assets ---
+
+@asset(group_name="ingestion", compute_kind="python")
+def telegram_lake(context: AssetExecutionContext) -> MaterializeResult:
+    """New messages and images scraped from Telegram into data/raw."""
+    from src import scraper
+
+    with asset_report(context) as report:
+        stats = asyncio.run(scraper.main(argparse.Namespace(backfill=False, stream=False, poll_interval=0)))
+    return MaterializeResult(metadata={
+        "messages": stats["messages"],
+        "images_downloaded": stats["images"],
+        "duplicate_images": stats["duplicate_images"],
+        **report_metadata(report),
+    })
+
+
+@asset(
+    partitions_def=daily_partitions,
+    deps=[telegram_lake],
+    backfill_policy=RAW_BACKFILL_POLICY,
+    group_name="raw",
+    compute_kind="postgres",
+)
+def raw_telegram_messages(context: AssetExecutionContext) -> Output[Dict[str, Any]]:
+    """The day's lake partitions upserted into raw.telegram_messages."""
+    day = partition_dates(context)[0]
+    with asset_report(context) as report:
+        stats = load_raw_data(start=day, end=day)
+    if stats is None:
+        raise Failure(f"Loading {day} into raw.telegram_messages failed; see the loader log.")
+    return Output(stats, metadata={
+        "rows": stats["rows"],
+        "rows_changed": stats["rows_changed"],
+        "engagement_changes": stats["engagement_changes"],
+        "files_loaded": stats["files_loaded"],
+        "files_skipped": stats["files_skipped"],
+        **report_metadata(report),
+    })
+
+
+@asset(
+    partitions_def=daily_partitions,
+    deps=[raw_telegram_messages],
+    backfill_policy=RAW_BACKFILL_POLICY,
+    group_name="raw",
+    compute_kind="yolo",
+)
+def raw_yolo_detections(context: AssetExecutionContext) -> Output[Dict[str, Any]]:
+    """
+    YOLO detections for images of messages posted that day. With
+    YOLO_WORKER_ADDRESS set, images go to the resident detection worker, so
+    the model is not loaded again for every partition.
+    """
+    # ultralytics and torch are only imported by the step that needs them
+    from src.yolo_detect import run_detection
+
+    day = partition_dates(context)[0]
+    with asset_report(context) as report:
+        stats = run_detection(start=day, end=day)
+    return Output(stats, metadata={
+        "images": stats["images"],
+        "distinct_images": stats["distinct"],
+        "inferred": stats["inferred"],
+        "rows_upserted": stats["upserted"],
+        "model_id": stats["model_id"],
+        "inference_s": round(stats["seconds"], 2),
+        **report_metadata(report),
+    })
+
+
+@asset(
+    partitions_def=daily_partitions,
+    backfill_policy=DBT_BACKFILL_POLICY,
+    group_name="warehouse",
+    compute_kind="dbt",
+)
+def dbt_marts(
+    context: AssetExecutionContext,
+    raw_telegram_messages: Dict[str, Any],
+    raw_yolo_detections: Dict[str, Any],
+) -> MaterializeResult:
+    """Runs and tests only the dbt models downstream of raw tables that changed."""
+    loaded = by_partition(context, raw_telegram_messages)
+    detected = by_partition(context, raw_yolo_detections)
+    # Re-scraped messages that did not change are not rewritten, so they need no dbt run
+    rows_changed = sum(stats.get("rows_changed", stats["rows"]) for stats in loaded.values())
+    rows_detected = sum(stats["upserted"] for stats in detected.values())
+
+    selectors = []
+    if rows_changed:
+        selectors.append(DBT_SELECTORS["messages"])
+    if rows_detected:
+        selectors.append(DBT_SELECTORS["detections"])
+    if not selectors:
+        context.log.info("No raw rows changed in these partitions; skipping dbt.")
+        return MaterializeResult(metadata={"skipped": True, "partitions": len(context.partition_keys)})
+
+    selection = " ".join([DBT_ALWAYS_SELECTED, *selectors])
+    dbt_vars = json.dumps({"lookback_days": dbt_lookback_days(min(partition_dates(context)))})
+
+    with asset_report(context) as report:
+        run_results = invoke_dbt(context, "run", "--select", selection, "--vars", dbt_vars)
+        invoke_dbt(context, "test", "--select", selection, "--vars", dbt_vars)
+
+        # Swap in the API's DuckDB snapshot before the version bump, so responses
+        # cached after the bump are computed from the new snapshot
+        replica = None
+        if os.getenv('API_READ_REPLICA', 'off').lower() == 'duckdb':
+            from src.read_replica import export_replica
+            with instrumentation.stage("export_read_replica"):
+                replica = export_replica()
+                instrumentation.count("rows", sum(replica["tables"].values()))
+
+        # Bump the warehouse version so the API drops its cached responses
+        with instrumentation.stage("bump_warehouse_version"):
+            version = bump_warehouse_version()
+
+    models = {
+        result.node.name: {
+            "seconds": round(result.execution_time, 2),
+            "rows_affected": (result.adapter_response or {}).get("rows_affected"),
+        }
+        for result in run_results.results
+    }
+    return MaterializeResult(metadata={
+        "partitions": len(context.partition_keys),
+        "rows_changed": rows_changed,
+        "detections_upserted": rows_detected,
+        "selection": selection,
+        "models": MetadataValue.json(models),
+        "warehouse_version": version,
+        **({"read_replica": replica["snapshot"]} if replica else {}),
+        **report_metadata(report),
+    })
+
+
+# --- Jobs (The Flow) ---
+
+scrape_job = define_asset_job("scrape_job", selection=AssetSelection.assets(telegram_lake))
+
+# A job resolves a single backfill policy for all its assets, so the assets are
+# split by policy: a backfill of medical_pipeline_job runs one load -> detect run
+# per day, and dbt_job then runs once over the whole range (see run_dbt_marts)
+medical_pipeline_job = define_asset_job(
+    "medical_pipeline_job",
+    selection=AssetSelection.assets(raw_telegram_messages, raw_yolo_detections),
+    partitions_def=daily_partitions,
+    # Both steps in one process so modules are imported once
+    executor_def=in_process_executor,
+)
+
+dbt_job = define_asset_job(
+    "dbt_job",
+    selection=AssetSelection.assets(dbt_marts),
+    partitions_def=daily_partitions,
+)
 
 # --- Schedule (Daily at Midnight) ---
 
 daily_schedule = ScheduleDefinition(
-    job=medical_pipeline_job,
+    job=scrape_job,
     cron_schedule="0 0 * * *",  # Daily at midnight
-)
\ No newline at end of file
+)
+
+
+@run_status_sensor(
+    run_status=DagsterRunStatus.SUCCESS,
+    monitored_jobs=[scrape_job],
+    request_job=medical_pipeline_job,
+)
+def process_new_day(context):
+    """Once the nightly scrape succeeds, materializes the day that just ended."""
+    partition_key = daily_partitions.get_last_partition_key()
+    return RunRequest(run_key=f"{context.dagster_run.run_id}:{partition_key}", partition_key=partition_key)
+
+
+@run_status_sensor(
+    run_status=DagsterRunStatus.SUCCESS,
+    monitored_jobs=[medical_pipeline_job],
+    request_job=dbt_job,
+)
+def run_dbt_marts(context):
+    """
+    Runs dbt for the days medical_pipeline_job loaded: right after a single-day
+    run, and for a backfill once, over its whole range, when all its runs succeeded.
+    """
+    run = context.dagster_run
+    backfill_id = run.tags.get(BACKFILL_ID_TAG)
+    if backfill_id is None:
+        return RunRequest(run_key=run.run_id, partition_key=run.tags[PARTITION_NAME_TAG])
+
+    partition_keys = sorted(context.instance.get_backfill(backfill_id).partition_names or [])
+    runs = context.instance.get_runs(RunsFilter(tags={BACKFILL_ID_TAG: backfill_id}))
+    succeeded = {r.tags.get(PARTITION_NAME_TAG) for r in runs if r.status == DagsterRunStatus.SUCCESS}
+    waiting = [key for key in partition_keys if key not in succeeded]
+    if waiting:
+        return SkipReason(f"Backfill {backfill_id}: waiting for {len(waiting)} of {len(partition_keys)} days.")
+    return RunRequest(
+        run_key=backfill_id,
+        tags={PARTITION_RANGE_START_TAG: partition_keys[0], PARTITION_RANGE_END_TAG: partition_keys[-1]},
+    )
+
+
+defs = Definitions(
+    assets=[telegram_lake, raw_telegram_messages, raw_yolo_detections, dbt_marts],
+    jobs=[scrape_job, medical_pipeline_job, dbt_job],
+    schedules=[daily_schedule],
+    sensors=[process_new_day, run_dbt_marts],
+)
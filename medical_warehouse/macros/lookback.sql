@@ -0,0 +1,13 @@
+{#
+    First date_key an incremental model recomputes: `lookback_days` before the
+    latest day already in {{ this }}, or 0 when the table is empty.
+#}
+{% macro lookback_date_key(days=var('lookback_days')) %}
+    (
+        select coalesce(
+            to_char(to_date(max(date_key)::text, 'YYYYMMDD') - {{ days }}, 'YYYYMMDD')::int,
+            0
+        )
+        from {{ this }}
+    )
+{% endmacro %}
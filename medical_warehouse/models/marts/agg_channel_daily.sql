@@ -0,0 +1,43 @@
+-- Posting and engagement totals per channel and day, used by /api/channels/{channel}/activity.
+-- Weekly and monthly activity is rolled up from these rows rather than fct_messages.
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_key', 'date_key'],
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key, date_key)"
+        ]
+    )
+}}
+
+with messages as (
+    select * from {{ ref('fct_messages') }}
+    {% if is_incremental() %}
+    -- Recompute days that received new or re-scraped messages, plus the lookback window
+    where (channel_key, date_key) in (
+        select channel_key, date_key
+        from {{ ref('fct_messages') }}
+        where scraped_at > (select coalesce(max(last_scraped_at), '-infinity') from {{ this }})
+    )
+    or date_key >= {{ lookback_date_key() }}
+    {% endif %}
+),
+
+dates as (
+    select * from {{ ref('dim_dates') }}
+)
+
+select
+    m.channel_key,
+    m.date_key,
+    d.full_date,
+    count(*) as post_count,
+    coalesce(sum(m.view_count), 0) as total_views,
+    round(avg(m.view_count), 2) as avg_views,
+    coalesce(sum(m.forward_count), 0) as total_forwards,
+    count(*) filter (where m.has_media) as media_count,
+    max(m.scraped_at) as last_scraped_at
+from messages m
+join dates d on m.date_key = d.date_key
+group by m.channel_key, m.date_key, d.full_date
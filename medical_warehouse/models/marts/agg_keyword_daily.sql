@@ -0,0 +1,56 @@
+-- Keyword document frequency per day and channel, replacing the per-request ts_stat scan.
+-- Each run recounts the days of channels that received new or re-scraped messages since the
+-- last run (tracked by last_scraped_at), plus the lookback window.
+{{
+    config(
+        materialized='incremental',
+        unique_key=['date_key', 'channel_key'],
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "create index if not exists {{ this.name }}_date_idx on {{ this }} (date_key) include (word, message_count)",
+            "create index if not exists {{ this.name }}_channel_date_idx on {{ this }} (channel_key, date_key) include (word, message_count)"
+        ]
+    )
+}}
+
+with messages as (
+    select
+        *,
+        -- Per day and channel, so the next run can find days that changed since this one
+        max(scraped_at) over (partition by date_key, channel_key) as last_scraped_at
+    from {{ ref('fct_messages') }}
+    {% if is_incremental() %}
+    where (channel_key, date_key) in (
+        select channel_key, date_key
+        from {{ ref('fct_messages') }}
+        where scraped_at > (select coalesce(max(last_scraped_at), '-infinity') from {{ this }})
+    )
+    or date_key >= {{ lookback_date_key() }}
+    {% endif %}
+),
+
+lexemes as (
+    -- tsvector_to_array yields each lexeme once per message, so counts are document frequencies
+    select
+        date_key,
+        channel_key,
+        last_scraped_at,
+        unnest(tsvector_to_array(search_vector)) as word
+    from messages
+)
+
+select
+    date_key,
+    channel_key,
+    word,
+    count(*) as message_count,
+    last_scraped_at
+from lexemes
+where length(word) > 2          -- Remove short words like "2", "6"
+and word ~ '^[a-z]+$'           -- Keep only letters (removes '500', '100mg')
+and word not in (               -- Remove generic Telegram spam words
+    {%- for stopword in var('keyword_stopwords') %}
+    '{{ stopword }}'{{ ',' if not loop.last }}
+    {%- endfor %}
+)
+group by date_key, channel_key, word, last_scraped_at
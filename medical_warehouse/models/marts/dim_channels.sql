@@ -1,5 +1,27 @@
+-- Incremental: only channels with messages scraped since the last run are
+-- re-aggregated (over their full history), the rest are left untouched.
+{{
+    config(
+        materialized='incremental',
+        unique_key='channel_key',
+        incremental_strategy='delete+insert',
+        on_schema_change='append_new_columns',
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key)",
+            "create unique index if not exists {{ this.name }}_name_idx on {{ this }} (channel_name)"
+        ]
+    )
+}}
+
 with stg_messages as (
     select * from {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    where channel_name in (
+        select channel_name
+        from {{ ref('stg_telegram_messages') }}
+        where scraped_at > (select coalesce(max(last_scraped_at), '-infinity') from {{ this }})
+    )
+    {% endif %}
 ),
 
 channel_stats as (
@@ -9,7 +31,8 @@ channel_stats as (
         min(message_date) as first_post_date,
         max(message_date) as last_post_date,
         count(*) as total_posts,
-        avg(views) as avg_views
+        avg(views) as avg_views,
+        max(scraped_at) as last_scraped_at
     from stg_messages
     group by channel_name
 )
@@ -29,5 +52,6 @@ select
     first_post_date,
     last_post_date,
     total_posts,
-    round(avg_views, 2) as avg_views
-from channel_stats
\ No newline at end of file
+    round(avg_views, 2) as avg_views,
+    last_scraped_at
+from channel_stats
@@ -1,8 +1,20 @@
--- Generate a range of dates from 2023 to 2030
+-- Generate a range of dates (dim_dates_start to dim_dates_end).
+-- Built once: later runs only add days when the range is widened.
+{{
+    config(
+        materialized='incremental',
+        unique_key='date_key',
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (date_key)",
+            "create unique index if not exists {{ this.name }}_full_date_idx on {{ this }} (full_date)"
+        ]
+    )
+}}
+
 with date_series as (
     select generate_series(
-        '2023-01-01'::date, 
-        '2030-12-31'::date, 
+        '{{ var("dim_dates_start") }}'::date,
+        '{{ var("dim_dates_end") }}'::date,
         '1 day'::interval
     )::date as full_date
 )
@@ -21,4 +33,7 @@ select
         when extract(isodow from full_date) in (6, 7) then true 
         else false 
     end as is_weekend
-from date_series
\ No newline at end of file
+from date_series
+{% if is_incremental() %}
+where full_date not in (select full_date from {{ this }})
+{% endif %}
@@ -0,0 +1,61 @@
+-- One row per detected box, linked to its message, for object-level analytics.
+-- Incremental like fct_image_detections: a message's boxes are replaced whenever its detection row is.
+-- delete+insert only clears messages that still have boxes, so the last post-hook drops
+-- boxes older than their message's current detection (e.g. re-detected with no objects).
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_key', 'message_id'],
+        incremental_strategy='delete+insert',
+        on_schema_change='append_new_columns',
+        post_hook=[
+            "create index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key, message_id)",
+            "create index if not exists {{ this.name }}_class_date_idx on {{ this }} (object_class, date_key)",
+            "create index if not exists {{ this.name }}_channel_date_idx on {{ this }} (channel_key, date_key)",
+            "delete from {{ this }} o
+             using {{ ref('stg_yolo_detections') }} d
+             join {{ ref('dim_channels') }} c on c.channel_name = d.channel_name
+             where o.channel_key = c.channel_key and o.message_id = d.message_id
+               and o.detected_at < d.updated_at"
+        ]
+    )
+}}
+
+with detections as (
+    select * from {{ ref('stg_yolo_detections') }}
+),
+
+boxes as (
+    select * from {{ ref('stg_detection_boxes') }}
+),
+
+messages as (
+    select * from {{ ref('fct_messages') }}
+),
+
+channels as (
+    select * from {{ ref('dim_channels') }}
+)
+
+select
+    d.message_id,
+    c.channel_key,
+    m.date_key,
+    b.box_index,
+    b.object_class,
+    b.confidence,
+    b.x1,
+    b.y1,
+    b.x2,
+    b.y2,
+    m.view_count,
+    m.forward_count,
+    d.updated_at as detected_at
+from detections d
+join boxes b on b.image_hash = d.image_hash and b.model_id = d.model_id
+left join channels c on d.channel_name = c.channel_name
+left join messages m on m.channel_key = c.channel_key and m.message_id = d.message_id
+{% if is_incremental() %}
+where d.updated_at > (select coalesce(max(detected_at), '-infinity') from {{ this }})
+   or m.date_key >= {{ lookback_date_key() }}
+{% endif %}
@@ -1,3 +1,21 @@
+-- Incremental: each run merges detections written since the last run plus images
+-- posted in the last `lookback_days` days, so their view counts stay current.
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_key', 'message_id'],
+        incremental_strategy='delete+insert',
+        on_schema_change='append_new_columns',
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key, message_id)",
+            "create index if not exists {{ this.name }}_message_idx on {{ this }} (message_id)",
+            "create index if not exists {{ this.name }}_date_idx on {{ this }} (date_key)",
+            "create index if not exists {{ this.name }}_channel_date_idx on {{ this }} (channel_key, date_key)",
+            "create index if not exists {{ this.name }}_classes_idx on {{ this }} using gin (detected_classes)"
+        ]
+    )
+}}
+
 with detections as (
     select * from {{ ref('stg_yolo_detections') }}
 ),
@@ -16,14 +34,22 @@ dates as (
 
 select
     d.message_id,
-    m.channel_key,
+    c.channel_key,
     m.date_key,
     d.image_category,
     d.detected_objects,
+    -- Distinct class names, GIN indexed for containment filters (detected_classes @> array['bottle'])
+    d.detected_classes,
     d.avg_confidence,
     -- Bring in metrics for analysis
     m.view_count,
-    m.forward_count
+    m.forward_count,
+    d.updated_at as detected_at
 from detections d
-left join messages m on d.message_id = m.message_id
--- We assume message_id is unique enough, or join on channel+id if needed
\ No newline at end of file
+left join channels c on d.channel_name = c.channel_name
+-- Telegram message ids are only unique within a channel
+left join messages m on m.channel_key = c.channel_key and m.message_id = d.message_id
+{% if is_incremental() %}
+where d.updated_at > (select coalesce(max(detected_at), '-infinity') from {{ this }})
+   or m.date_key >= {{ lookback_date_key() }}
+{% endif %}
@@ -0,0 +1,48 @@
+-- View/forward growth curve per message: one row per captured change with the
+-- running totals, used by /api/channels/{channel}/growth.
+-- Incremental: messages with deltas captured since the last run (or within the
+-- lookback window) have their whole, short, history recomputed.
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_key', 'message_id'],
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key, message_id, captured_at)",
+            "create index if not exists {{ this.name }}_channel_captured_idx on {{ this }} (channel_key, captured_at)"
+        ]
+    )
+}}
+
+with deltas as (
+    select * from {{ ref('stg_engagement_deltas') }}
+    {% if is_incremental() %}
+    where (channel_name, message_id) in (
+        select channel_name, message_id
+        from {{ ref('stg_engagement_deltas') }}
+        where captured_at > (
+            select coalesce(max(captured_at), '-infinity') - interval '{{ var("lookback_days") }} days'
+            from {{ this }}
+        )
+    )
+    {% endif %}
+),
+
+messages as (
+    select channel_name, message_id, message_date from {{ ref('stg_telegram_messages') }}
+)
+
+select
+    md5(d.channel_name) as channel_key,
+    d.message_id,
+    d.captured_at,
+    to_char(d.captured_at, 'YYYYMMDD')::int as date_key,
+    d.views_delta as views_gained,
+    d.forwards_delta as forwards_gained,
+    sum(d.views_delta) over growth as views,
+    sum(d.forwards_delta) over growth as forwards,
+    -- Age of the post at capture time; null when the message is not loaded
+    round((extract(epoch from d.captured_at - m.message_date) / 3600)::numeric, 2) as hours_since_post
+from deltas d
+left join messages m on m.channel_name = d.channel_name and m.message_id = d.message_id
+window growth as (partition by d.channel_name, d.message_id order by d.captured_at)
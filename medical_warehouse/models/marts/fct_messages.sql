@@ -1,5 +1,29 @@
+-- Incremental: each run merges messages scraped since the last run plus the last
+-- `lookback_days` days, so re-scraped view/forward counts replace the old rows.
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel_key', 'message_id'],
+        incremental_strategy='delete+insert',
+        on_schema_change='append_new_columns',
+        pre_hook="create extension if not exists pg_trgm",
+        post_hook=[
+            "create unique index if not exists {{ this.name }}_key_idx on {{ this }} (channel_key, message_id)",
+            "create index if not exists {{ this.name }}_message_idx on {{ this }} (message_id)",
+            "create index if not exists {{ this.name }}_date_idx on {{ this }} (date_key)",
+            "create index if not exists {{ this.name }}_channel_date_idx on {{ this }} (channel_key, date_key)",
+            "create index if not exists {{ this.name }}_search_idx on {{ this }} using gin (search_vector)",
+            "create index if not exists {{ this.name }}_text_trgm_idx on {{ this }} using gin (message_text gin_trgm_ops)"
+        ]
+    )
+}}
+
 with messages as (
     select * from {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    where scraped_at > (select coalesce(max(scraped_at), '-infinity') from {{ this }})
+       or to_char(message_date, 'YYYYMMDD')::int >= {{ lookback_date_key() }}
+    {% endif %}
 ),
 
 channels as (
@@ -19,7 +43,10 @@ select
     m.views as view_count,
     m.forwards as forward_count,
     m.has_media,
-    m.image_path
+    m.image_path,
+    m.scraped_at,
+    -- Stored lexemes for ranked full-text search (GIN indexed)
+    to_tsvector('english', coalesce(m.message_text, '')) as search_vector
 from messages m
 left join channels c on m.channel_name = c.channel_name
-left join dates d on m.message_date::date = d.full_date
\ No newline at end of file
+left join dates d on m.message_date::date = d.full_date
@@ -0,0 +1,16 @@
+with source as (
+    select * from {{ source('raw', 'detection_boxes') }}
+)
+
+select
+    image_hash,
+    model_id,
+    box_index,
+    class_name as object_class,
+    confidence,
+    -- Normalized (0..1) box corners
+    x1,
+    y1,
+    x2,
+    y2
+from source
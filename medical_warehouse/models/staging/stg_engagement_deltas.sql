@@ -0,0 +1,11 @@
+with source as (
+    select * from {{ source('raw', 'engagement_deltas') }}
+)
+
+select
+    channel_name,
+    message_id,
+    captured_at::timestamp as captured_at,
+    views_delta,
+    forwards_delta
+from source
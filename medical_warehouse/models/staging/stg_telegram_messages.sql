@@ -17,6 +17,8 @@ cleaned as (
         -- Boolean flags
         case when has_media = 'true' then true else false end as has_media,
         image_path,
+        -- Re-scrapes refresh this, so incremental marts use it to find changed rows
+        scraped_at::timestamp as scraped_at,
         -- Calculated field
         length(message_text) as message_length
     from source
@@ -7,6 +7,10 @@ select
     channel_name,
     image_path,
     detected_objects,
+    coalesce(detected_classes, '{}'::text[]) as detected_classes,
     avg_confidence,
-    image_category
+    image_category,
+    image_hash,
+    model_id,
+    updated_at
 from source
\ No newline at end of file
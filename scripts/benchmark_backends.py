@@ -0,0 +1,131 @@
+"""
+Compares YOLO inference backends on real images: throughput, and how often
+each one labels an image with the same get_image_category as the reference.
+
+The reference is the first --variants entry at the first --imgsz (by default
+eager PyTorch at 640). Every variant is exported once (src/inference_backends.py,
+cached under YOLO_EXPORT_DIR), loaded, and run with detect_images over the
+first --limit images under --images-dir. Reported per variant:
+  cold start    model load plus the first batch, which a resident
+                detection worker (src/detect_worker.py) pays once, not per run
+  images/s      steady-state throughput after that first batch
+  category      share of images with the reference's image category
+  classes       mean Jaccard similarity of the detected class sets
+
+Variants are backend names, with "-int8" for quantized weights.
+
+Usage:
+    python scripts/benchmark_backends.py --limit 300 \\
+        --variants pytorch onnx onnx-int8 openvino openvino-int8 --imgsz 640 480
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import yolo_detect  # noqa: E402
+from src.yolo_detect import YOLO, detect_images  # noqa: E402
+
+
+def parse_variant(name: str) -> Tuple[str, bool]:
+    backend, _, quantization = name.partition("-")
+    if quantization not in ("", "int8"):
+        raise argparse.ArgumentTypeError(f"unknown variant {name!r}")
+    return backend, quantization == "int8"
+
+
+def run_variant(images: List[Tuple[str, str]], backend: str, int8: bool, imgsz: int,
+                batch_size: int) -> Dict[str, Any]:
+    yolo_detect.BACKEND, yolo_detect.INT8, yolo_detect.IMGSZ = backend, int8, imgsz
+
+    start = time.perf_counter()
+    weights = yolo_detect.inference_weights()
+    export_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = YOLO(weights, task="detect")
+    records = list(detect_images(model, images[:batch_size], batch_size))
+    cold_start_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records += list(detect_images(model, images[batch_size:], batch_size))
+    elapsed = time.perf_counter() - start
+    timed = len(images) - batch_size
+    return {
+        "export_s": export_s,
+        "cold_start_s": cold_start_s,
+        "images_per_s": timed / elapsed if timed > 0 else 0.0,
+        "records": {record["image_path"]: record for record in records},
+    }
+
+
+def agreement(reference: Dict[str, Dict[str, Any]], records: Dict[str, Dict[str, Any]]) -> Tuple[float, float]:
+    """Share of images with the same category, and mean Jaccard of their class sets."""
+    shared = reference.keys() & records.keys()
+    if not shared:
+        return 0.0, 0.0
+    same_category, jaccard = 0, 0.0
+    for path in shared:
+        expected, actual = reference[path], records[path]
+        same_category += expected["image_category"] == actual["image_category"]
+        a, b = set(expected["detected_classes"]), set(actual["detected_classes"])
+        jaccard += len(a & b) / len(a | b) if a | b else 1.0
+    return same_category / len(shared), jaccard / len(shared)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-dir", default=yolo_detect.IMAGES_DIR)
+    parser.add_argument("--limit", type=int, default=300, help="Images per variant")
+    parser.add_argument("--variants", type=parse_variant, nargs="+",
+                        default=[("pytorch", False), ("onnx", False), ("onnx", True),
+                                 ("openvino", False), ("openvino", True)])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[yolo_detect.IMGSZ])
+    parser.add_argument("--batch-size", type=int, default=yolo_detect.BATCH_SIZE)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    yolo_detect.IMAGES_DIR = args.images_dir
+    images = yolo_detect.list_images()[:args.limit] if os.path.isdir(args.images_dir) else []
+    if len(images) <= args.batch_size:
+        parser.error(f"Need more than --batch-size ({args.batch_size}) images under {args.images_dir}")
+
+    results, reference = [], None
+    for imgsz in args.imgsz:
+        for backend, int8 in args.variants:
+            label = f"{backend}{'-int8' if int8 else ''}@{imgsz}"
+            print(f"Running {label} over {len(images)} images...")
+            try:
+                result = run_variant(images, backend, int8, imgsz, args.batch_size)
+            except Exception as e:
+                # Typically the backend's runtime (onnxruntime, openvino) is not installed
+                print(f"  skipped: {e}")
+                continue
+            if reference is None:
+                reference = (label, result["records"])
+            result["category_agreement"], result["class_agreement"] = agreement(reference[1], result.pop("records"))
+            results.append({"variant": label, **result})
+
+    if not results:
+        sys.exit("No variant could be run.")
+    print(f"\nReference: {reference[0]}, {len(images)} images, batch size {args.batch_size}, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'variant':<20} {'export s':>9} {'cold start s':>13} {'images/s':>9} {'speedup':>8} "
+          f"{'category':>9} {'classes':>8}")
+    baseline = results[0]["images_per_s"] or 1.0
+    for result in results:
+        print(f"{result['variant']:<20} {result['export_s']:>9.1f} {result['cold_start_s']:>13.2f} "
+              f"{result['images_per_s']:>9.1f} {result['images_per_s'] / baseline:>7.2f}x "
+              f"{result['category_agreement']:>8.1%} {result['class_agreement']:>8.1%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"reference": reference[0], "images": len(images), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Times `dbt run` on a large synthetic warehouse: a full rebuild (what every run
+did before the marts were incremental) versus an incremental run after a
+typical daily load.
+
+A scratch database (<POSTGRES_DB>_bench by default) is created on the Postgres
+in .env and seeded with synthetic raw.telegram_messages / raw.yolo_detections.
+Then the script times:
+  1. dbt run --full-refresh      every mart rebuilt from scratch
+  2. dbt run                     nothing new loaded
+  3. dbt run                     after one new day of messages plus re-scraped
+                                 view counts for the previous two days
+
+Usage:
+    python scripts/benchmark_dbt.py --rows 1000000 --days 365 --channels 20
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+from sqlalchemy import create_engine, text
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from api.database import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER  # noqa: E402
+from src.engagement import capture_engagement  # noqa: E402
+from src.loader import CREATE_TABLES_SQL  # noqa: E402
+
+# Same shape as yolo_detect.CREATE_DETECTIONS_SQL (importing it needs torch/cv2)
+CREATE_DETECTIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+        message_id bigint NOT NULL,
+        channel_name text NOT NULL,
+        image_path text,
+        detected_objects text,
+        avg_confidence double precision,
+        image_category text,
+        image_hash text,
+        model_id text,
+        updated_at timestamptz NOT NULL DEFAULT now(),
+        detected_classes text[],
+        PRIMARY KEY (channel_name, message_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS raw.detection_boxes (
+        image_hash text NOT NULL,
+        model_id text NOT NULL,
+        box_index integer NOT NULL,
+        class_name text NOT NULL,
+        confidence double precision NOT NULL,
+        x1 real, y1 real, x2 real, y2 real,
+        PRIMARY KEY (image_hash, model_id, box_index)
+    );
+"""
+
+WORDS = [
+    'paracetamol', 'amoxicillin', 'ibuprofen', 'vitamin', 'omeprazole', 'metformin',
+    'cetirizine', 'sunscreen', 'moisturizer', 'serum', 'glucometer', 'thermometer',
+    'available', 'original', 'quality', 'order', 'today', 'stock', 'tablets', 'delivery'
+]
+
+# Rows g in [first, last] spread evenly over `days` days starting at `start`
+INSERT_MESSAGES_SQL = """
+    INSERT INTO raw.telegram_messages
+    SELECT
+        g AS message_id,
+        '@bench_channel_' || (g % :channels) AS channel_name,
+        'Bench Channel ' || (g % :channels) AS channel_title,
+        CAST(:start AS timestamptz) + ((g - :first)::float8 / (:last - :first + 1)) * (:days * interval '1 day')
+            AS message_date,
+        (CAST(:words AS text[]))[1 + g % 20] || ' ' || (CAST(:words AS text[]))[1 + (g / 20) % 20] || ' '
+            || (CAST(:words AS text[]))[1 + (g / 400) % 20] || ' ' || (100 * (1 + g % 9))::text || 'mg' AS message_text,
+        g % 3 = 0 AS has_media,
+        CASE WHEN g % 3 = 0 THEN 'data/raw/images/bench/' || g || '.jpg' END AS image_path,
+        (g::bigint * 7919) % 5000 AS views,
+        (g::bigint * 104729) % 50 AS forwards,
+        now() AS scraped_at
+    FROM generate_series(:first, :last) g
+"""
+
+# Each image is its own content hash; even ids show a person and a bottle, odd ids a bottle
+INSERT_DETECTIONS_SQL = """
+    INSERT INTO raw.yolo_detections
+        (message_id, channel_name, image_path, detected_objects, detected_classes,
+         avg_confidence, image_category, image_hash, model_id)
+    SELECT message_id, channel_name, image_path,
+           CASE WHEN message_id % 2 = 0 THEN 'person,bottle' ELSE 'bottle' END,
+           CASE WHEN message_id % 2 = 0 THEN ARRAY['bottle', 'person'] ELSE ARRAY['bottle'] END,
+           0.5 + (message_id % 50) / 100.0,
+           CASE WHEN message_id % 2 = 0 THEN 'promotional' ELSE 'product_display' END,
+           'bench-' || message_id, 'bench'
+    FROM raw.telegram_messages
+    WHERE has_media AND message_id BETWEEN :first AND :last;
+
+    INSERT INTO raw.detection_boxes
+    SELECT image_hash, model_id, box_index - 1, class_name, 0.5 + (message_id % 50) / 100.0,
+           0.1, 0.1, 0.6, 0.9
+    FROM raw.yolo_detections, unnest(detected_classes) WITH ORDINALITY AS u(class_name, box_index)
+    WHERE message_id BETWEEN :first AND :last;
+"""
+
+RESCRAPE_SQL = """
+    UPDATE raw.telegram_messages
+    SET views = views + 25, forwards = forwards + 1, scraped_at = now()
+    WHERE message_date >= (SELECT max(message_date) FROM raw.telegram_messages) - interval '2 days'
+"""
+
+
+def bench_url(database: str) -> str:
+    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{database}"
+
+
+def create_database(database: str) -> None:
+    admin = create_engine(bench_url("postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+        conn.execute(text(f'CREATE DATABASE "{database}"'))
+    admin.dispose()
+
+
+def drop_database(database: str) -> None:
+    admin = create_engine(bench_url("postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        # Pooled connections left open by the code under test would block the drop
+        conn.execute(text(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE datname = :database AND pid <> pg_backend_pid()"
+        ), {"database": database})
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+    admin.dispose()
+
+
+def insert_messages(conn, first: int, last: int, start: str, days: int, channels: int) -> None:
+    params = {"first": first, "last": last, "start": start, "days": days,
+              "channels": channels, "words": WORDS}
+    conn.execute(text(INSERT_MESSAGES_SQL), params)
+    conn.execute(text(INSERT_DETECTIONS_SQL), {"first": first, "last": last})
+    # As load_raw_data does, so the engagement marts have history to build from
+    capture_engagement(conn, "raw.telegram_messages")
+
+
+def dbt_run(project_dir: str, database: str, *extra: str) -> float:
+    env = {**os.environ, "POSTGRES_DB": database}
+    start = time.perf_counter()
+    subprocess.run(
+        ["dbt", "run", "--project-dir", project_dir, "--profiles-dir", project_dir, *extra],
+        env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--database", default=f"{DB_NAME}_bench")
+    parser.add_argument("--project-dir", default=os.path.join(BASE_DIR, "medical_warehouse"))
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.rows:,} messages over {args.days} days into {args.database}...")
+    create_database(args.database)
+    engine = create_engine(bench_url(args.database))
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_TABLES_SQL))
+        conn.execute(text(CREATE_DETECTIONS_SQL))
+        insert_messages(conn, 1, args.rows, "2024-01-01", args.days, args.channels)
+        conn.execute(text("ANALYZE"))
+
+    results = []
+    try:
+        results.append(("full refresh", dbt_run(args.project_dir, args.database, "--full-refresh")))
+        results.append(("incremental, no new data", dbt_run(args.project_dir, args.database)))
+
+        daily_rows = max(args.rows // args.days, 1)
+        with engine.begin() as conn:
+            next_day = conn.execute(text(
+                "SELECT (max(message_date) + interval '1 day')::date::text FROM raw.telegram_messages"
+            )).scalar()
+            conn.execute(text(RESCRAPE_SQL))
+            insert_messages(conn, args.rows + 1, args.rows + daily_rows, next_day, 1, args.channels)
+        results.append((f"incremental, +{daily_rows:,} rows", dbt_run(args.project_dir, args.database)))
+    finally:
+        engine.dispose()
+        if not args.keep:
+            drop_database(args.database)
+
+    print(f"{'dbt run':<28} {'seconds':>8}")
+    for label, seconds in results:
+        print(f"{label:<28} {seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
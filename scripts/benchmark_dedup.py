@@ -0,0 +1,176 @@
+"""
+Measures the image store's deduplication on synthetic reposts.
+
+Generates --distinct random "product photos", then reposts a share of them
+the way channels do: byte-identical copies, JPEG re-encodes at another
+quality, and downscaled copies. Every image is added to a fresh ImageStore,
+and the script reports the dedup ratio, disk saved, near-duplicate
+precision/recall against the known ground truth, hashing throughput, and
+the near-duplicate index lookup time against a linear scan.
+
+Inference saved is estimated from --inference-ms (YOLO time per image on
+your hardware; yolo_detect.py prints the measured value for real runs).
+The report can be written to --output as JSON.
+
+Usage:
+    python scripts/benchmark_dedup.py --distinct 2000 --repost-ratio 0.6
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import make_photo  # noqa: E402
+from src.image_store import ImageStore, hamming, perceptual_hashes  # noqa: E402
+
+REPOST_KINDS = ('copy', 'reencode', 'resize')
+
+
+def write_images(base_dir: str, distinct: int, repost_ratio: float, seed: int):
+    """Writes images/<channel>/<n>.jpg; returns [(path, original index, repost kind)]."""
+    rng = random.Random(seed)
+    originals_dir = os.path.join(base_dir, 'originals')
+    os.makedirs(originals_dir)
+    images = []
+    next_id = 0
+
+    def target() -> str:
+        nonlocal next_id
+        next_id += 1
+        channel_dir = os.path.join(base_dir, 'images', f"channel_{next_id % 4}")
+        os.makedirs(channel_dir, exist_ok=True)
+        return os.path.join(channel_dir, f"{next_id}.jpg")
+
+    for index in range(distinct):
+        photo = make_photo(rng)
+        original = os.path.join(originals_dir, f"{index}.jpg")
+        photo.save(original, quality=90)
+        path = target()
+        shutil.copyfile(original, path)
+        images.append((path, index, 'original'))
+
+        while rng.random() < repost_ratio:
+            kind = rng.choice(REPOST_KINDS)
+            path = target()
+            if kind == 'copy':
+                shutil.copyfile(original, path)
+            elif kind == 'reencode':
+                photo.save(path, quality=rng.choice((60, 70, 80)))
+            else:
+                scale = rng.choice((0.5, 0.75))
+                photo.resize((int(800 * scale), int(800 * scale))).save(path, quality=85)
+            images.append((path, index, kind))
+
+    shutil.rmtree(originals_dir)
+    rng.shuffle(images)
+    return images
+
+
+def run_benchmark(distinct: int, repost_ratio: float, max_distance: int = 4, inference_ms: float = 120,
+                  seed: int = 42) -> Dict[str, Any]:
+    """Writes the synthetic images, adds them to a fresh ImageStore and returns the report main() prints."""
+    base_dir = tempfile.mkdtemp(prefix="dedup_bench_")
+    try:
+        images = write_images(base_dir, distinct, repost_ratio, seed)
+        bytes_before = sum(os.path.getsize(path) for path, _, _ in images)
+        kinds = {kind: sum(1 for _, _, k in images if k == kind) for kind in ('original',) + REPOST_KINDS}
+
+        store = ImageStore(os.path.join(base_dir, 'image_store'), max_distance)
+        start = time.perf_counter()
+        results = [(store.add(path), index, kind) for path, index, kind in images]
+        elapsed = time.perf_counter() - start
+
+        # Ground truth: every image derived from the same original should share one canonical
+        canonical_of = {}
+        for stored, index, _ in results:
+            canonical_of.setdefault(index, set()).add(stored.sha256)
+        owners = {}
+        for index, shas in canonical_of.items():
+            for sha in shas:
+                owners.setdefault(sha, set()).add(index)
+        merged_wrongly = sum(1 for indexes in owners.values() if len(indexes) > 1)
+        missed = {kind: 0 for kind in REPOST_KINDS}
+        for stored, index, kind in results:
+            if kind != 'original' and len(canonical_of[index]) > 1:
+                missed[kind] += 1
+
+        # Index lookups against a brute-force scan over the same hashes
+        probes = [perceptual_hashes(path) for path, _, _ in images[:200]]
+        stored_hashes = list(store.near._hashes.items())
+        start = time.perf_counter()
+        for phash, dhash in probes:
+            store.near.find(phash, dhash)
+        indexed = (time.perf_counter() - start) / len(probes)
+        start = time.perf_counter()
+        for phash, dhash in probes:
+            min(stored_hashes, key=lambda item: hamming(phash, item[1][0]))
+        linear = (time.perf_counter() - start) / len(probes)
+
+        stats = store.stats()
+        saved = stats['images'] - stats['blobs']
+        return {
+            "images": len(images),
+            "kinds": kinds,
+            "bytes_before": bytes_before,
+            "ingest_s": elapsed,
+            "images_per_s": len(images) / elapsed,
+            "store": stats,
+            "false_merges": merged_wrongly,
+            "missed": missed,
+            "inference_avoided": saved,
+            "inference_saved_s": saved * inference_ms / 1000,
+            "indexed_hashes": len(stored_hashes),
+            "lookup_index_us": indexed * 1e6,
+            "lookup_linear_us": linear * 1e6,
+        }
+    finally:
+        shutil.rmtree(base_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--distinct", type=int, default=2000)
+    parser.add_argument("--repost-ratio", type=float, default=0.6,
+                        help="Chance, repeated, that an image is reposted once more")
+    parser.add_argument("--max-distance", type=int, default=4)
+    parser.add_argument("--inference-ms", type=float, default=120,
+                        help="Assumed YOLO time per image for the inference-saved estimate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    print(f"Writing {args.distinct:,} distinct images plus reposts...")
+    report = run_benchmark(args.distinct, args.repost_ratio, args.max_distance, args.inference_ms, args.seed)
+    kinds, stats, missed = report["kinds"], report["store"], report["missed"]
+
+    print(f"{report['images']:,} images ({', '.join(f'{n:,} {k}' for k, n in kinds.items())}), "
+          f"{report['bytes_before'] / 1e6:,.1f} MB")
+    print(f"\nIngest: {report['ingest_s']:.1f}s ({report['images_per_s']:,.0f} images/s, hashing included)")
+    print(f"Stored {stats['blobs']:,} blobs for {stats['images']:,} images: dedup ratio "
+          f"{stats['dedup_ratio']:.2f}x ({stats['exact_duplicates']:,} exact, "
+          f"{stats['near_duplicates']:,} near duplicates), {stats['bytes_saved'] / 1e6:,.1f} MB "
+          f"of {report['bytes_before'] / 1e6:,.1f} MB saved")
+    print(f"Distinct originals merged together (false positives): {report['false_merges']}")
+    print("Reposts not matched to their original: "
+          + ", ".join(f"{kind} {missed[kind]}/{kinds[kind]}" for kind in REPOST_KINDS))
+    print(f"Inference avoided: {report['inference_avoided']:,} images, ~{report['inference_saved_s']:,.1f}s "
+          f"at {args.inference_ms:.0f} ms/image")
+    print(f"Near-duplicate lookup over {report['indexed_hashes']:,} hashes: "
+          f"index {report['lookup_index_us']:,.0f} us, linear scan {report['lookup_linear_us']:,.0f} us")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Checks that the streaming export endpoints run in constant memory.
+
+Seeds a scratch database (as scripts/benchmark_dbt.py does), builds the marts,
+starts the API against it and downloads /api/export/messages while sampling
+the server's resident set size. Exits non-zero if RSS grows by more than
+--max-growth-mb over the export. Linux only (reads /proc/<pid>/status).
+
+Usage:
+    python scripts/benchmark_export.py --rows 1000000 --format csv --gzip
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import subprocess
+
+import httpx
+from sqlalchemy import create_engine, text
+
+import benchmark_dbt
+from benchmark_dbt import BASE_DIR, bench_url
+from load_test_api import wait_until_up
+
+from api.database import DB_NAME  # noqa: E402
+
+# src.loader (imported via benchmark_dbt) configures INFO logging; keep httpx quiet
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.running = True
+
+    def run(self) -> None:
+        while self.running:
+            self.samples.append(rss_mb(self.pid))
+            time.sleep(self.interval)
+
+
+def seed(args) -> None:
+    print(f"Seeding {args.rows:,} messages into {args.database} and building marts...")
+    benchmark_dbt.create_database(args.database)
+    engine = create_engine(bench_url(args.database))
+    with engine.begin() as conn:
+        conn.execute(text(benchmark_dbt.CREATE_TABLES_SQL))
+        conn.execute(text(benchmark_dbt.CREATE_DETECTIONS_SQL))
+        benchmark_dbt.insert_messages(conn, 1, args.rows, "2024-01-01", args.days, args.channels)
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+    benchmark_dbt.dbt_run(args.project_dir, args.database)
+
+
+async def download(base_url: str, fmt: str, use_gzip: bool, checkpoints, pid: int):
+    headers = {"Accept-Encoding": "gzip" if use_gzip else "identity"}
+    lines, wire_bytes = 0, 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        async with client.stream("GET", "/api/export/messages", params={"format": fmt},
+                                 headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                wire_bytes = response.num_bytes_downloaded
+                lines += chunk.count(b"\n")
+                while checkpoints and lines >= checkpoints[0]:
+                    print(f"  {checkpoints.pop(0):>10,} rows   server RSS {rss_mb(pid):7.1f} MB")
+    return lines, wire_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--max-growth-mb", type=float, default=50)
+    parser.add_argument("--database", default=f"{DB_NAME}_bench")
+    parser.add_argument("--project-dir", default=os.path.join(BASE_DIR, "medical_warehouse"))
+    parser.add_argument("--no-seed", action="store_true", help="Reuse an already seeded --database")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        seed(args)
+
+    env = {**os.environ, "POSTGRES_DB": args.database, "API_DB_MODE": args.mode}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_up(base_url))
+        baseline = rss_mb(server.pid)
+        sampler = RssSampler(server.pid)
+        sampler.start()
+
+        print(f"Exporting {args.format}{' (gzip)' if args.gzip else ''} in {args.mode} mode; "
+              f"server RSS before: {baseline:.1f} MB")
+        checkpoints = [args.rows * step // 10 for step in range(1, 11)]
+        start = time.perf_counter()
+        lines, wire_bytes = asyncio.run(download(base_url, args.format, args.gzip, checkpoints, server.pid))
+        elapsed = time.perf_counter() - start
+        sampler.running = False
+        sampler.join()
+    finally:
+        server.terminate()
+        server.wait()
+        if not args.keep:
+            benchmark_dbt.drop_database(args.database)
+
+    rows = lines - 1 if args.format == "csv" else lines
+    peak = max(sampler.samples)
+    print(f"{rows:,} rows, {wire_bytes / 1e6:.1f} MB on the wire in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s)")
+    print(f"server RSS: before {baseline:.1f} MB, peak {peak:.1f} MB, growth {peak - baseline:.1f} MB")
+    if peak - baseline > args.max_growth_mb:
+        sys.exit(f"RSS grew by more than {args.max_growth_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compares the JSON message lake with the Parquet lake: size on disk and read
+speed for a full scan and for a filtered (one channel, last week) scan.
+
+A synthetic JSON lake in the scraper's layout is written to a temporary
+directory, migrated with parquet_lake.migrate_json_lake, then both are read
+the way load_raw_data reads them. The report can be written to --output as JSON.
+
+Usage:
+    python scripts/benchmark_lake.py --rows 1000000 --days 365 --channels 20
+"""
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import date, timedelta
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import write_json_lake  # noqa: E402
+from src import parquet_lake  # noqa: E402
+from src.loader import list_lake_files, read_messages  # noqa: E402
+
+
+def dir_size(base_dir: str, suffix: str) -> int:
+    total = 0
+    for root, _, files in os.walk(base_dir):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files if name.endswith(suffix))
+    return total
+
+
+def timed(label: str, func) -> Dict[str, Any]:
+    gc.collect()
+    start = time.perf_counter()
+    rows = func()
+    elapsed = time.perf_counter() - start
+    return {"scan": label, "rows": rows, "seconds": elapsed, "rows_per_s": rows / elapsed}
+
+
+def run_benchmark(rows: int, days: int, channels: int, seed: int = 42) -> Dict[str, Any]:
+    """Writes and migrates a synthetic lake, times the scans and returns the report main() prints."""
+    base_dir = tempfile.mkdtemp(prefix="lake_bench_")
+    try:
+        write_json_lake(base_dir, rows, days, channels, seed)
+
+        start = time.perf_counter()
+        parquet_lake.migrate_json_lake(base_dir)
+        migrate_s = time.perf_counter() - start
+
+        last_day = date(2024, 1, 1) + timedelta(days=days - 1)
+        week = (last_day - timedelta(days=6), last_day)
+        channel = ["@bench_channel_0"]
+
+        scans = [
+            timed("JSON, full scan (loader rows)", lambda: sum(
+                len(read_messages(path)) for path in list_lake_files(base_dir)
+            )),
+            timed("Parquet, full scan (loader rows)", lambda: sum(
+                len(parquet_lake.read_part_file(path)) for path in parquet_lake.list_part_files(base_dir)
+            )),
+            timed("Parquet, full scan (dataset rows)", lambda: sum(
+                1 for _ in parquet_lake.scan_messages(base_dir)
+            )),
+            timed("Parquet, full scan (Arrow table)", lambda: parquet_lake.lake_dataset(base_dir).to_table().num_rows),
+            timed("JSON, 1 channel x 7 days", lambda: sum(
+                len(read_messages(path)) for path in list_lake_files(base_dir, *week, channel)
+            )),
+            timed("Parquet, 1 channel x 7 days (pruned)", lambda: sum(
+                len(parquet_lake.read_part_file(path))
+                for path in parquet_lake.select_part_files(base_dir, *week, channel)
+            )),
+        ]
+        return {
+            "rows": rows,
+            "days": days,
+            "channels": channels,
+            "migrate_s": migrate_s,
+            "json_bytes": dir_size(base_dir, ".json"),
+            "parquet_bytes": dir_size(base_dir, ".parquet"),
+            "scans": scans,
+        }
+    finally:
+        shutil.rmtree(base_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    print(f"Writing a synthetic JSON lake ({args.rows:,} rows, {args.days} days x {args.channels} channels)...")
+    report = run_benchmark(args.rows, args.days, args.channels, args.seed)
+    print(f"Migrated to Parquet in {report['migrate_s']:.1f}s")
+
+    json_bytes, parquet_bytes = report["json_bytes"], report["parquet_bytes"]
+    print(f"\nSize on disk: JSON {json_bytes / 1e6:,.1f} MB, Parquet {parquet_bytes / 1e6:,.1f} MB "
+          f"({json_bytes / parquet_bytes:.1f}x smaller)\n")
+    for scan in report["scans"]:
+        print(f"{scan['scan']:<44} {scan['rows']:>10,} rows {scan['seconds']:>8.2f}s "
+              f"{scan['rows_per_s']:>12,.0f} rows/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Report endpoint latency under concurrent load, answered by Postgres versus the
+embedded DuckDB read replica.
+
+A scratch database (<POSTGRES_DB>_bench by default) is seeded with synthetic
+messages and detections as scripts/benchmark_dbt.py does and built with
+`dbt run`, then src/read_replica.py exports the marts to a snapshot in a
+temporary directory. For each backend a uvicorn server is started with the
+response cache off (API_READ_REPLICA=off or duckdb), and every report endpoint
+is loaded on its own at each --concurrency level: p50/p99 latency and
+requests/s. Results can be written to --output as JSON.
+
+Usage:
+    python scripts/benchmark_replica.py --rows 1000000 --concurrency 1 16 64 --duration 10
+"""
+import os
+import sys
+import json
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlencode
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_dbt  # noqa: E402
+from load_test_api import percentile, run_load, wait_until_up  # noqa: E402
+from api.database import DB_NAME  # noqa: E402
+
+# One INFO line per request would bury the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+BACKENDS = {"postgres": "off", "duckdb": "duckdb"}
+
+
+def report_endpoints(channel: str, message_id: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """The endpoints the replica answers; search and exports always read Postgres."""
+    return [
+        ("/api/reports/top-products", {"limit": 10}),
+        ("/api/reports/top-products", {"limit": 10, "channel": channel, "start": "2024-03-01", "end": "2024-03-31"}),
+        (f"/api/channels/{channel}/activity", {"granularity": "week"}),
+        (f"/api/channels/{channel}/growth", {"message_id": message_id, "interval": "hour"}),
+        ("/api/reports/visual-content", {"object_class": "bottle"}),
+        ("/api/reports/objects", {"group_by": ["channel", "date"], "limit": 100}),
+    ]
+
+
+def label(path: str, params: Dict[str, Any]) -> str:
+    query = urlencode({key: value for key, value in params.items() if key != "limit"}, doseq=True, safe="@")
+    return f"{path}?{query}" if query else path
+
+
+def seed(database: str, args) -> None:
+    benchmark_dbt.create_database(database)
+    engine = create_engine(benchmark_dbt.bench_url(database))
+    with engine.begin() as conn:
+        conn.execute(text(benchmark_dbt.CREATE_TABLES_SQL))
+        conn.execute(text(benchmark_dbt.CREATE_DETECTIONS_SQL))
+        benchmark_dbt.insert_messages(conn, 1, args.rows, "2024-01-01", args.days, args.channels)
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+    benchmark_dbt.dbt_run(args.project_dir, database, "--full-refresh")
+
+
+def export_snapshot(database: str, replica_dir: str) -> Dict[str, Any]:
+    from src import read_replica
+
+    read_replica.DB_URL = benchmark_dbt.bench_url(database)
+    read_replica.REPLICA_DIR = replica_dir
+    return read_replica.export_replica()
+
+
+def bench_backend(mode: str, database: str, replica_dir: str, targets, args) -> Dict[str, Dict[str, Any]]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {**os.environ, "POSTGRES_DB": database, "API_CACHE_ENABLED": "false",
+           "API_READ_REPLICA": mode, "READ_REPLICA_DIR": replica_dir}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=benchmark_dbt.BASE_DIR, env=env
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        asyncio.run(wait_until_up(base_url))
+        # Short warm-up so pool connections exist and the snapshot is open
+        asyncio.run(run_load(base_url, targets, max(args.concurrency), 1))
+        for path, params in targets:
+            results[label(path, params)] = {}
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = asyncio.run(
+                    run_load(base_url, [(path, params)], concurrency, args.duration)
+                )
+                results[label(path, params)][str(concurrency)] = {
+                    "p50_ms": percentile(latencies, 50),
+                    "p99_ms": percentile(latencies, 99),
+                    "req_per_s": len(latencies) / elapsed,
+                    "errors": errors,
+                }
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per endpoint and concurrency level")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--database", default=f"{DB_NAME}_bench")
+    parser.add_argument("--project-dir", default=os.path.join(benchmark_dbt.BASE_DIR, "medical_warehouse"))
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    replica_dir = tempfile.mkdtemp(prefix="replica_bench_")
+    results: Dict[str, Any] = {"rows": args.rows, "concurrency": args.concurrency, "backends": {}}
+    try:
+        print(f"Seeding {args.rows:,} messages over {args.days} days into {args.database}...")
+        seed(args.database, args)
+        snapshot = export_snapshot(args.database, replica_dir)
+        results["snapshot"] = {"bytes": snapshot["bytes"], "export_s": snapshot["seconds"],
+                               "tables": snapshot["tables"]}
+        print(f"Snapshot: {snapshot['bytes'] / 1e6:,.1f} MB exported in {snapshot['seconds']:.1f}s")
+
+        # A message of channel 1, so the growth curve is non-empty
+        targets = report_endpoints("@bench_channel_1", 1 + args.channels)
+        for backend in args.backends:
+            results["backends"][backend] = bench_backend(BACKENDS[backend], args.database, replica_dir, targets, args)
+    finally:
+        shutil.rmtree(replica_dir)
+        if not args.keep:
+            benchmark_dbt.drop_database(args.database)
+
+    print(f"\n{'endpoint':<62} {'clients':>7} " + " ".join(
+        f"{backend + ' p50/p99 ms':>24} {'req/s':>8}" for backend in args.backends
+    ))
+    for path, params in targets:
+        for concurrency in args.concurrency:
+            row = f"{label(path, params)[:62]:<62} {concurrency:>7} "
+            for backend in args.backends:
+                stats = results["backends"][backend][label(path, params)][str(concurrency)]
+                latency = f"{stats['p50_ms']:.1f} / {stats['p99_ms']:.1f}"
+                errors = f" ({stats['errors']} err)" if stats["errors"] else ""
+                row += f"{latency + errors:>24} {stats['req_per_s']:>8.1f} "
+            print(row.rstrip())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
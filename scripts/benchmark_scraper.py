@@ -0,0 +1,97 @@
+"""
+Benchmarks MedicalDataScraper against an in-memory stand-in for TelegramClient.
+
+Reports messages/s and images/s for several channel-concurrency and
+download-worker settings. Network latency is simulated with asyncio.sleep.
+The report can be written to --output as JSON.
+
+Usage:
+    python scripts/benchmark_scraper.py --channels 4 --messages 300 --latency 0.02
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import scraper  # noqa: E402
+from tests.fake_telegram import FakeTelegramClient  # noqa: E402
+
+
+async def run_once(channels, messages, latency, concurrency, workers, rate, flood_wait_every):
+    client = FakeTelegramClient(messages, latency, flood_wait_every=flood_wait_every)
+    instance = scraper.MedicalDataScraper(
+        client,
+        rate_limiter=scraper.TokenBucket(rate, capacity=rate),
+        download_workers=workers,
+    )
+    start = time.perf_counter()
+    await instance.scrape_channels(channels, limit=messages, concurrency=concurrency)
+    return instance.stats, time.perf_counter() - start
+
+
+# (channel concurrency, download workers)
+SETTINGS: List[Tuple[int, int]] = [(1, 1), (1, 4), (2, 4), (4, 8), (4, 16)]
+
+
+def run_benchmark(channels: int, messages: int, latency: float, rate: float = 1000,
+                  flood_wait_every: int = 0, settings: Sequence[Tuple[int, int]] = SETTINGS) -> Dict[str, Any]:
+    """
+    Scrapes `channels` fake channels once per setting, each into its own
+    temporary data directory; returns the report main() prints.
+    """
+    names = [f"@channel{i}" for i in range(channels)]
+    runs = []
+    data_dir = scraper.DATA_DIR
+    try:
+        for concurrency, workers in settings:
+            with tempfile.TemporaryDirectory() as tmp:
+                scraper.DATA_DIR = tmp
+                stats, seconds = asyncio.run(run_once(
+                    names, messages, latency, concurrency, workers, rate, flood_wait_every
+                ))
+            runs.append({
+                "concurrency": concurrency,
+                "workers": workers,
+                "seconds": seconds,
+                "messages": stats["messages"],
+                "images": stats["images"],
+                "messages_per_s": stats["messages"] / seconds,
+                "images_per_s": stats["images"] / seconds,
+            })
+    finally:
+        scraper.DATA_DIR = data_dir
+    return {"channels": channels, "messages_per_channel": messages, "latency": latency, "runs": runs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=300, help="Messages per channel")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per request")
+    parser.add_argument("--rate", type=float, default=1000, help="Token bucket requests/s")
+    parser.add_argument("--flood-wait-every", type=int, default=0,
+                        help="Raise FloodWaitError on every Nth history request (0 disables)")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.channels, args.messages, args.latency, args.rate, args.flood_wait_every)
+
+    print(f"{'channels':>8} {'workers':>8} {'seconds':>8} {'msgs/s':>10} {'images/s':>10}")
+    for run in report["runs"]:
+        print(f"{run['concurrency']:>8} {run['workers']:>8} {run['seconds']:>8.2f} "
+              f"{run['messages_per_s']:>10.1f} {run['images_per_s']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
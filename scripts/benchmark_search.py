@@ -0,0 +1,131 @@
+"""
+Compares message search latency: the old sequential ILIKE scan versus the
+indexed tsvector/pg_trgm search used by /api/search/messages.
+
+Builds a synthetic corpus in a scratch table (bench.search_messages) of a local
+Postgres, then reports p50/p99 latency for each path.
+
+Usage:
+    python scripts/benchmark_search.py --rows 1000000 --queries 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import DATABASE_URL  # noqa: E402
+
+PRODUCTS = [
+    'paracetamol', 'amoxicillin', 'ibuprofen', 'vitamin', 'omeprazole', 'metformin',
+    'cetirizine', 'sunscreen', 'moisturizer', 'serum', 'glucometer', 'thermometer',
+    'azithromycin', 'diclofenac', 'lotion', 'shampoo', 'insulin', 'syringe'
+]
+FILLER = ['available', 'now', 'original', 'best', 'quality', 'order', 'today', 'new', 'stock', 'mg', 'tablets']
+
+SETUP_SQL = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE SCHEMA IF NOT EXISTS bench;
+    DROP TABLE IF EXISTS bench.search_messages;
+    CREATE TABLE bench.search_messages AS
+    SELECT
+        g AS message_id,
+        (
+            SELECT string_agg(w, ' ')
+            FROM (
+                SELECT (:products)::text[] [1 + floor(random() * cardinality((:products)::text[]))::int] AS w
+                UNION ALL
+                SELECT (:filler)::text[] [1 + floor(random() * cardinality((:filler)::text[]))::int]
+                FROM generate_series(1, 6 + (g % 5))
+            ) words
+        ) || ' ' || (100 * (1 + g % 9))::text || 'mg' AS message_text,
+        floor(random() * 5000)::int AS view_count
+    FROM generate_series(1, :rows) g;
+"""
+
+INDEX_SQL = """
+    ALTER TABLE bench.search_messages
+        ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(message_text, ''))) STORED;
+    CREATE INDEX ON bench.search_messages USING gin (search_vector);
+    CREATE INDEX ON bench.search_messages USING gin (message_text gin_trgm_ops);
+    ANALYZE bench.search_messages;
+"""
+
+ILIKE_SQL = text("""
+    SELECT message_id, message_text, view_count
+    FROM bench.search_messages
+    WHERE message_text ILIKE :search_term
+    ORDER BY view_count DESC
+    LIMIT 20
+""")
+
+RANKED_SQL = text("""
+    WITH q AS (SELECT websearch_to_tsquery('english', :query) AS tsq)
+    SELECT message_id, message_text, view_count,
+           (ts_rank(m.search_vector, q.tsq) + word_similarity(:query, m.message_text))::float8
+               * ln(2 + m.view_count) AS score
+    FROM bench.search_messages m CROSS JOIN q
+    WHERE m.search_vector @@ q.tsq OR m.message_text ILIKE :search_term
+    ORDER BY score DESC, message_id DESC
+    LIMIT 20
+""")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def time_queries(conn, sql, terms):
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        conn.execute(sql, {"query": term, "search_term": f"%{term}%"}).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<24} p50 {percentile(timings, 50):8.2f} ms   p99 {percentile(timings, 99):8.2f} ms   "
+          f"mean {statistics.mean(timings):8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    terms = [random.choice(PRODUCTS) for _ in range(args.queries)]
+
+    engine = create_engine(DATABASE_URL)
+    with engine.begin() as conn:
+        print(f"Generating {args.rows:,} synthetic messages...")
+        conn.execute(text(SETUP_SQL), {"rows": args.rows, "products": PRODUCTS, "filler": FILLER})
+        conn.execute(text("ANALYZE bench.search_messages"))
+
+    with engine.connect() as conn:
+        # Baseline runs before any index exists, as with the old endpoint
+        report("ILIKE (seq scan)", time_queries(conn, ILIKE_SQL, terms))
+
+    with engine.begin() as conn:
+        print("Building tsvector and pg_trgm indexes...")
+        conn.execute(text(INDEX_SQL))
+
+    with engine.connect() as conn:
+        report("ranked tsvector + trgm", time_queries(conn, RANKED_SQL, terms))
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE bench.search_messages"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compares staged scrape-then-detect with streaming detection.
+
+Both modes scrape the same simulated channels (tests/fake_telegram.py's
+fake Telegram client, writing real JPEGs) and detect every image through
+DetectionStream into a scratch database:
+  staged     downloads are collected, and detection starts once the scrape is done
+  streaming  each download is published to the stream as soon as it lands
+
+Reports wall time, post-to-detection latency (the fake client stamps each
+message with the time it was read) and how long the scraper was held back by
+a full queue. --inference-ms simulates a per-image model cost instead of
+loading YOLO.
+
+Usage:
+    python scripts/benchmark_streaming.py --channels 4 --messages 200 --inference-ms 40
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_dbt  # noqa: E402
+from synthetic_data import make_photo  # noqa: E402
+from api.database import DB_NAME  # noqa: E402
+from tests.fake_telegram import FakeTelegramClient  # noqa: E402
+
+
+class ImageTelegramClient(FakeTelegramClient):
+    """Fake client whose messages are stamped 'now' and whose photos are distinct JPEGs."""
+
+    async def iter_messages(self, *args, **kwargs):
+        async for message in super().iter_messages(*args, **kwargs):
+            message.date = datetime.now(timezone.utc)
+            yield message
+
+    async def download_media(self, message, file: str):
+        await asyncio.sleep(self.latency)
+        make_photo(random.Random(file), size=(320, 320)).save(file, format='JPEG')
+        return file
+
+
+# Module level so worker processes can unpickle it
+INFERENCE_MS = 0.0
+
+
+def simulated_detect(images):
+    from src.yolo_detect import get_image_category
+
+    time.sleep(INFERENCE_MS * len(images) / 1000)
+    return [
+        {
+            'message_id': int(os.path.basename(path).split('.')[0]),
+            'channel_name': channel_name,
+            'image_path': path,
+            'detected_objects': '',
+            'detected_classes': [],
+            'avg_confidence': 0,
+            'image_category': get_image_category([]),
+            'boxes': [],
+        }
+        for channel_name, path in images
+    ]
+
+
+def stream_options(args):
+    options = {"queue_size": args.queue_size, "batch_size": args.batch_size, "workers": args.workers}
+    if args.inference_ms:
+        options.update(model_id="simulated", detect_shard=simulated_detect, initializer=None)
+    return options
+
+
+async def run_mode(mode: str, args):
+    from src import scraper
+    from src.stream_detect import DetectionStream
+
+    client = ImageTelegramClient(args.messages, args.latency)
+    channels = [f"@channel{i}" for i in range(args.channels)]
+    rate_limiter = scraper.TokenBucket(args.rate, capacity=args.rate)
+    start = time.perf_counter()
+    async with DetectionStream(**stream_options(args)) as stream:
+        if mode == "streaming":
+            instance = scraper.MedicalDataScraper(client, rate_limiter=rate_limiter, image_sink=stream.publish)
+            await instance.scrape_channels(channels, limit=args.messages)
+            scraped = time.perf_counter() - start
+        else:
+            downloaded = []
+
+            async def collect(channel_name, image_path, posted_at):
+                downloaded.append((channel_name, image_path, posted_at))
+
+            instance = scraper.MedicalDataScraper(client, rate_limiter=rate_limiter, image_sink=collect)
+            await instance.scrape_channels(channels, limit=args.messages)
+            scraped = time.perf_counter() - start
+            for item in downloaded:
+                await stream.publish(*item)
+    return stream, scraped, time.perf_counter() - start
+
+
+def main() -> None:
+    global INFERENCE_MS
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=200, help="Messages per channel")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per Telegram request")
+    parser.add_argument("--rate", type=float, default=1000, help="Token bucket requests/s")
+    parser.add_argument("--inference-ms", type=float, default=0,
+                        help="Simulated inference per image (0: run the real YOLO model)")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--database", default=f"{DB_NAME}_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+    INFERENCE_MS = args.inference_ms
+
+    # yolo_detect reads the database name when it is imported
+    os.environ["POSTGRES_DB"] = args.database
+    benchmark_dbt.create_database(args.database)
+    from src import scraper
+    from src.stream_detect import _percentile
+
+    results = []
+    try:
+        for mode in ("staged", "streaming"):
+            with tempfile.TemporaryDirectory() as tmp:
+                scraper.DATA_DIR = tmp
+                stream, scraped, total = asyncio.run(run_mode(mode, args))
+            results.append((mode, stream, scraped, total))
+            # The second mode must not be served from the first one's cache
+            benchmark_dbt.drop_database(args.database)
+            benchmark_dbt.create_database(args.database)
+    finally:
+        if not args.keep:
+            benchmark_dbt.drop_database(args.database)
+
+    print(f"\n{'mode':<10} {'images':>7} {'scrape s':>9} {'total s':>8} {'p50 post->det':>14} "
+          f"{'p95 post->det':>14} {'queue wait s':>13}")
+    for mode, stream, scraped, total in results:
+        print(f"{mode:<10} {stream.stats['published']:>7} {scraped:>9.1f} {total:>8.1f} "
+              f"{_percentile(stream.post_ages, 0.5):>13.1f}s {_percentile(stream.post_ages, 0.95):>13.1f}s "
+              f"{stream.stats['publish_wait_s']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+End-to-end pipeline benchmark over several synthetic dataset sizes.
+
+For each --sizes entry (messages), a synthetic JSON lake and image folders
+(scripts/synthetic_data.py) are written to a temporary directory and a
+scratch database (<POSTGRES_DB>_bench by default) is seeded through the real
+pipeline, then timed step by step:
+  load       load_raw_data(full_refresh=True)              rows/s
+  detection  run_detection() over the image folders         images/s
+             (--skip-detection, or no YOLO installed: synthetic detections
+             are inserted instead so the visual marts are not empty)
+  dbt        dbt run --full-refresh, then an incremental dbt run
+  api        each report endpoint on its own, with the response cache off:
+             p50/p99 latency and requests/s
+
+Results are written to --output as JSON. With --baseline, every metric is
+compared with the same size's metric in an earlier results file; the script
+exits with status 1 if any got worse by more than --tolerance (rates must not
+drop, durations and latencies must not grow).
+
+Usage:
+    python scripts/benchmark_suite.py --sizes 10000 100000 --output bench.json
+    python scripts/benchmark_suite.py --sizes 10000 100000 --baseline bench.json --output new.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark_dbt  # noqa: E402
+from load_test_api import endpoints, percentile, run_load, wait_until_up  # noqa: E402
+from synthetic_data import channel_name, write_images, write_json_lake  # noqa: E402
+from api.database import DB_NAME  # noqa: E402
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=benchmark_dbt.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_load(lake_dir: str, database: str) -> Dict[str, float]:
+    from src import loader
+
+    loader.RAW_DIR = lake_dir
+    loader.DB_URL = benchmark_dbt.bench_url(database)
+    start = time.perf_counter()
+    stats = loader.load_raw_data(full_refresh=True)
+    elapsed = time.perf_counter() - start
+    if stats is None:
+        raise RuntimeError("load_raw_data failed; see the loader log")
+    return {"load_rows": stats["rows"], "load_s": elapsed, "load_rows_per_s": stats["rows"] / elapsed}
+
+
+def bench_detection(images_dir: str, database: str) -> Dict[str, float]:
+    from src import yolo_detect
+
+    yolo_detect.IMAGES_DIR = images_dir
+    yolo_detect.DB_URL = benchmark_dbt.bench_url(database)
+    start = time.perf_counter()
+    stats = yolo_detect.run_detection()
+    elapsed = time.perf_counter() - start
+    return {
+        "detection_images": stats["images"],
+        "detection_s": elapsed,
+        "detection_images_per_s": stats["images"] / elapsed if elapsed else 0.0,
+    }
+
+
+def seed_detections(database: str) -> None:
+    """Synthetic detections for every media message, as scripts/benchmark_dbt.py seeds them."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(benchmark_dbt.bench_url(database))
+    with engine.begin() as conn:
+        conn.execute(text(benchmark_dbt.CREATE_DETECTIONS_SQL))
+        last = conn.execute(text("SELECT coalesce(max(message_id), 0) FROM raw.telegram_messages")).scalar()
+        conn.execute(text(benchmark_dbt.INSERT_DETECTIONS_SQL), {"first": 1, "last": last})
+    engine.dispose()
+
+
+def bench_api(database: str, args) -> Dict[str, Dict[str, float]]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    targets = endpoints(channel_name(0)) + [("/api/reports/objects", {})]
+    env = {**os.environ, "POSTGRES_DB": database, "API_CACHE_ENABLED": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=benchmark_dbt.BASE_DIR, env=env
+    )
+    results = {}
+    try:
+        asyncio.run(wait_until_up(base_url))
+        # Short warm-up so pool connections exist
+        asyncio.run(run_load(base_url, targets, args.concurrency, 1))
+        for path, params in targets:
+            latencies, errors, elapsed = asyncio.run(
+                run_load(base_url, [(path, params)], args.concurrency, args.duration)
+            )
+            results[path] = {
+                "p50_ms": percentile(latencies, 50),
+                "p99_ms": percentile(latencies, 99),
+                "req_per_s": len(latencies) / elapsed,
+                "errors": errors,
+            }
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def run_size(rows: int, args, detect: bool) -> Dict[str, Any]:
+    base_dir = tempfile.mkdtemp(prefix="suite_bench_")
+    benchmark_dbt.create_database(args.database)
+    try:
+        media = write_json_lake(os.path.join(base_dir, "telegram_messages"), rows, args.days,
+                                args.channels, args.seed)
+        image_count = write_images(os.path.join(base_dir, "images"), media, min(args.images, len(media)),
+                                   args.image_size, args.seed)
+        print(f"\n{rows:,} messages, {image_count:,} images ({args.image_size}px)")
+
+        result: Dict[str, Any] = bench_load(os.path.join(base_dir, "telegram_messages"), args.database)
+        print(f"  load       {result['load_rows_per_s']:>12,.0f} rows/s")
+        if detect:
+            result.update(bench_detection(os.path.join(base_dir, "images"), args.database))
+            print(f"  detection  {result['detection_images_per_s']:>12,.1f} images/s")
+        else:
+            seed_detections(args.database)
+
+        result["dbt_full_refresh_s"] = benchmark_dbt.dbt_run(args.project_dir, args.database, "--full-refresh")
+        result["dbt_incremental_s"] = benchmark_dbt.dbt_run(args.project_dir, args.database)
+        print(f"  dbt        {result['dbt_full_refresh_s']:>11.1f}s full refresh, "
+              f"{result['dbt_incremental_s']:.1f}s incremental")
+
+        result["api"] = bench_api(args.database, args)
+        for path, stats in result["api"].items():
+            print(f"  {path:<40} p50 {stats['p50_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms  "
+                  f"{stats['req_per_s']:>7.1f} req/s  {stats['errors']} errors")
+        return result
+    finally:
+        shutil.rmtree(base_dir)
+        if not args.keep:
+            benchmark_dbt.drop_database(args.database)
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def find_regressions(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Tuple[str, float, float]]:
+    """(metric, baseline, current) for every shared metric that got worse by more than tolerance."""
+    now, before = flatten(current["sizes"]), flatten(baseline["sizes"])
+    regressions = []
+    for metric in sorted(now.keys() & before.keys()):
+        old, new = before[metric], now[metric]
+        if metric.endswith("_per_s"):
+            worse = new < old * (1 - tolerance)
+        elif metric.endswith(("_s", "_ms")):
+            worse = new > old * (1 + tolerance)
+        elif metric.endswith("errors"):
+            # Counts grow with throughput, so only an endpoint that starts failing counts
+            worse = new > 0 and old == 0
+        else:
+            continue
+        if worse:
+            regressions.append((metric, old, new))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Messages per run")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--images", type=int, default=200, help="Image files per run (at most one per media message)")
+    parser.add_argument("--image-size", type=int, default=640)
+    parser.add_argument("--skip-detection", action="store_true", help="Do not run YOLO")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5, help="Seconds of load per endpoint")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--database", default=f"{DB_NAME}_bench")
+    parser.add_argument("--project-dir", default=os.path.join(benchmark_dbt.BASE_DIR, "medical_warehouse"))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the last scratch database afterwards")
+    args = parser.parse_args()
+
+    detect = not args.skip_detection
+    if detect:
+        try:
+            from src import yolo_detect  # noqa: F401
+        except ImportError as e:
+            print(f"Skipping detection ({e}); synthetic detections are inserted instead.")
+            detect = False
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "options": {"days": args.days, "channels": args.channels, "images": args.images,
+                    "image_size": args.image_size, "concurrency": args.concurrency, "duration": args.duration},
+        "sizes": {str(rows): run_size(rows, args, detect) for rows in args.sizes},
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline} "
+                  f"({baseline.get('commit')}, tolerance {args.tolerance:.0%}):")
+            for metric, old, new in regressions:
+                print(f"  {metric:<60} {old:>12,.2f} -> {new:,.2f}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} ({baseline.get('commit')}, tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
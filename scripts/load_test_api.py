@@ -0,0 +1,111 @@
+"""
+Load-tests the API in sync (psycopg2) and async (asyncpg) database modes.
+
+For each mode a uvicorn server is started against the local Postgres in .env,
+then a fixed number of concurrent clients hit the report endpoints for a set
+duration. The response cache is disabled so every request reaches Postgres.
+
+Usage:
+    python scripts/load_test_api.py --concurrency 64 --duration 20 --channel @tikvahpharma
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def endpoints(channel: str):
+    return [
+        ("/api/reports/top-products", {"limit": 10}),
+        (f"/api/channels/{channel}/activity", {}),
+        ("/api/search/messages", {"query": "paracetamol", "limit": 20}),
+        ("/api/reports/visual-content", {}),
+    ]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"API at {base_url} did not start")
+
+
+async def run_load(base_url: str, targets, concurrency: int, duration: float):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(worker: int):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            i = worker
+            while time.monotonic() < deadline:
+                path, params = targets[i % len(targets)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(w) for w in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--channel", default="@tikvahpharma")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    targets = endpoints(args.channel)
+
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in args.modes:
+        env = {**os.environ, "API_DB_MODE": mode, "API_CACHE_ENABLED": "false"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BASE_DIR, env=env
+        )
+        try:
+            asyncio.run(wait_until_up(base_url))
+            # Short warm-up so pool connections and prepared statements exist
+            asyncio.run(run_load(base_url, targets, args.concurrency, 2))
+            latencies, errors, elapsed = asyncio.run(
+                run_load(base_url, targets, args.concurrency, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"{mode:<6} {len(latencies) / elapsed:>9.1f} {percentile(latencies, 50):>8.1f} "
+              f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Synthetic data in the layouts the pipeline reads, for benchmarks.
+
+- write_json_lake: data/raw/telegram_messages/YYYY-MM-DD/<channel>.json files,
+  as MedicalDataScraper.save_data writes them
+- write_images: data/raw/images/<channel>/<message_id>.jpg for media messages
+- make_photo: one product-shot-like image (coloured boxes and ellipses)
+
+Usage:
+    python scripts/synthetic_data.py --out /tmp/synthetic --rows 100000 --images 500
+"""
+import os
+import json
+import random
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Sequence, Tuple
+
+from PIL import Image, ImageDraw
+
+WORDS = [
+    'paracetamol', 'amoxicillin', 'ibuprofen', 'vitamin', 'omeprazole', 'metformin',
+    'cetirizine', 'sunscreen', 'moisturizer', 'serum', 'glucometer', 'thermometer',
+    'available', 'original', 'quality', 'order', 'today', 'stock', 'tablets', 'delivery'
+]
+
+FIRST_DAY = date(2024, 1, 1)
+
+
+def channel_name(channel: int) -> str:
+    return f"@bench_channel_{channel}"
+
+
+def write_json_lake(base_dir: str, rows: int, days: int, channels: int, seed: int) -> List[Tuple[str, int]]:
+    """
+    Writes about `rows` messages spread evenly over days x channels partitions.
+    Every third message has a photo. Returns (image folder, message_id) for those.
+    """
+    rng = random.Random(seed)
+    per_partition = max(rows // (days * channels), 1)
+    message_id = 0
+    media = []
+    for day in range(days):
+        day_date = FIRST_DAY + timedelta(days=day)
+        date_dir = os.path.join(base_dir, day_date.isoformat())
+        os.makedirs(date_dir)
+        for channel in range(channels):
+            folder = channel_name(channel).lstrip('@')
+            items = []
+            for i in range(per_partition):
+                message_id += 1
+                posted = datetime(day_date.year, day_date.month, day_date.day, tzinfo=timezone.utc) \
+                    + timedelta(seconds=i * 86400 // per_partition)
+                has_media = message_id % 3 == 0
+                if has_media:
+                    media.append((folder, message_id))
+                items.append({
+                    "message_id": message_id,
+                    "channel_name": channel_name(channel),
+                    "channel_title": f"Bench Channel {channel}",
+                    "message_date": posted.isoformat(),
+                    "message_text": " ".join(rng.choices(WORDS, k=8)) + f" {100 * rng.randint(1, 9)}mg",
+                    "has_media": has_media,
+                    "image_path": f"data/raw/images/{folder}/{message_id}.jpg" if has_media else None,
+                    "views": rng.randint(0, 5000),
+                    "forwards": rng.randint(0, 50),
+                    "scraped_at": datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+                })
+            with open(os.path.join(date_dir, f"{folder}.json"), 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False, indent=4)
+    return media
+
+
+def make_photo(rng: random.Random, size=(800, 800)) -> Image.Image:
+    """A light background with a few coloured boxes and ellipses, like a product shot."""
+    img = Image.new('RGB', size, tuple(rng.randint(200, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(3, 7)):
+        x1, y1 = rng.randint(0, size[0] - size[0] // 4), rng.randint(0, size[1] - size[1] // 4)
+        box = (x1, y1, x1 + rng.randint(size[0] // 10, size[0] // 2), y1 + rng.randint(size[1] // 10, size[1] // 2))
+        colour = tuple(rng.randint(0, 200) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)(box, fill=colour)
+    return img
+
+
+def write_images(images_dir: str, media: Sequence[Tuple[str, int]], count: int, size: int, seed: int) -> int:
+    """Writes a distinct JPEG for the first `count` media messages. Returns the number written."""
+    rng = random.Random(seed)
+    for folder, message_id in media[:count]:
+        os.makedirs(os.path.join(images_dir, folder), exist_ok=True)
+        make_photo(rng, size=(size, size)).save(os.path.join(images_dir, folder, f"{message_id}.jpg"), quality=85)
+    return min(count, len(media))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Directory to create telegram_messages/ and images/ in")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--images", type=int, default=500, help="Image files to write (first N media messages)")
+    parser.add_argument("--image-size", type=int, default=640)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    media = write_json_lake(os.path.join(args.out, "telegram_messages"), args.rows, args.days,
+                            args.channels, args.seed)
+    images = write_images(os.path.join(args.out, "images"), media, args.images, args.image_size, args.seed)
+    print(f"Wrote ~{args.rows:,} messages and {images:,} images under {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import io
+import time
+import logging
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+try:
+    from .instrumentation import RssSampler
+except ImportError:  # imported from a script run inside src/
+    from instrumentation import RssSampler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Escapes for PostgreSQL's COPY text format
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+@dataclass
+class IngestStats:
+    """Throughput and memory figures for one bulk load."""
+    table: str
+    rows: int
+    seconds: float
+    # How far RSS rose above its level at the start of the load, sampled while it ran
+    rss_growth_mb: float
+    # Rows inserted or updated by an upsert's merge (None for a plain COPY)
+    changed: Optional[int] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        changed = f", {self.changed} changed" if self.changed is not None else ""
+        return (f"{self.table}: {self.rows} rows{changed} in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s, RSS +{self.rss_growth_mb:.1f} MB)")
+
+
+def format_value(value: Any) -> str:
+    """Renders one Python value as a COPY text-format field."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        # PostgreSQL array literal, e.g. {"person","bottle"}
+        items = ('"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"' for v in value)
+        value = '{' + ','.join(items) + '}'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _chunks(records: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_records(
+    connection: Connection,
+    table: str,
+    columns: Sequence[str],
+    records: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> IngestStats:
+    """
+    Streams records into a table with COPY FROM STDIN, one chunk at a time.
+
+    Only a single chunk is ever held in memory, so records should be produced
+    lazily by a generator.
+
+    Args:
+        connection (Connection): An open SQLAlchemy connection on a psycopg2 engine.
+        table (str): Target table, schema-qualified.
+        columns (Sequence[str]): Columns to fill, in order; read from each record by key.
+        records (Iterable[Dict[str, Any]]): The rows to load.
+        chunk_size (int): Rows per COPY statement.
+
+    Returns:
+        IngestStats: Row count, elapsed time and RSS growth of the load.
+    """
+    start = time.perf_counter()
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    cursor = connection.connection.cursor()
+    total = 0
+
+    try:
+        with RssSampler() as rss:
+            for chunk in _chunks(records, chunk_size):
+                buffer = io.StringIO()
+                for record in chunk:
+                    buffer.write('\t'.join(format_value(record.get(col)) for col in columns))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                total += len(chunk)
+    finally:
+        cursor.close()
+
+    stats = IngestStats(table, total, time.perf_counter() - start, rss.growth_mb)
+    logger.info(f"COPY {stats}")
+    return stats
+
+
+def upsert_records(
+    connection: Connection,
+    table: str,
+    columns: Sequence[str],
+    key_columns: Sequence[str],
+    records: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compare_columns: Optional[Sequence[str]] = None,
+    before_merge: Optional[Callable[[Connection, str], None]] = None
+) -> IngestStats:
+    """
+    Streams records into a temporary staging table with COPY, then merges
+    them into the target with INSERT ... ON CONFLICT on key_columns.
+
+    When a key appears more than once in the stream, the last record wins.
+    With compare_columns, an existing row is only rewritten when one of those
+    columns differs. before_merge is called with the staging table's name
+    while the target still holds the old values.
+    """
+    stage = f"_stage_{table.replace('.', '_')}"
+    connection.execute(text(
+        f"CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    stats = copy_records(connection, stage, columns, records, chunk_size)
+
+    start = time.perf_counter()
+    if before_merge:
+        before_merge(connection, stage)
+    col_list = ', '.join(columns)
+    key_list = ', '.join(key_columns)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns if c not in key_columns)
+    on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    if updates and compare_columns:
+        on_conflict += (f" WHERE ({', '.join(f'target.{c}' for c in compare_columns)})"
+                        f" IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in compare_columns)})")
+    changed = connection.execute(text(f"""
+        INSERT INTO {table} AS target ({col_list})
+        SELECT DISTINCT ON ({key_list}) {col_list}
+        FROM {stage}
+        ORDER BY {key_list}, ctid DESC
+        ON CONFLICT ({key_list}) {on_conflict}
+    """)).rowcount
+    connection.execute(text(f"DROP TABLE {stage}"))
+
+    stats.table = table
+    stats.changed = changed
+    stats.seconds += time.perf_counter() - start
+    return stats
@@ -0,0 +1,67 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Persists per-channel scrape progress in a small JSON file.
+
+    For each channel it records:
+    - last_message_id: newest message already saved (incremental scrapes resume above it)
+    - backfill_offset_id: oldest message already saved (backfill pages below it)
+    - backfill_complete: whether backfill has reached the start of the channel
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._state: Dict[str, Dict[str, Any]] = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Ignoring unreadable checkpoint file {self.path}: {e}")
+            return {}
+
+    def _write(self) -> None:
+        # Write-then-rename so an interrupted run never leaves a truncated file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, channel: str) -> Dict[str, Any]:
+        """Returns the checkpoint for a channel (empty dict if never scraped)."""
+        return dict(self._state.get(channel, {}))
+
+    def last_message_id(self, channel: str) -> Optional[int]:
+        return self._state.get(channel, {}).get('last_message_id')
+
+    def backfill_offset_id(self, channel: str) -> Optional[int]:
+        return self._state.get(channel, {}).get('backfill_offset_id')
+
+    def update(self, channel: str, **fields: Any) -> None:
+        """Merges fields into a channel's checkpoint and saves the file."""
+        entry = self._state.setdefault(channel, {})
+        entry.update(fields)
+        entry['updated_at'] = datetime.now().isoformat()
+        self._write()
+
+    def record_messages(self, channel: str, min_id: int, max_id: int) -> None:
+        """Widens a channel's saved id range to include [min_id, max_id]."""
+        entry = self._state.get(channel, {})
+        last = entry.get('last_message_id')
+        oldest = entry.get('backfill_offset_id')
+        self.update(
+            channel,
+            last_message_id=max(max_id, last) if last is not None else max_id,
+            backfill_offset_id=min(min_id, oldest) if oldest is not None else min_id
+        )
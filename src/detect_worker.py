@@ -0,0 +1,278 @@
+import os
+import time
+import socket
+import logging
+import secrets
+import argparse
+import ipaddress
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from . import inference_backends, yolo_detect
+except ImportError:  # executed as a script from src/
+    import inference_backends
+    import yolo_detect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = '127.0.0.1:6011'
+# Clients must present the same key, since the worker unpickles what they send.
+# Without YOLO_WORKER_AUTHKEY the worker only listens on loopback, with a random
+# key written to AUTHKEY_FILE (mode 0600) for local clients to read.
+AUTHKEY = os.getenv('YOLO_WORKER_AUTHKEY', '')
+AUTHKEY_FILE = os.getenv(
+    'YOLO_WORKER_AUTHKEY_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'detect_worker.key')
+)
+
+
+def parse_address(address: Optional[str]) -> Tuple[str, int]:
+    host, _, port = (address or yolo_detect.WORKER_ADDRESS or DEFAULT_ADDRESS).rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def server_authkey(host: str) -> bytes:
+    """
+    YOLO_WORKER_AUTHKEY, or for a loopback host a fresh random key, written to
+    AUTHKEY_FILE so only this user's local clients can read it.
+    """
+    if AUTHKEY:
+        return AUTHKEY.encode()
+    if not is_loopback(host):
+        raise ValueError(f"Refusing to listen on {host} without YOLO_WORKER_AUTHKEY set")
+    key = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(AUTHKEY_FILE), exist_ok=True)
+    tmp_path = f"{AUTHKEY_FILE}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(key)
+    os.replace(tmp_path, AUTHKEY_FILE)
+    return key.encode()
+
+
+def client_authkey() -> bytes:
+    """YOLO_WORKER_AUTHKEY, or the key a local worker wrote to AUTHKEY_FILE."""
+    if AUTHKEY:
+        return AUTHKEY.encode()
+    try:
+        with open(AUTHKEY_FILE, encoding='utf-8') as f:
+            return f.read().strip().encode()
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"No YOLO_WORKER_AUTHKEY set and no key file at {AUTHKEY_FILE}; is the detection worker running?"
+        ) from None
+
+
+class DetectionWorker:
+    """
+    Keeps YOLO loaded between pipeline runs.
+
+    A pool of `workers` processes loads the model once at startup; clients
+    (run_detection with YOLO_WORKER_ADDRESS set) connect over a local socket
+    and submit shards of (channel_name, image_path), which are inferred with
+    yolo_detect.detect_images exactly as in-process runs are. Each connection
+    is served by its own thread, so up to `workers` shards run at once.
+    """
+    def __init__(self, address: Optional[str] = None, workers: int = yolo_detect.WORKERS):
+        self.address = parse_address(address)
+        self.workers = max(1, workers)
+        self.authkey = server_authkey(self.address[0])
+        self.model_id: Optional[str] = None
+        self.stats = {"jobs": 0, "images": 0, "busy_s": 0.0}
+        self.started_at = time.monotonic()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def serve_forever(self) -> None:
+        weights = yolo_detect.inference_weights()
+        self.model_id = yolo_detect.get_model_id()
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=yolo_detect._init_worker,
+            initargs=(weights, torch_threads, yolo_detect.IMGSZ)
+        ) as self._executor:
+            # Start every process, and so load every model, before taking jobs
+            list(self._executor.map(yolo_detect._detect_shard, [[]] * self.workers))
+            logger.info(f"Detection worker for {self.model_id} listening on {self.address[0]}:{self.address[1]} "
+                        f"({self.workers} processes)")
+            with Listener(self.address, authkey=self.authkey) as listener:
+                while not self._stopping.is_set():
+                    try:
+                        conn = listener.accept()
+                    except AuthenticationError:
+                        logger.warning("Rejected a connection with the wrong authkey")
+                        continue
+                    if self._stopping.is_set():
+                        conn.close()
+                        break
+                    threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+        logger.info(f"Detection worker stopped after {self.stats['jobs']} jobs, {self.stats['images']} images")
+
+    def _serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+                try:
+                    conn.send(self._handle(request))
+                except Exception as e:
+                    logger.error(f"Request {request.get('op')!r} failed: {e}")
+                    conn.send({"error": str(e)})
+                if request.get("op") == "stop":
+                    # Wakes the accept() in serve_forever so it sees the flag
+                    Client(self.address, authkey=self.authkey).close()
+                    return
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "detect":
+            start = time.perf_counter()
+            records = self._executor.submit(yolo_detect._detect_shard, request["images"]).result()
+            with self._lock:
+                self.stats["jobs"] += 1
+                self.stats["images"] += len(records)
+                self.stats["busy_s"] += time.perf_counter() - start
+            return {"records": records}
+        if op == "info":
+            return {
+                "model_id": self.model_id,
+                "backend": yolo_detect.BACKEND,
+                "int8": yolo_detect.INT8,
+                "imgsz": yolo_detect.IMGSZ,
+                "workers": self.workers,
+                "uptime_s": time.monotonic() - self.started_at,
+                **self.stats,
+            }
+        if op == "stop":
+            self._stopping.set()
+            return {"stopping": True}
+        raise ValueError(f"unknown op {op!r}")
+
+
+class DetectionClient:
+    """One connection to a running DetectionWorker; requests on it are answered in order."""
+    def __init__(self, address: Optional[str] = None):
+        self.conn = Client(parse_address(address), authkey=client_authkey())
+
+    def __enter__(self) -> "DetectionClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _call(self, op: str, **params: Any) -> Dict[str, Any]:
+        self.conn.send({"op": op, **params})
+        response = self.conn.recv()
+        if "error" in response:
+            raise RuntimeError(f"Detection worker: {response['error']}")
+        return response
+
+    def info(self) -> Dict[str, Any]:
+        return self._call("info")
+
+    def detect(self, images: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        return self._call("detect", images=images)["records"]
+
+    def stop(self) -> None:
+        self._call("stop")
+
+
+def _detect_on(client: DetectionClient, shard: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    # The worker may run from another directory; records come back under the caller's paths
+    paths = {os.path.abspath(path): path for _, path in shard}
+    records = client.detect([(channel_name, os.path.abspath(path)) for channel_name, path in shard])
+    for record in records:
+        record["image_path"] = paths[record["image_path"]]
+    return records
+
+
+def detect_remote(shard: List[Tuple[str, str]], address: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Infers one shard of (channel_name, image_path) pairs on the worker, over a connection of its own."""
+    with DetectionClient(address) as client:
+        return _detect_on(client, shard)
+
+
+def iter_remote_detections(
+    images: List[Tuple[str, str]], shard_size: int, address: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields detection records for (channel_name, image_path) pairs inferred by
+    the worker, keeping one shard in flight per worker process.
+    """
+    with DetectionClient(address) as client:
+        in_flight = client.info()["workers"]
+
+    local, clients = threading.local(), []
+
+    def detect(shard: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        if not hasattr(local, "client"):
+            local.client = DetectionClient(address)
+            clients.append(local.client)
+        return _detect_on(local.client, shard)
+
+    shards = [images[i:i + shard_size] for i in range(0, len(images), shard_size)]
+    try:
+        with ThreadPoolExecutor(max_workers=in_flight) as pool:
+            for records in pool.map(detect, shards):
+                yield from records
+    finally:
+        for client in clients:
+            client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resident YOLO detection worker.")
+    parser.add_argument("command", choices=["serve", "info", "stop"])
+    parser.add_argument("--address", default=None,
+                        help=f"host:port (default: YOLO_WORKER_ADDRESS or {DEFAULT_ADDRESS})")
+    parser.add_argument("--workers", type=int, default=yolo_detect.WORKERS, help="Model processes (serve)")
+    parser.add_argument("--backend", choices=inference_backends.BACKENDS, default=yolo_detect.BACKEND)
+    parser.add_argument("--int8", action="store_true", default=yolo_detect.INT8)
+    parser.add_argument("--imgsz", type=int, default=yolo_detect.IMGSZ)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == "serve":
+        try:
+            inference_backends.validate(args.backend, args.int8)
+        except ValueError as e:
+            parser.error(str(e))
+        yolo_detect.BACKEND, yolo_detect.INT8, yolo_detect.IMGSZ = args.backend, args.int8, args.imgsz
+        try:
+            worker = DetectionWorker(args.address, args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+        worker.serve_forever()
+        return
+
+    with DetectionClient(args.address) as client:
+        if args.command == "info":
+            for key, value in client.info().items():
+                print(f"{key}: {value}")
+        else:
+            client.stop()
+            print("Detection worker stopping.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import logging
+import argparse
+from datetime import date
+from typing import List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DB_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
+         f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
+
+# Set ENGAGEMENT_CAPTURE=0 to load messages without recording view/forward history
+CAPTURE_ENABLED = os.getenv('ENGAGEMENT_CAPTURE', '1') != '0'
+
+CREATE_ENGAGEMENT_SQL = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    -- One row per message per observed change: the views/forwards gained since the
+    -- previous capture (the full counts on a message's first capture). Summing a
+    -- message's deltas in captured_at order gives its growth curve.
+    CREATE TABLE IF NOT EXISTS raw.engagement_deltas (
+        channel_name text NOT NULL,
+        message_id bigint NOT NULL,
+        captured_at timestamptz NOT NULL,
+        views_delta integer NOT NULL,
+        forwards_delta integer NOT NULL,
+        PRIMARY KEY (channel_name, message_id, captured_at)
+    ) PARTITION BY RANGE (captured_at);
+
+    -- The last captured counts per message, which new scrapes are compared with.
+    -- Kept apart from raw.telegram_messages so a full refresh does not reset history.
+    CREATE TABLE IF NOT EXISTS raw.engagement_state (
+        channel_name text NOT NULL,
+        message_id bigint NOT NULL,
+        views integer NOT NULL,
+        forwards integer NOT NULL,
+        captured_at timestamptz NOT NULL,
+        PRIMARY KEY (channel_name, message_id)
+    );
+"""
+
+# The latest observation of each staged message, kept only when it is newer than
+# the stored state and its counts differ (or the message was never captured)
+CAPTURE_SQL = """
+    WITH observed AS (
+        SELECT DISTINCT ON (channel_name, message_id)
+            channel_name, message_id,
+            coalesce(views, 0) AS views,
+            coalesce(forwards, 0) AS forwards,
+            coalesce(scraped_at, now()) AS captured_at
+        FROM {stage}
+        ORDER BY channel_name, message_id, scraped_at DESC NULLS LAST
+    ),
+    changed AS (
+        SELECT o.*, coalesce(s.views, 0) AS previous_views, coalesce(s.forwards, 0) AS previous_forwards
+        FROM observed o
+        LEFT JOIN raw.engagement_state s USING (channel_name, message_id)
+        WHERE s.message_id IS NULL
+           OR (o.captured_at > s.captured_at AND (o.views, o.forwards) IS DISTINCT FROM (s.views, s.forwards))
+    ),
+    deltas AS (
+        INSERT INTO raw.engagement_deltas (channel_name, message_id, captured_at, views_delta, forwards_delta)
+        SELECT channel_name, message_id, captured_at, views - previous_views, forwards - previous_forwards
+        FROM changed
+        ON CONFLICT DO NOTHING
+    )
+    INSERT INTO raw.engagement_state (channel_name, message_id, views, forwards, captured_at)
+    SELECT channel_name, message_id, views, forwards, captured_at FROM changed
+    ON CONFLICT (channel_name, message_id) DO UPDATE SET
+        views = EXCLUDED.views,
+        forwards = EXCLUDED.forwards,
+        captured_at = EXCLUDED.captured_at
+"""
+
+
+def ensure_tables(connection: Connection) -> None:
+    connection.execute(text(CREATE_ENGAGEMENT_SQL))
+
+
+def partition_name(month: date) -> str:
+    return f"raw.engagement_deltas_{month:%Y_%m}"
+
+
+def ensure_partitions(connection: Connection, months: List[date]) -> None:
+    """Creates the monthly (UTC) partitions of raw.engagement_deltas that captures will land in."""
+    for month in months:
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        # Explicit UTC offsets: bare dates would be read in the session TimeZone and leave
+        # rows near a month boundary outside every partition
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF raw.engagement_deltas "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{next_month.isoformat()} 00:00+00')"
+        ))
+
+
+def capture_engagement(connection: Connection, stage: str) -> int:
+    """
+    Appends a delta row for every staged message whose views or forwards
+    changed since its last capture, and returns how many there were.
+
+    `stage` holds freshly scraped raw.telegram_messages rows (upsert_records
+    calls this before merging them). Unchanged messages write nothing, so
+    history grows with actual changes rather than with corpus size x scrapes.
+    """
+    ensure_tables(connection)
+    months = connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', coalesce(scraped_at, now()) AT TIME ZONE 'UTC')::date FROM {stage}"
+    )).scalars().all()
+    ensure_partitions(connection, months)
+    changed = connection.execute(text(CAPTURE_SQL.format(stage=stage))).rowcount
+    logger.info(f"Captured engagement changes for {changed} messages.")
+    return changed
+
+
+def log_stats() -> None:
+    """Logs delta rows and on-disk size per partition."""
+    engine = create_engine(DB_URL)
+    with engine.begin() as connection:
+        ensure_tables(connection)
+        rows = connection.execute(text("""
+            SELECT c.relname AS partition, c.reltuples::bigint AS approx_rows,
+                   pg_total_relation_size(c.oid) AS bytes
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'raw.engagement_deltas'::regclass
+            ORDER BY c.relname
+        """)).all()
+        tracked = connection.execute(text("SELECT count(*) FROM raw.engagement_state")).scalar()
+    engine.dispose()
+    for row in rows:
+        logger.info(f"{row.partition}: ~{max(row.approx_rows, 0):,} deltas, {row.bytes / 1e6:,.1f} MB")
+    logger.info(f"{tracked:,} messages tracked, {sum(row.bytes for row in rows) / 1e6:,.1f} MB of history.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="View/forward history captured by load_raw_data.")
+    parser.add_argument("command", choices=["stats"])
+    parser.parse_args()
+    log_stats()
@@ -0,0 +1,318 @@
+import os
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, 'data', 'raw', 'image_store')
+IMAGES_DIR = os.path.join(BASE_DIR, 'data', 'raw', 'images')
+
+# Set IMAGE_DEDUP=0 to save every download as its own file, as before
+DEDUP_ENABLED = os.getenv('IMAGE_DEDUP', '1') != '0'
+# Two images are near-duplicates when both their pHash and dHash differ in at most
+# this many of 64 bits; 0 only merges byte-identical files
+MAX_DISTANCE = int(os.getenv('IMAGE_DEDUP_MAX_DISTANCE', '4'))
+
+HASH_BITS = 64
+
+
+def file_sha256(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    # Orthonormal DCT-II basis, so DCT(x) = M @ x @ M.T
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def perceptual_hashes(path: str) -> Tuple[int, int]:
+    """
+    Returns the 64-bit (pHash, dHash) of an image.
+
+    pHash keeps the signs of the lowest 8x8 DCT frequencies of a 32x32
+    grayscale thumbnail relative to their median; dHash compares neighbouring
+    pixels of a 9x8 thumbnail. Both survive re-encoding and resizing.
+    """
+    with Image.open(path) as img:
+        # JPEGs are decoded at 1/2..1/8 scale straight from the DCT coefficients
+        img.draft('L', (128, 128))
+        gray = img.convert('L')
+
+    thumb = np.asarray(gray.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT32 @ thumb @ _DCT32.T)[:8, :8].flatten()
+    phash = _bits_to_int(low > np.median(low[1:]))
+
+    strip = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    dhash = _bits_to_int((strip[:, 1:] > strip[:, :-1]).flatten())
+    return phash, dhash
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    Multi-index hashing over 64-bit hashes.
+
+    The hash is cut into max_distance + 1 bands. Two hashes within
+    max_distance bits must agree exactly on at least one band (pigeonhole),
+    so a lookup only compares against entries sharing a band value instead
+    of scanning every stored hash.
+    """
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = [round(i * HASH_BITS / bands) for i in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self._buckets: Dict[Tuple[int, int], List[str]] = {}
+        self._hashes: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _keys(self, phash: int) -> Iterator[Tuple[int, int]]:
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (phash >> shift) & mask
+
+    def add(self, key: str, phash: int, dhash: int) -> None:
+        self._hashes[key] = (phash, dhash)
+        for bucket in self._keys(phash):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def find(self, phash: int, dhash: int) -> Optional[str]:
+        """The closest stored key within max_distance on both hashes, or None."""
+        best, best_distance = None, None
+        seen: Set[str] = set()
+        for bucket in self._keys(phash):
+            for key in self._buckets.get(bucket, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                other_phash, other_dhash = self._hashes[key]
+                p_distance = hamming(phash, other_phash)
+                if p_distance > self.max_distance or hamming(dhash, other_dhash) > self.max_distance:
+                    continue
+                if best_distance is None or p_distance < best_distance:
+                    best, best_distance = key, p_distance
+        return best
+
+
+@dataclass
+class StoredImage:
+    path: str
+    sha256: str
+    # 'new' (first copy, now the canonical blob), 'exact' (same bytes) or 'near'
+    match: str
+
+
+class ImageStore:
+    """
+    Content-addressed image store with near-duplicate detection.
+
+    Each distinct image is kept once as blobs/<sha[:2]>/<sha>.<ext>. A
+    message's image path (images/<channel>/<message_id>.jpg) becomes a hard
+    link to its canonical blob, so existing readers keep working and every
+    copy hashes to the canonical SHA-256, the key YOLO results are cached
+    under. Byte-identical copies match by SHA-256; re-encoded or resized
+    reposts match by pHash/dHash through a NearDuplicateIndex.
+
+    State is an append-only JSON-lines log (index.jsonl) replayed on start.
+    """
+    def __init__(self, store_dir: str = STORE_DIR, max_distance: int = MAX_DISTANCE):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, 'index.jsonl')
+        self.near = NearDuplicateIndex(max_distance)
+        # sha256 of every file seen -> canonical sha256 (itself for blobs)
+        self.canonical: Dict[str, str] = {}
+        self.blobs: Dict[str, str] = {}
+        self.links: Dict[str, dict] = {}
+        self.photos: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._replay()
+
+    def _replay(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.error(f"Ignoring bad line {line_no} of {self.index_path}: {e}")
+
+    def _apply(self, entry: dict) -> None:
+        if 'path' in entry:
+            self.links[entry['path']] = entry
+            if entry.get('photo_id') is not None:
+                self.photos[str(entry['photo_id'])] = entry['sha256']
+            return
+        self.canonical[entry['sha256']] = entry['canonical']
+        if entry.get('blob'):
+            self.blobs[entry['sha256']] = entry['blob']
+            if entry.get('phash') is not None:
+                self.near.add(entry['sha256'], int(entry['phash'], 16), int(entry['dhash'], 16))
+
+    def _log(self, entry: dict) -> None:
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        self._apply(entry)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.store_dir, self.blobs[sha256])
+
+    def _link(self, blob: str, link_path: str) -> None:
+        os.makedirs(os.path.dirname(link_path), exist_ok=True)
+        tmp_path = f"{link_path}.link.tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        os.link(blob, tmp_path)
+        os.replace(tmp_path, link_path)
+
+    def link_photo(self, photo_id, link_path: str) -> Optional[StoredImage]:
+        """
+        Links link_path to the image already stored for a Telegram photo id
+        (forwards share it), so the download can be skipped. None if unknown.
+        """
+        with self._lock:
+            sha256 = self.photos.get(str(photo_id))
+            if sha256 is None or sha256 not in self.blobs:
+                return None
+            self._link(self.blob_path(sha256), link_path)
+            self._log({'path': self._rel(link_path), 'sha256': sha256, 'photo_id': photo_id,
+                       'match': 'exact', 'size': os.path.getsize(link_path)})
+            return StoredImage(link_path, sha256, 'exact')
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), os.path.dirname(self.store_dir))
+
+    def add(self, src_path: str, link_path: Optional[str] = None, photo_id=None) -> StoredImage:
+        """
+        Stores the image at src_path (a fresh download) and replaces link_path
+        (default: src_path) with a hard link to its canonical blob.
+        """
+        link_path = link_path or src_path
+        size = os.path.getsize(src_path)
+        sha256 = file_sha256(src_path)
+
+        with self._lock:
+            canonical = self.canonical.get(sha256)
+            match = 'exact'
+            if canonical is None:
+                try:
+                    phash, dhash = perceptual_hashes(src_path)
+                except (OSError, UnidentifiedImageError, ValueError) as e:
+                    # Still stored and deduplicated by content, just not perceptually
+                    logger.warning(f"Could not compute perceptual hash of {src_path}: {e}")
+                    phash = dhash = None
+                near = self.near.find(phash, dhash) if phash is not None else None
+                if near is not None:
+                    canonical, match = near, 'near'
+                    self._log({'sha256': sha256, 'canonical': near})
+                else:
+                    canonical, match = sha256, 'new'
+                    ext = os.path.splitext(link_path)[1].lower() or '.jpg'
+                    blob = os.path.join('blobs', sha256[:2], f"{sha256}{ext}")
+                    os.makedirs(os.path.dirname(os.path.join(self.store_dir, blob)), exist_ok=True)
+                    os.replace(src_path, os.path.join(self.store_dir, blob))
+                    self._log({
+                        'sha256': sha256, 'canonical': sha256, 'blob': blob,
+                        'phash': f"{phash:016x}" if phash is not None else None,
+                        'dhash': f"{dhash:016x}" if dhash is not None else None,
+                    })
+
+            self._link(self.blob_path(canonical), link_path)
+            if os.path.exists(src_path) and not os.path.samefile(src_path, link_path):
+                os.remove(src_path)
+            self._log({'path': self._rel(link_path), 'sha256': canonical, 'photo_id': photo_id,
+                       'match': match, 'size': size})
+        return StoredImage(link_path, canonical, match)
+
+    def is_linked(self, path: str) -> bool:
+        entry = self.links.get(self._rel(path))
+        return (
+            entry is not None and entry['sha256'] in self.blobs
+            and os.path.exists(path) and os.path.samefile(path, self.blob_path(entry['sha256']))
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Linked images, distinct blobs, dedup ratio and bytes saved."""
+        matches = [entry['match'] for entry in self.links.values()]
+        linked_bytes = sum(entry.get('size', 0) for entry in self.links.values())
+        blob_bytes = sum(
+            os.path.getsize(os.path.join(self.store_dir, blob)) for blob in self.blobs.values()
+            if os.path.exists(os.path.join(self.store_dir, blob))
+        )
+        images, blobs = len(matches), len(self.blobs)
+        return {
+            'images': images,
+            'blobs': blobs,
+            'exact_duplicates': matches.count('exact'),
+            'near_duplicates': matches.count('near'),
+            'dedup_ratio': images / blobs if blobs else 1.0,
+            'bytes_saved': max(linked_bytes - blob_bytes, 0),
+        }
+
+
+def dedupe_images(store: ImageStore, images_dir: str = IMAGES_DIR) -> Dict[str, float]:
+    """Moves every not-yet-stored image under images_dir into the store, in place."""
+    for channel_name in sorted(os.listdir(images_dir)):
+        channel_path = os.path.join(images_dir, channel_name)
+        if not os.path.isdir(channel_path):
+            continue
+        for filename in sorted(os.listdir(channel_path)):
+            path = os.path.join(channel_path, filename)
+            if filename.endswith(('.jpg', '.png', '.jpeg')) and not store.is_linked(path):
+                store.add(path)
+    return store.stats()
+
+
+def log_stats(stats: Dict[str, float]) -> None:
+    logger.info(
+        f"{stats['images']} images -> {stats['blobs']} stored "
+        f"({stats['exact_duplicates']} exact, {stats['near_duplicates']} near duplicates; "
+        f"dedup ratio {stats['dedup_ratio']:.2f}x, {stats['bytes_saved'] / 1e6:.1f} MB saved)"
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Maintain the content-addressed image store.")
+    parser.add_argument("command", choices=["dedupe", "stats"],
+                        help="dedupe: store and link every image already downloaded; stats: report only.")
+    parser.add_argument("--images-dir", default=IMAGES_DIR)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE)
+    args = parser.parse_args()
+
+    image_store = ImageStore(args.store_dir, args.max_distance)
+    if args.command == "dedupe":
+        log_stats(dedupe_images(image_store, args.images_dir))
+    else:
+        log_stats(image_store.stats())
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+
+from ultralytics import YOLO
+
+# pytorch runs the .pt weights eagerly; onnx (ONNX Runtime) and openvino load
+# a copy exported once per weights/imgsz/int8 combination into EXPORT_DIR
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+BACKEND = os.getenv('YOLO_BACKEND', 'pytorch').lower()
+# int8 weights: dynamic quantization for ONNX Runtime, NNCF post-training quantization for OpenVINO
+INT8 = os.getenv('YOLO_INT8', 'false').lower() == 'true'
+# Calibration images for OpenVINO int8, as an ultralytics dataset YAML
+INT8_DATA = os.getenv('YOLO_INT8_DATA', 'coco8.yaml')
+EXPORT_DIR = os.getenv('YOLO_EXPORT_DIR', os.path.join('data', 'models'))
+
+DEFAULT_IMGSZ = 640
+
+
+def validate(backend: str, int8: bool) -> None:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown YOLO backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if int8 and backend == 'pytorch':
+        raise ValueError("int8 inference needs the onnx or openvino backend")
+
+
+def variant_name(backend: str, imgsz: int, int8: bool) -> str:
+    """
+    Suffix that tells a backend's results apart in the detection cache, e.g.
+    '+onnx-int8@640'. Empty for eager PyTorch at the default size, so results
+    cached before backends were selectable stay valid.
+    """
+    if backend == 'pytorch' and imgsz == DEFAULT_IMGSZ and not int8:
+        return ''
+    return f"+{backend}{'-int8' if int8 else ''}@{imgsz}"
+
+
+def _exported_model(export_dir: str) -> str:
+    for name in sorted(os.listdir(export_dir)):
+        if name.endswith('.onnx') or name.endswith('_openvino_model'):
+            return os.path.join(export_dir, name)
+    raise FileNotFoundError(f"No exported model in {export_dir}")
+
+
+def _quantize_onnx(path: str) -> None:
+    """Replaces an ONNX model with a dynamically quantized (uint8 weights) copy."""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = path + '.int8'
+    # ONNX Runtime's ConvInteger kernel only takes uint8 weights
+    quantize_dynamic(path, quantized, weight_type=QuantType.QUInt8)
+    # ultralytics reads the class names, stride and imgsz from the model metadata
+    model = onnx.load(quantized)
+    del model.metadata_props[:]
+    model.metadata_props.extend(onnx.load(path).metadata_props)
+    onnx.save(model, path)
+    os.remove(quantized)
+
+
+def export_weights(model_path: str, weights_hash: str, backend: str, imgsz: int, int8: bool) -> str:
+    """
+    The path YOLO() should load for a backend: the .pt weights themselves for
+    pytorch, otherwise a model exported under EXPORT_DIR on first use and
+    reused by later runs.
+    """
+    validate(backend, int8)
+    if backend == 'pytorch':
+        return model_path
+
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    target = os.path.join(EXPORT_DIR, f"{stem}-{weights_hash[:16]}-{backend}-{imgsz}{'-int8' if int8 else ''}")
+    if os.path.isdir(target):
+        return _exported_model(target)
+
+    # ultralytics exports next to the weights, so export a copy in a scratch
+    # directory and rename it into place once complete
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f".{stem}-", dir=EXPORT_DIR)
+    try:
+        weights = shutil.copy2(model_path, work_dir)
+        print(f"Exporting {model_path} for {backend}{' int8' if int8 else ''} at imgsz {imgsz}...")
+        if backend == 'onnx':
+            exported = YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True)
+            if int8:
+                _quantize_onnx(exported)
+        else:
+            options = {'int8': True, 'data': INT8_DATA} if int8 else {}
+            YOLO(weights).export(format='openvino', imgsz=imgsz, dynamic=True, **options)
+        os.remove(weights)
+        try:
+            os.rename(work_dir, target)
+        except OSError:
+            # Another process finished the same export first
+            if not os.path.isdir(target):
+                raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return _exported_model(target)
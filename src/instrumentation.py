@@ -0,0 +1,415 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import cProfile
+import logging
+import argparse
+import resource
+import functools
+import statistics
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run reports are written here as <name>-<run_id>.json and appended to history.jsonl;
+# set RUN_REPORT_DIR= (empty) to only log them
+REPORT_DIR = os.getenv('RUN_REPORT_DIR', os.path.join(BASE_DIR, 'logs', 'run_reports'))
+# "cprofile" writes a .prof per run (main thread only); "sample" samples every
+# thread's stack like py-spy and writes collapsed stacks (.folded) for flamegraph.pl or speedscope
+PROFILE = os.getenv('PIPELINE_PROFILE', '').lower()
+PROFILE_INTERVAL = float(os.getenv('PIPELINE_PROFILE_INTERVAL', '0.01'))
+# How often stages and loads sample the process's RSS for their peak and growth
+RSS_SAMPLE_INTERVAL = float(os.getenv('PIPELINE_RSS_INTERVAL', '0.05'))
+
+PROFILERS = ('cprofile', 'sample')
+
+# Stages timed below this are not flagged by `trends`; their run-to-run jitter outweighs any change
+MIN_COMPARED_SECONDS = 0.5
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """
+    Returns the lifetime peak resident set size in MB of this process, or with
+    `children` of its largest terminated child (e.g. a detection pool worker).
+    The peak never comes down, so it says nothing about a later, smaller job
+    in the same process; RssSampler measures a single span.
+    """
+    # ru_maxrss is reported in kilobytes on Linux
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+_PAGE_MB = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024) if hasattr(os, 'sysconf') else 0.0
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB (the lifetime peak where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except OSError:
+        return peak_rss_mb()
+
+
+class RssSampler:
+    """
+    Samples this process's current RSS on a background thread while the
+    `with` block runs, keeping the baseline at entry and the highest sample.
+    """
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.baseline_mb = 0.0
+        self.peak_mb = 0.0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    @property
+    def growth_mb(self) -> float:
+        """How far RSS rose above the baseline during the block."""
+        return max(0.0, self.peak_mb - self.baseline_mb)
+
+    def _sample(self) -> None:
+        self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> 'RssSampler':
+        self.baseline_mb = self.peak_mb = rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopping.set()
+        self._thread.join()
+        self._sample()
+
+
+@dataclass
+class StageStats:
+    """Time, counters and memory of one named stage; repeated calls accumulate."""
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    counters: Dict[str, int] = field(default_factory=dict)
+    # RSS sampled while the stage ran: the highest value, and how far a call raised it (max over calls)
+    peak_rss_mb: float = 0.0
+    rss_growth_mb: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def throughput(self) -> Dict[str, float]:
+        return {
+            f"{counter}_per_s": round(value / self.seconds, 2)
+            for counter, value in self.counters.items() if self.seconds > 0
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "seconds": round(self.seconds, 3), "throughput": self.throughput}
+
+
+class RunReport:
+    """
+    Stages recorded during one pipeline run (a CLI invocation or a Dagster
+    step), rendered as a JSON-serializable dict by to_dict().
+    """
+    def __init__(self, name: str, run_id: Optional[str] = None, tags: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = run_id or self.started_at.strftime('%Y%m%dT%H%M%S')
+        self.tags = tags or {}
+        self.seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.rss_growth_mb = 0.0
+        self.profile_path: Optional[str] = None
+        self.stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, counters: Dict[str, int], rss: RssSampler,
+               error: Optional[str]) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, StageStats(name))
+            stage.calls += 1
+            stage.seconds += seconds
+            for counter, value in counters.items():
+                stage.counters[counter] = stage.counters.get(counter, 0) + value
+            stage.peak_rss_mb = max(stage.peak_rss_mb, rss.peak_mb)
+            stage.rss_growth_mb = max(stage.rss_growth_mb, rss.growth_mb)
+            stage.error = error or stage.error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "tags": self.tags,
+            "seconds": round(self.seconds, 3),
+            "peak_rss_mb": self.peak_rss_mb,
+            "rss_growth_mb": self.rss_growth_mb,
+            "peak_child_rss_mb": peak_rss_mb(children=True),
+            "profile": self.profile_path,
+            "stages": [stage.to_dict() for stage in self.stages.values()],
+        }
+
+    @property
+    def path(self) -> Optional[str]:
+        return os.path.join(REPORT_DIR, f"{self.name}-{self.run_id}.json") if REPORT_DIR else None
+
+    def write(self) -> Optional[str]:
+        """Writes the report and appends it to history.jsonl; returns its path."""
+        if not REPORT_DIR:
+            return None
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        report = self.to_dict()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(REPORT_DIR, 'history.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report) + '\n')
+        return self.path
+
+    def summary(self) -> str:
+        lines = [f"{self.name} ({self.run_id}): {self.seconds:.2f}s, peak RSS {self.peak_rss_mb:.1f} MB"]
+        for stage in self.stages.values():
+            rates = ", ".join(f"{value:,.1f} {rate.replace('_per_s', '')}/s"
+                              for rate, value in stage.throughput.items())
+            lines.append(f"  {stage.name}: {stage.seconds:.2f}s" + (f" ({rates})" if rates else "")
+                         + (f" FAILED: {stage.error}" if stage.error else ""))
+        return "\n".join(lines)
+
+
+@dataclass
+class _ActiveStage:
+    name: str
+    counters: Dict[str, int] = field(default_factory=dict)
+
+
+_report: ContextVar[Optional[RunReport]] = ContextVar('run_report', default=None)
+_stage: ContextVar[Optional[_ActiveStage]] = ContextVar('run_stage', default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[_ActiveStage]:
+    """
+    Times the enclosed block as a stage of the current run report. Stages
+    opened inside another are named parent/child. Without an active report
+    the timing is only logged at debug level.
+    """
+    parent = _stage.get()
+    active = _ActiveStage(f"{parent.name}/{name}" if parent else name)
+    token = _stage.set(active)
+    rss, start, error = RssSampler(), time.perf_counter(), None
+    try:
+        with rss:
+            yield active
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _stage.reset(token)
+        report = _report.get()
+        if report is not None:
+            report.record(active.name, seconds, active.counters, rss, error)
+        else:
+            logger.debug(f"{active.name} took {seconds:.2f}s {active.counters}")
+
+
+def count(counter: str, value: int = 1) -> None:
+    """Adds to a counter of the innermost active stage (a no-op outside any stage)."""
+    active = _stage.get()
+    if active is not None and value:
+        active.counters[counter] = active.counters.get(counter, 0) + int(value)
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    """Decorator that runs a function, sync or async, as a stage named after it."""
+    def decorate(func: Callable) -> Callable:
+        stage_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(stage_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class StackSampler:
+    """
+    Samples the stacks of every thread of this process at a fixed interval,
+    as py-spy does from outside, and counts them in collapsed-stack form.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, path: str) -> None:
+        self._stopping.set()
+        self._thread.join()
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+@contextmanager
+def _profiled(report: RunReport, profile: str) -> Iterator[None]:
+    if profile not in PROFILERS or not REPORT_DIR:
+        yield
+        return
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    base = os.path.join(REPORT_DIR, f"{report.name}-{report.run_id}")
+    if profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            report.profile_path = base + '.prof'
+            profiler.dump_stats(report.profile_path)
+    else:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            report.profile_path = base + '.folded'
+            sampler.stop(report.profile_path)
+
+
+@contextmanager
+def run_report(name: str, run_id: Optional[str] = None, tags: Optional[Dict[str, Any]] = None,
+               profile: str = PROFILE) -> Iterator[RunReport]:
+    """
+    Collects the stages run inside the block into a RunReport, then writes it
+    (also when the block raises) and logs a summary. `profile` wraps the whole
+    run in cProfile or the stack sampler.
+    """
+    report = RunReport(name, run_id, tags)
+    token = _report.set(report)
+    rss, start = RssSampler(), time.perf_counter()
+    try:
+        with rss, _profiled(report, profile):
+            yield report
+    finally:
+        report.seconds = time.perf_counter() - start
+        report.peak_rss_mb, report.rss_growth_mb = rss.peak_mb, rss.growth_mb
+        _report.reset(token)
+        path = report.write()
+        logger.info(report.summary() + (f"\nRun report written to {path}" if path else ""))
+
+
+def load_history(report_dir: str = REPORT_DIR) -> List[Dict[str, Any]]:
+    path = os.path.join(report_dir, 'history.jsonl')
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stage_metric(stage: Dict[str, Any]) -> tuple:
+    """
+    The figure a stage is compared on: its first throughput (higher is better)
+    when it counted anything, so bigger partitions do not look like
+    regressions, otherwise its duration (lower is better).
+    """
+    if stage["throughput"]:
+        rate, value = next(iter(stage["throughput"].items()))
+        return rate, value, True
+    return "seconds", stage["seconds"], False
+
+
+def find_regressions(history: List[Dict[str, Any]], window: int, tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compares each stage of the latest report of every name with its median
+    over the previous `window` reports of that name.
+    """
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for report in history:
+        by_name.setdefault(report["name"], []).append(report)
+
+    rows = []
+    for name, reports in by_name.items():
+        latest, previous = reports[-1], reports[-window - 1:-1]
+        for current in latest["stages"]:
+            metric, value, higher_is_better = stage_metric(current)
+            past = [
+                stage_metric(stage)[1] for report in previous for stage in report["stages"]
+                if stage["name"] == current["name"] and stage_metric(stage)[0] == metric
+            ]
+            if not past:
+                continue
+            median = statistics.median(past)
+            change = (value - median) / median if median else 0.0
+            if not higher_is_better and max(value, median) < MIN_COMPARED_SECONDS:
+                change = 0.0
+            rows.append({
+                "report": name,
+                "stage": current["name"],
+                "metric": metric,
+                "latest": value,
+                "median": median,
+                "change": change,
+                "regressed": (-change if higher_is_better else change) > tolerance,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the latest run reports with earlier runs.")
+    parser.add_argument("command", choices=["trends"])
+    parser.add_argument("--report-dir", default=REPORT_DIR)
+    parser.add_argument("--window", type=int, default=10, help="Earlier runs to take the median of")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Flag stages more than this fraction worse than the median")
+    args = parser.parse_args()
+
+    rows = find_regressions(load_history(args.report_dir), args.window, args.tolerance)
+    if not rows:
+        print("Need at least two reports of the same run to compare.")
+        return
+    print(f"{'report':<24} {'stage':<40} {'metric':<16} {'latest':>10} {'median':>10} {'change':>8}")
+    for row in rows:
+        print(f"{row['report']:<24} {row['stage']:<40} {row['metric']:<16} {row['latest']:>10.2f} "
+              f"{row['median']:>10.2f} {row['change']:>+7.1%}{'  REGRESSED' if row['regressed'] else ''}")
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 import os
 import json
+import hashlib
 import logging
-import pandas as pd
+import argparse
+from datetime import date
+from typing import List, Dict, Any, Optional, Sequence
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 
+try:
+    from .bulk_ingest import upsert_records
+    from . import engagement, instrumentation, parquet_lake
+except ImportError:  # executed as a script: python src/loader.py
+    from bulk_ingest import upsert_records
+    import engagement
+    import instrumentation
+    import parquet_lake
+
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,58 +29,300 @@ load_dotenv()
 DB_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
          f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
 
-def load_raw_data() -> None:
+RAW_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'raw', 'telegram_messages'
+)
+
+# Columns written by MedicalDataScraper.save_data, in table order
+MESSAGE_COLUMNS: List[str] = [
+    'message_id', 'channel_name', 'channel_title', 'message_date', 'message_text',
+    'has_media', 'image_path', 'views', 'forwards', 'scraped_at'
+]
+MESSAGE_KEY: List[str] = ['channel_name', 'message_id']
+# A re-scraped message is only rewritten when one of these changed; scraped_at
+# alone does not count, so the incremental marts skip unchanged messages
+MESSAGE_COMPARE_COLUMNS: List[str] = [
+    col for col in MESSAGE_COLUMNS if col not in MESSAGE_KEY and col != 'scraped_at'
+]
+
+CREATE_TABLES_SQL = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    CREATE TABLE IF NOT EXISTS raw.telegram_messages (
+        message_id bigint NOT NULL,
+        channel_name text NOT NULL,
+        channel_title text,
+        message_date timestamptz,
+        message_text text,
+        has_media boolean,
+        image_path text,
+        views integer,
+        forwards integer,
+        scraped_at timestamptz,
+        PRIMARY KEY (channel_name, message_id)
+    );
+
+    -- One row per lake file that has been loaded
+    CREATE TABLE IF NOT EXISTS raw.load_manifest (
+        file_path text PRIMARY KEY,
+        file_size bigint NOT NULL,
+        file_mtime double precision NOT NULL,
+        content_hash text NOT NULL,
+        row_count integer NOT NULL,
+        loaded_at timestamptz NOT NULL DEFAULT now()
+    );
+"""
+
+UPSERT_MANIFEST_SQL = text("""
+    INSERT INTO raw.load_manifest (file_path, file_size, file_mtime, content_hash, row_count, loaded_at)
+    VALUES (:file_path, :file_size, :file_mtime, :content_hash, :row_count, now())
+    ON CONFLICT (file_path) DO UPDATE SET
+        file_size = EXCLUDED.file_size,
+        file_mtime = EXCLUDED.file_mtime,
+        content_hash = EXCLUDED.content_hash,
+        row_count = EXCLUDED.row_count,
+        loaded_at = EXCLUDED.loaded_at
+""")
+
+
+def file_hash(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_lake_files(
+    base_dir: str = RAW_DIR,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None
+) -> List[str]:
+    """Returns the JSON partition files in the Data Lake, sorted by path, limited to a date range and channels."""
+    wanted = {c.lstrip('@') for c in channels} if channels else None
+    files = []
+    for date_folder in sorted(os.listdir(base_dir)):
+        date_path = os.path.join(base_dir, date_folder)
+        if not os.path.isdir(date_path) or date_folder.startswith('date='):
+            continue
+        if (start and date_folder < start.isoformat()) or (end and date_folder > end.isoformat()):
+            continue
+        for filename in sorted(os.listdir(date_path)):
+            if filename.endswith(".json") and (wanted is None or filename[:-len(".json")] in wanted):
+                files.append(os.path.join(date_path, filename))
+    return files
+
+
+def read_messages(file_path: str) -> Optional[List[Dict[str, Any]]]:
     """
-    Reads JSON files from the Data Lake and loads them into PostgreSQL (raw schema).
+    Parses one partition file into rows shaped like raw.telegram_messages.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: The rows, or None if the file is not valid JSON.
     """
-    base_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-        'data', 'raw', 'telegram_messages'
-    )
-    
-    if not os.path.exists(base_dir):
-        logger.error(f"Data directory not found: {base_dir}")
-        return
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to decode JSON {file_path}: {e}")
+        return None
 
-    all_messages = []
+    if not isinstance(data, list):
+        data = [data]
+    return [{col: item.get(col) for col in MESSAGE_COLUMNS} for item in data]
 
-    # Traverse Data Lake
-    for date_folder in os.listdir(base_dir):
-        date_path = os.path.join(base_dir, date_folder)
-        if os.path.isdir(date_path):
-            for filename in os.listdir(date_path):
-                if filename.endswith(".json"):
-                    file_path = os.path.join(date_path, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            if isinstance(data, list):
-                                all_messages.extend(data)
-                            else:
-                                all_messages.append(data)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to decode JSON {file_path}: {e}")
-
-    if not all_messages:
-        logger.warning("No data found to load.")
-        return
-
-    df = pd.DataFrame(all_messages)
-    logger.info(f"Prepared {len(df)} rows for loading.")
+
+def ensure_tables(connection: Connection) -> None:
+    """
+    Creates the raw tables, replacing a legacy keyless raw.telegram_messages
+    (as written by the old pandas full reload) so that upserts can work.
+    """
+    has_table = connection.execute(
+        text("SELECT to_regclass('raw.telegram_messages') IS NOT NULL")
+    ).scalar()
+    if has_table:
+        has_key = connection.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.table_constraints
+                WHERE table_schema = 'raw' AND table_name = 'telegram_messages'
+                AND constraint_type = 'PRIMARY KEY'
+            )
+        """)).scalar()
+        if not has_key:
+            logger.warning("Replacing legacy raw.telegram_messages (no primary key) and dependent views.")
+            connection.execute(text("DROP TABLE raw.telegram_messages CASCADE;"))
+            connection.execute(text("DROP TABLE IF EXISTS raw.load_manifest;"))
+
+    connection.execute(text(CREATE_TABLES_SQL))
+
+
+@instrumentation.instrumented()
+def load_raw_data(
+    full_refresh: bool = False,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Loads the Data Lake into PostgreSQL (raw schema), from the JSON files or,
+    with LAKE_FORMAT=parquet, from the Parquet part files.
+
+    Files are tracked in raw.load_manifest by path, size, mtime and content hash,
+    so only new or changed files are parsed and upserted on (channel_name, message_id).
+
+    Args:
+        full_refresh (bool): Truncate the raw table and manifest and reload every file,
+            in the same transaction as the reload, so a failed load changes nothing.
+            Engagement history (raw.engagement_deltas) is kept. Cannot be combined
+            with start, end or channels.
+        start, end (date): Only read partitions in this date range (inclusive).
+        channels (Sequence[str]): Only read partitions of these channels.
+
+    Returns:
+        Optional[Dict[str, Any]]: files_loaded, files_skipped, rows, rows_changed,
+        engagement_changes and seconds, or None if the load failed.
+    """
+    if full_refresh and (start or end or channels):
+        # Truncating everything but reloading a subset would drop every other partition
+        raise ValueError("full_refresh reloads the whole lake and cannot be combined with start, end or channels")
+
+    if not os.path.exists(RAW_DIR):
+        logger.error(f"Data directory not found: {RAW_DIR}")
+        return None
 
     try:
         engine = create_engine(DB_URL)
-        with engine.connect() as connection:
-            connection.execute(text("CREATE SCHEMA IF NOT EXISTS raw;"))
-            connection.commit()
-        
-        df.to_sql('telegram_messages', engine, schema='raw', if_exists='replace', index=False)
-        logger.info("Successfully loaded data into raw.telegram_messages")
-        
+        with engine.begin() as connection:
+            ensure_tables(connection)
+            # A full refresh reloads every file; the truncate runs with the reload below
+            manifest = {} if full_refresh else {
+                row.file_path: row
+                for row in connection.execute(text(
+                    "SELECT file_path, file_size, file_mtime, content_hash FROM raw.load_manifest"
+                ))
+            }
+
+        pending, skipped_files = [], 0
+
+        if parquet_lake.LAKE_FORMAT == 'parquet':
+            # Partition folders outside the date range / channels are never listed or opened
+            lake_files = parquet_lake.select_part_files(RAW_DIR, start, end, channels)
+            read_file = parquet_lake.read_part_file
+        else:
+            lake_files = list_lake_files(RAW_DIR, start, end, channels)
+            read_file = read_messages
+
+        for file_path in lake_files:
+            rel_path = os.path.relpath(file_path, RAW_DIR)
+            stat = os.stat(file_path)
+            entry = manifest.get(rel_path)
+
+            # Cheap check first: unchanged size and mtime means unchanged file
+            if entry and entry.file_size == stat.st_size and entry.file_mtime == stat.st_mtime:
+                skipped_files += 1
+                continue
+
+            content_hash = file_hash(file_path)
+            manifest_row = {
+                "file_path": rel_path,
+                "file_size": stat.st_size,
+                "file_mtime": stat.st_mtime,
+                "content_hash": content_hash,
+            }
+
+            if entry and entry.content_hash == content_hash:
+                # Touched but not modified; just refresh the stat fields
+                with engine.begin() as connection:
+                    connection.execute(
+                        text("""
+                            UPDATE raw.load_manifest
+                            SET file_size = :file_size, file_mtime = :file_mtime
+                            WHERE file_path = :file_path
+                        """),
+                        manifest_row
+                    )
+                skipped_files += 1
+                continue
+
+            pending.append((file_path, manifest_row))
+
+        if not pending:
+            if full_refresh:
+                with engine.begin() as connection:
+                    connection.execute(text("TRUNCATE raw.telegram_messages, raw.load_manifest;"))
+            logger.info(f"No new or changed files to load ({skipped_files} unchanged).")
+            return {"files_loaded": 0, "files_skipped": skipped_files, "rows": 0, "rows_changed": 0,
+                    "engagement_changes": 0, "seconds": 0.0}
+
+        loaded_manifest: List[Dict[str, Any]] = []
+
+        def iter_rows():
+            # Parse one file at a time so only a single partition is in memory
+            for file_path, manifest_row in pending:
+                rows = read_file(file_path)
+                if rows is None:
+                    continue
+                loaded_manifest.append({**manifest_row, "row_count": len(rows)})
+                yield from rows
+
+        engagement_changes = 0
+
+        def capture_engagement(connection: Connection, stage: str) -> None:
+            # Runs before the merge, while raw.telegram_messages still has the old counts
+            nonlocal engagement_changes
+            engagement_changes = engagement.capture_engagement(connection, stage)
+
+        # Rows, engagement history and manifest entries commit together, so a
+        # crash never marks a file as loaded without its data
+        with engine.begin() as connection:
+            if full_refresh:
+                logger.info("Full refresh requested, truncating raw.telegram_messages.")
+                connection.execute(text("TRUNCATE raw.telegram_messages, raw.load_manifest;"))
+            stats = upsert_records(
+                connection, 'raw.telegram_messages', MESSAGE_COLUMNS, MESSAGE_KEY, iter_rows(),
+                compare_columns=MESSAGE_COMPARE_COLUMNS,
+                before_merge=capture_engagement if engagement.CAPTURE_ENABLED else None
+            )
+            if loaded_manifest:
+                connection.execute(UPSERT_MANIFEST_SQL, loaded_manifest)
+
+        logger.info(
+            f"Loaded {len(loaded_manifest)} files ({skipped_files} unchanged files skipped). {stats}"
+        )
+        instrumentation.count("rows", stats.rows)
+        instrumentation.count("rows_changed", stats.changed)
+        instrumentation.count("files", len(loaded_manifest))
+        return {
+            "files_loaded": len(loaded_manifest),
+            "files_skipped": skipped_files,
+            "rows": stats.rows,
+            "rows_changed": stats.changed,
+            "engagement_changes": engagement_changes,
+            "seconds": stats.seconds,
+        }
+
     except SQLAlchemyError as e:
         logger.error(f"Database error occurred: {e}")
     except Exception as e:
         logger.error(f"Unexpected error during loading: {e}")
+    return None
+
 
 if __name__ == "__main__":
-    load_raw_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the Telegram Data Lake into raw.telegram_messages.")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Truncate the raw table and manifest, then reload every file."
+    )
+    parser.add_argument("--start", type=date.fromisoformat, help="First partition date to load (YYYY-MM-DD).")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last partition date to load (YYYY-MM-DD).")
+    parser.add_argument("--channel", action="append", dest="channels", help="Only load this channel (repeatable).")
+    args = parser.parse_args()
+    if args.full_refresh and (args.start or args.end or args.channels):
+        parser.error("--full-refresh reloads the whole lake; it cannot be combined with --start, --end or --channel")
+    with instrumentation.run_report("load_raw_data"):
+        load_raw_data(full_refresh=args.full_refresh, start=args.start, end=args.end, channels=args.channels)
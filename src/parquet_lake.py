@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import uuid
+import logging
+import argparse
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# "json" keeps the original pretty-printed day/channel files; "parquet" writes
+# Hive-partitioned Parquet under date=YYYY-MM-DD/channel=<name>/
+LAKE_FORMAT = os.getenv('LAKE_FORMAT', 'json').lower()
+LAKE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data', 'raw', 'telegram_messages'
+)
+PARQUET_COMPRESSION = os.getenv('LAKE_PARQUET_COMPRESSION', 'zstd')
+# Partitions with at least this many part files are merged by `compact`
+COMPACT_MIN_FILES = int(os.getenv('LAKE_COMPACT_MIN_FILES', '4'))
+
+# Same columns, in the same order, as raw.telegram_messages
+MESSAGE_SCHEMA = pa.schema([
+    ('message_id', pa.int64()),
+    ('channel_name', pa.string()),
+    ('channel_title', pa.string()),
+    ('message_date', pa.timestamp('us', tz='UTC')),
+    ('message_text', pa.string()),
+    ('has_media', pa.bool_()),
+    ('image_path', pa.string()),
+    ('views', pa.int64()),
+    ('forwards', pa.int64()),
+    ('scraped_at', pa.timestamp('us', tz='UTC')),
+])
+TIMESTAMP_COLUMNS = ('message_date', 'scraped_at')
+
+PARTITION_SCHEMA = pa.schema([('date', pa.string()), ('channel', pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+DATASET_SCHEMA = pa.unify_schemas([MESSAGE_SCHEMA, PARTITION_SCHEMA])
+
+
+def partition_dir(base_dir: str, date_key: str, channel: str) -> str:
+    return os.path.join(base_dir, f"date={date_key}", f"channel={channel}")
+
+
+def to_table(records: Iterable[Dict[str, Any]]) -> pa.Table:
+    """Builds an Arrow table from scraper records, parsing ISO timestamp strings."""
+    rows = []
+    for record in records:
+        row = {name: record.get(name) for name in MESSAGE_SCHEMA.names}
+        for column in TIMESTAMP_COLUMNS:
+            if isinstance(row[column], str):
+                row[column] = datetime.fromisoformat(row[column])
+        rows.append(row)
+    return pa.Table.from_pylist(rows, schema=MESSAGE_SCHEMA)
+
+
+def _part_name() -> str:
+    # Nanosecond prefix keeps part files in write order, so later copies of a message win
+    return f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_atomic(table: pa.Table, target_dir: str, name: str) -> str:
+    os.makedirs(target_dir, exist_ok=True)
+    file_path = os.path.join(target_dir, name)
+    tmp_path = os.path.join(target_dir, f".{name}.tmp")
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def write_partition(base_dir: str, date_key: str, channel: str, records: Sequence[Dict[str, Any]]) -> str:
+    """
+    Appends records to one date/channel partition as a new part file.
+    Duplicates across part files are resolved by compaction and by the loader's upsert.
+    """
+    return _write_atomic(to_table(records), partition_dir(base_dir, date_key, channel), _part_name())
+
+
+def list_part_files(
+    base_dir: str = LAKE_DIR,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None
+) -> List[str]:
+    """
+    Parquet part files under base_dir, in partition and write order. Partitions
+    outside the date range or channels are pruned by folder name, without
+    listing their contents.
+    """
+    files = []
+    if not os.path.isdir(base_dir):
+        return files
+    wanted = {f"channel={c.lstrip('@')}" for c in channels} if channels else None
+    for date_folder in sorted(os.listdir(base_dir)):
+        if not date_folder.startswith('date='):
+            continue
+        date_key = date_folder[len('date='):]
+        if (start and date_key < start.isoformat()) or (end and date_key > end.isoformat()):
+            continue
+        date_path = os.path.join(base_dir, date_folder)
+        for channel_folder in sorted(os.listdir(date_path)):
+            channel_path = os.path.join(date_path, channel_folder)
+            if not channel_folder.startswith('channel=') or not os.path.isdir(channel_path):
+                continue
+            if wanted is not None and channel_folder not in wanted:
+                continue
+            files.extend(
+                os.path.join(channel_path, name)
+                for name in sorted(os.listdir(channel_path))
+                if name.endswith('.parquet')
+            )
+    return files
+
+
+def lake_dataset(base_dir: str = LAKE_DIR, files: Optional[List[str]] = None) -> ds.Dataset:
+    """
+    A dataset over the Parquet part files with `date` and `channel` partition
+    columns. The legacy JSON folders that share base_dir are not part of it.
+    """
+    return ds.dataset(
+        files if files is not None else list_part_files(base_dir),
+        schema=DATASET_SCHEMA,
+        format='parquet',
+        partitioning=PARTITIONING,
+        partition_base_dir=base_dir,
+    )
+
+
+def partition_filter(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None
+) -> Optional[ds.Expression]:
+    """Predicate on the partition columns; Arrow prunes non-matching part files without opening them."""
+    expression = None
+    conditions = []
+    if start:
+        conditions.append(ds.field('date') >= start.isoformat())
+    if end:
+        conditions.append(ds.field('date') <= end.isoformat())
+    if channels:
+        conditions.append(ds.field('channel').isin([c.lstrip('@') for c in channels]))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def select_part_files(
+    base_dir: str = LAKE_DIR,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None
+) -> List[str]:
+    """Part files in the partitions matching the date range and channels."""
+    return list_part_files(base_dir, start, end, channels)
+
+
+def _batch_rows(batch: pa.RecordBatch) -> List[Dict[str, Any]]:
+    # ISO strings convert to Python far faster than timestamps and Postgres parses them as-is
+    for column in TIMESTAMP_COLUMNS:
+        index = batch.schema.get_field_index(column)
+        batch = batch.set_column(index, column, pc.cast(batch.column(index), pa.string()))
+    return batch.to_pylist()
+
+
+def read_part_file(file_path: str) -> List[Dict[str, Any]]:
+    """Reads one part file into rows shaped like raw.telegram_messages."""
+    table = pq.read_table(file_path, schema=MESSAGE_SCHEMA)
+    return [row for batch in table.to_batches() for row in _batch_rows(batch)]
+
+
+def scan_messages(
+    base_dir: str = LAKE_DIR,
+    files: Optional[List[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    channels: Optional[Sequence[str]] = None,
+    batch_size: int = 50_000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields message rows shaped like raw.telegram_messages, reading only the
+    partitions that match the predicates, one record batch at a time.
+    Rows come out in part-file order.
+    """
+    if files is None:
+        files = list_part_files(base_dir, start, end, channels)
+    dataset = lake_dataset(base_dir, files)
+    for batch in dataset.to_batches(
+        columns=MESSAGE_SCHEMA.names,
+        filter=partition_filter(start, end, channels),
+        batch_size=batch_size,
+    ):
+        yield from _batch_rows(batch)
+
+
+def compact_partition(part_dir: str) -> int:
+    """
+    Merges a partition's part files into one, keeping the newest copy of each
+    message. Returns the number of files replaced.
+    """
+    parts = sorted(name for name in os.listdir(part_dir) if name.endswith('.parquet'))
+    if len(parts) < 2:
+        return 0
+    table = pa.concat_tables(pq.read_table(os.path.join(part_dir, name), schema=MESSAGE_SCHEMA) for name in parts)
+
+    # Later part files hold fresher copies; keep the last row per message_id
+    table = table.append_column('_order', pa.array(range(table.num_rows), pa.int64()))
+    latest = table.group_by('message_id').aggregate([('_order', 'max')])
+    table = table.take(latest['_order_max']).drop_columns(['_order']).sort_by([('message_id', 'descending')])
+
+    # Reuse the newest input's timestamp so files written during compaction still sort after it
+    newest_ns = parts[-1].split('-')[1]
+    _write_atomic(table, part_dir, f"part-{newest_ns}-compacted.parquet")
+    for name in parts:
+        if name != f"part-{newest_ns}-compacted.parquet":
+            os.remove(os.path.join(part_dir, name))
+    return len(parts)
+
+
+def compact_lake(base_dir: str = LAKE_DIR, min_files: int = COMPACT_MIN_FILES) -> Dict[str, int]:
+    """Compacts every partition with at least min_files part files."""
+    counts: Dict[str, List[str]] = {}
+    for file_path in list_part_files(base_dir):
+        counts.setdefault(os.path.dirname(file_path), []).append(file_path)
+
+    stats = {"partitions": 0, "files_before": 0, "files_after": 0}
+    for part_dir, files in counts.items():
+        if len(files) < min_files:
+            continue
+        stats["partitions"] += 1
+        stats["files_before"] += compact_partition(part_dir)
+        stats["files_after"] += 1
+    logger.info(
+        f"Compacted {stats['partitions']} partitions: "
+        f"{stats['files_before']} part files -> {stats['files_after']}"
+    )
+    return stats
+
+
+def migrate_json_lake(base_dir: str = LAKE_DIR, remove_json: bool = False) -> Dict[str, int]:
+    """
+    Rewrites every YYYY-MM-DD/<channel>.json partition as one Parquet file in
+    date=YYYY-MM-DD/channel=<channel>/. Partitions already migrated are skipped.
+    """
+    stats = {"files": 0, "rows": 0, "skipped": 0, "json_bytes": 0, "parquet_bytes": 0}
+    for date_folder in sorted(os.listdir(base_dir)):
+        date_path = os.path.join(base_dir, date_folder)
+        if date_folder.startswith('date=') or not os.path.isdir(date_path):
+            continue
+        for filename in sorted(os.listdir(date_path)):
+            if not filename.endswith('.json'):
+                continue
+            json_path = os.path.join(date_path, filename)
+            channel = filename[:-len('.json')]
+            target_dir = partition_dir(base_dir, date_folder, channel)
+            if os.path.isdir(target_dir) and any(n.endswith('.parquet') for n in os.listdir(target_dir)):
+                stats["skipped"] += 1
+                continue
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping invalid JSON {json_path}: {e}")
+                continue
+            if not isinstance(records, list):
+                records = [records]
+
+            parquet_path = write_partition(base_dir, date_folder, channel, records)
+            stats["files"] += 1
+            stats["rows"] += len(records)
+            stats["json_bytes"] += os.path.getsize(json_path)
+            stats["parquet_bytes"] += os.path.getsize(parquet_path)
+            if remove_json:
+                os.remove(json_path)
+        if remove_json and not os.listdir(date_path):
+            os.rmdir(date_path)
+
+    logger.info(
+        f"Migrated {stats['files']} JSON partitions ({stats['rows']} rows, {stats['skipped']} already done): "
+        f"{stats['json_bytes'] / 1e6:.1f} MB JSON -> {stats['parquet_bytes'] / 1e6:.1f} MB Parquet"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Maintain the Parquet message lake.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subcommands.add_parser("migrate", help="Convert the JSON partitions to Parquet.")
+    migrate.add_argument("--remove-json", action="store_true", help="Delete each JSON file once converted.")
+
+    compact = subcommands.add_parser("compact", help="Merge small part files within each partition.")
+    compact.add_argument("--min-files", type=int, default=COMPACT_MIN_FILES)
+
+    for subcommand in (migrate, compact):
+        subcommand.add_argument("--lake-dir", default=LAKE_DIR)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate_json_lake(args.lake_dir, remove_json=args.remove_json)
+    else:
+        compact_lake(args.lake_dir, min_files=args.min_files)
@@ -0,0 +1,256 @@
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DB_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
+         f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Snapshots are written here as snapshot-<UTC timestamp>.duckdb; CURRENT names
+# the one the API serves. The API reads the same READ_REPLICA_DIR.
+REPLICA_DIR = os.getenv('READ_REPLICA_DIR', os.path.join(BASE_DIR, 'data', 'replica'))
+POINTER_FILE = 'CURRENT'
+# Older snapshots are kept for requests still reading them, then deleted
+KEEP_SNAPSHOTS = int(os.getenv('READ_REPLICA_KEEP', '3'))
+
+# The marts the report endpoints read. Search (tsvector, pg_trgm) and the bulk
+# exports (server-side cursors) stay on Postgres, so fct_messages is not copied.
+REPLICA_TABLES: List[str] = [
+    'dim_channels',
+    'dim_dates',
+    'agg_keyword_daily',
+    'agg_channel_daily',
+    'fct_message_engagement',
+    'fct_image_detections',
+    'fct_detected_objects',
+]
+
+# DuckDB skips row groups by their min/max values, so each table is stored
+# sorted on the columns the endpoints filter it by
+SORT_KEYS: Dict[str, List[str]] = {
+    'agg_keyword_daily': ['channel_key', 'date_key'],
+    'agg_channel_daily': ['channel_key', 'date_key'],
+    'fct_message_engagement': ['channel_key', 'message_id', 'captured_at'],
+    'fct_image_detections': ['channel_key', 'date_key'],
+    'fct_detected_objects': ['object_class', 'date_key'],
+}
+
+# Postgres column type (udt_name) -> DuckDB type. numeric becomes DOUBLE, since
+# DuckDB decimals cannot hold Postgres' unbounded precision; anything not
+# listed is copied as text.
+DUCKDB_TYPES: Dict[str, str] = {
+    'bool': 'BOOLEAN',
+    'int2': 'SMALLINT',
+    'int4': 'INTEGER',
+    'int8': 'BIGINT',
+    'float4': 'REAL',
+    'float8': 'DOUBLE',
+    'numeric': 'DOUBLE',
+    'text': 'VARCHAR',
+    'varchar': 'VARCHAR',
+    'bpchar': 'VARCHAR',
+    'date': 'DATE',
+    'timestamp': 'TIMESTAMP',
+    'timestamptz': 'TIMESTAMPTZ',
+    '_text': 'VARCHAR[]',
+    '_varchar': 'VARCHAR[]',
+}
+
+
+def table_columns(connection: Connection, tables: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+    """(column, udt_name) pairs of each table that exists in the dbt target schema, in column order."""
+    rows = connection.execute(text("""
+        SELECT table_name, column_name, udt_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = ANY(:tables)
+        ORDER BY table_name, ordinal_position
+    """), {"tables": tables}).all()
+    columns: Dict[str, List[Tuple[str, str]]] = {}
+    for row in rows:
+        columns.setdefault(row.table_name, []).append((row.column_name, row.udt_name))
+    return columns
+
+
+def _export_expression(column: str, udt_name: str) -> str:
+    # Arrays travel as JSON text, which DuckDB casts back to lists
+    if udt_name.startswith('_'):
+        return f'array_to_json("{column}")::text'
+    if udt_name == 'numeric':
+        return f'"{column}"::float8'
+    if udt_name not in DUCKDB_TYPES:
+        return f'"{column}"::text'
+    return f'"{column}"'
+
+
+def _import_expression(column: str, udt_name: str) -> str:
+    duck_type = DUCKDB_TYPES.get(udt_name, 'VARCHAR')
+    if duck_type.endswith('[]'):
+        return f'CAST("{column}" AS JSON)::{duck_type} AS "{column}"'
+    return f'"{column}"'
+
+
+def copy_table(connection: Connection, duck: duckdb.DuckDBPyConnection, table: str,
+               columns: List[Tuple[str, str]], work_dir: str) -> int:
+    """
+    Copies one Postgres table into the DuckDB database through a CSV file
+    written by COPY TO STDOUT, and returns its row count.
+    """
+    csv_path = os.path.join(work_dir, f"{table}.csv")
+    select = ', '.join(_export_expression(column, udt_name) for column, udt_name in columns)
+    cursor = connection.connection.cursor()
+    try:
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            cursor.copy_expert(f'COPY (SELECT {select} FROM "{table}") TO STDOUT WITH (FORMAT csv)', f)
+    finally:
+        cursor.close()
+
+    csv_columns = ', '.join(
+        f"'{column}': '{'VARCHAR' if udt_name.startswith('_') else DUCKDB_TYPES.get(udt_name, 'VARCHAR')}'"
+        for column, udt_name in columns
+    )
+    order_by = [key for key in SORT_KEYS.get(table, []) if key in dict(columns)]
+    duck.execute(f"""
+        CREATE TABLE "{table}" AS
+        SELECT {', '.join(_import_expression(column, udt_name) for column, udt_name in columns)}
+        FROM read_csv('{csv_path}', header = false, auto_detect = false, delim = ',', quote = '"',
+                      escape = '"', allow_quoted_nulls = false, columns = {{{csv_columns}}})
+        {f"ORDER BY {', '.join(order_by)}" if order_by else ''}
+    """)
+    os.remove(csv_path)
+    return duck.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+
+
+def current_snapshot(replica_dir: Optional[str] = None) -> Optional[str]:
+    """Path of the snapshot CURRENT points at, or None before the first export."""
+    replica_dir = replica_dir or REPLICA_DIR
+    try:
+        with open(os.path.join(replica_dir, POINTER_FILE), encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(replica_dir, name)
+    return path if os.path.exists(path) else None
+
+
+def publish(replica_dir: str, name: str) -> None:
+    """Points CURRENT at a snapshot; os.replace makes the switch atomic for readers."""
+    pointer_tmp = os.path.join(replica_dir, f".{POINTER_FILE}.tmp")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(replica_dir, POINTER_FILE))
+
+
+def prune_snapshots(replica_dir: Optional[str] = None, keep: Optional[int] = None) -> List[str]:
+    """Deletes all but the newest `keep` snapshots (never the current one); returns the deleted names."""
+    replica_dir = replica_dir or REPLICA_DIR
+    keep = KEEP_SNAPSHOTS if keep is None else keep
+    current = current_snapshot(replica_dir)
+    snapshots = sorted(
+        name for name in os.listdir(replica_dir) if name.startswith('snapshot-') and name.endswith('.duckdb')
+    )
+    removed = []
+    for name in snapshots[:-keep] if keep > 0 else snapshots:
+        if current and os.path.basename(current) == name:
+            continue
+        os.remove(os.path.join(replica_dir, name))
+        removed.append(name)
+    return removed
+
+
+def export_replica(tables: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Copies the report marts into a new DuckDB snapshot and switches CURRENT to it.
+
+    Every table is read in one REPEATABLE READ transaction, so the snapshot is
+    consistent even if a load runs meanwhile. The snapshot is built under a
+    temporary name and only renamed into place once complete; the API keeps
+    answering from the previous one until CURRENT changes.
+
+    Returns:
+        Dict[str, Any]: snapshot (path), tables (rows per table), bytes and seconds.
+    """
+    tables = tables or REPLICA_TABLES
+    os.makedirs(REPLICA_DIR, exist_ok=True)
+    start = time.perf_counter()
+    name = f"snapshot-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.duckdb"
+    work_dir = tempfile.mkdtemp(prefix='.export-', dir=REPLICA_DIR)
+    building = os.path.join(work_dir, name)
+
+    engine = create_engine(DB_URL)
+    rows: Dict[str, int] = {}
+    try:
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as connection:
+            with connection.begin():
+                connection.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+                columns = table_columns(connection, tables)
+                missing = [table for table in tables if table not in columns]
+                if missing:
+                    logger.warning(f"Not in the warehouse yet, so not in the snapshot: {', '.join(missing)}")
+                duck = duckdb.connect(building)
+                try:
+                    for table in tables:
+                        if table in columns:
+                            rows[table] = copy_table(connection, duck, table, columns[table], work_dir)
+                    duck.execute("CHECKPOINT")
+                finally:
+                    duck.close()
+        os.replace(building, os.path.join(REPLICA_DIR, name))
+    finally:
+        engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    publish(REPLICA_DIR, name)
+    removed = prune_snapshots()
+    path = os.path.join(REPLICA_DIR, name)
+    stats = {
+        "snapshot": path,
+        "tables": rows,
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start,
+    }
+    logger.info(f"Exported {sum(rows.values()):,} rows from {len(rows)} marts to {path} "
+                f"({stats['bytes'] / 1e6:,.1f} MB) in {stats['seconds']:.1f}s"
+                + (f"; deleted {len(removed)} old snapshots" if removed else ""))
+    return stats
+
+
+def log_status() -> None:
+    path = current_snapshot()
+    if path is None:
+        logger.info(f"No snapshot in {REPLICA_DIR}; the API reads from Postgres.")
+        return
+    with duckdb.connect(path, read_only=True) as duck:
+        tables = duck.execute(
+            "SELECT table_name, estimated_size FROM duckdb_tables() ORDER BY table_name"
+        ).fetchall()
+    logger.info(f"Current snapshot: {path} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    for table, estimated_rows in tables:
+        logger.info(f"  {table}: ~{estimated_rows:,} rows")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="DuckDB read replica of the report marts, served by the API.")
+    parser.add_argument("command", choices=["export", "status"])
+    args = parser.parse_args()
+    if args.command == "export":
+        export_replica()
+    else:
+        log_status()
@@ -1,15 +1,28 @@
 import os
 import json
+import time
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+import argparse
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Tuple, TypeVar
+from datetime import datetime, timedelta, timezone
 
 from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError, FloodWaitError
 from telethon.tl.types import Message, MessageMediaPhoto
 from dotenv import load_dotenv
 
+try:
+    from .checkpoints import CheckpointStore
+    from .image_store import DEDUP_ENABLED, ImageStore
+    from . import instrumentation, parquet_lake
+except ImportError:  # executed as a script: python src/scraper.py
+    from checkpoints import CheckpointStore
+    from image_store import DEDUP_ENABLED, ImageStore
+    import instrumentation
+    import parquet_lake
+
 # Load environment variables
 load_dotenv()
 
@@ -18,6 +31,25 @@ API_ID = os.getenv('APP_API_ID')
 API_HASH = os.getenv('APP_API_HASH')
 PHONE = os.getenv('APP_PHONE')
 
+# Concurrency / rate limiting
+CHANNEL_CONCURRENCY = int(os.getenv('SCRAPER_CHANNEL_CONCURRENCY', '2'))
+DOWNLOAD_WORKERS = int(os.getenv('SCRAPER_DOWNLOAD_WORKERS', '4'))
+REQUESTS_PER_SECOND = float(os.getenv('SCRAPER_REQUESTS_PER_SECOND', '5'))
+MAX_FLOOD_RETRIES = int(os.getenv('SCRAPER_MAX_FLOOD_RETRIES', '5'))
+
+# Backfill paging
+BACKFILL_BATCH_SIZE = int(os.getenv('SCRAPER_BACKFILL_BATCH_SIZE', '500'))
+BACKFILL_MAX_BATCHES = int(os.getenv('SCRAPER_BACKFILL_MAX_BATCHES', '20'))
+
+# Engagement refresh: each incremental scrape also re-reads up to this many
+# already-saved messages, none older than this many days, so their new
+# views/forwards reach the lake (0 disables)
+REFRESH_MESSAGES = int(os.getenv('SCRAPER_REFRESH_MESSAGES', '200'))
+REFRESH_DAYS = float(os.getenv('SCRAPER_REFRESH_DAYS', '7'))
+
+# Telethon fetches history in pages of this many messages
+HISTORY_PAGE_SIZE = 100
+
 # List of channels to scrape
 CHANNELS: List[str] = [
     '@lobelia4cosmetics', 
@@ -29,25 +61,91 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data', 'raw')
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 
-os.makedirs(LOG_DIR, exist_ok=True)
-
-# Logging Setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, 'scraper.log')),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every channel and download worker, so the
+    whole scraper stays under one request rate.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a request token is available and takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Blocks every caller for the given time (used on FloodWaitError)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
 class MedicalDataScraper:
     """
     A class to scrape text and images from public Telegram channels.
+
+    Channels are scraped concurrently while photos are handed to a bounded pool
+    of download workers through an asyncio queue. Every Telegram request goes
+    through a shared TokenBucket, and FloodWaitError pauses the bucket and
+    retries instead of abandoning the channel.
     """
-    def __init__(self, client: TelegramClient):
+    def __init__(
+        self,
+        client: TelegramClient,
+        rate_limiter: Optional[TokenBucket] = None,
+        download_workers: int = DOWNLOAD_WORKERS,
+        max_flood_retries: int = MAX_FLOOD_RETRIES,
+        checkpoints: Optional[CheckpointStore] = None,
+        image_store: Optional[ImageStore] = None,
+        image_sink: Optional[Callable[[str, str, datetime], Awaitable[None]]] = None
+    ):
         self.client = client
+        self.checkpoints = checkpoints or CheckpointStore(
+            os.path.join(DATA_DIR, 'checkpoints', 'telegram_channels.json')
+        )
+        self.rate_limiter = rate_limiter or TokenBucket(REQUESTS_PER_SECOND)
+        if image_store is None and DEDUP_ENABLED:
+            image_store = ImageStore(os.path.join(DATA_DIR, 'image_store'))
+        self.image_store = image_store
+        # Called with (channel, image_path, posted_at) after each download, e.g. DetectionStream.publish;
+        # a sink that blocks holds up the download workers and, through their queue, message paging
+        self.image_sink = image_sink
+        self.download_workers = download_workers
+        self.max_flood_retries = max_flood_retries
+        self.stats = {"messages": 0, "images": 0, "duplicate_images": 0, "refreshed": 0}
+        self._download_queue: Optional[asyncio.Queue] = None
+
+    async def _call(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Rate-limits a Telegram request and retries it after FloodWaitError."""
+        for attempt in range(self.max_flood_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                return await func(*args, **kwargs)
+            except FloodWaitError as e:
+                if attempt == self.max_flood_retries:
+                    raise
+                logger.warning(f"Rate limited by Telegram. Sleeping {e.seconds} seconds before retrying.")
+                self.rate_limiter.pause(e.seconds)
 
     async def download_image(self, message: Message, channel_name: str) -> Optional[str]:
         """
@@ -62,95 +160,459 @@ class MedicalDataScraper:
         """
         if message.photo:
             try:
-                image_dir = os.path.join(DATA_DIR, 'images', channel_name)
-                os.makedirs(image_dir, exist_ok=True)
-                
-                filename = f"{message.id}.jpg"
-                file_path = os.path.join(image_dir, filename)
-                
+                file_path = self.image_path(message, channel_name)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
                 if not os.path.exists(file_path):
-                    await self.client.download_media(message, file=file_path)
+                    if self.image_store is None:
+                        await self._call(self.client.download_media, message, file=file_path)
+                        self.stats["images"] += 1
+                    else:
+                        await self._store_image(message, file_path)
                 return file_path
             except Exception as e:
                 logger.error(f"Failed to download image for msg {message.id}: {e}")
                 return None
         return None
 
+    @staticmethod
+    def image_path(message: Message, channel_name: str) -> str:
+        """Where a message's photo is saved: data/raw/images/<channel>/<message id>.jpg."""
+        return os.path.join(DATA_DIR, 'images', channel_name, f"{message.id}.jpg")
+
+    async def _store_image(self, message: Message, file_path: str) -> None:
+        """
+        Saves a photo through the image store: forwards of an already stored
+        Telegram photo are linked without downloading, and downloads that
+        duplicate a stored image (exactly or perceptually) are linked to it.
+        """
+        photo_id = getattr(message.photo, 'id', None)
+        if photo_id is not None and await asyncio.to_thread(self.image_store.link_photo, photo_id, file_path):
+            self.stats["duplicate_images"] += 1
+            return
+
+        part_path = f"{file_path}.part"
+        await self._call(self.client.download_media, message, file=part_path)
+        self.stats["images"] += 1
+        stored = await asyncio.to_thread(self.image_store.add, part_path, file_path, photo_id)
+        if stored.match != 'new':
+            self.stats["duplicate_images"] += 1
+
+    async def _download_worker(self) -> None:
+        """
+        Consumes (message, channel, future) jobs from the download queue.
+
+        Every job's future is resolved, even when a step fails, so _collect
+        never waits forever and the worker stays alive for the next job.
+        """
+        while True:
+            message, channel_name, future = await self._download_queue.get()
+            file_path = None
+            try:
+                file_path = await self.download_image(message, channel_name)
+                if file_path and self.image_sink is not None:
+                    await self.image_sink(channel_name, file_path, message.date)
+            except Exception as e:
+                # The image is on disk if the download succeeded, so the message keeps its path
+                logger.error(f"Failed to process image for msg {message.id}: {e}")
+            finally:
+                # Also reached when the pool is cancelled mid-job
+                if not future.done():
+                    future.set_result(file_path)
+                self._download_queue.task_done()
+
+    @asynccontextmanager
+    async def download_pool(self) -> AsyncIterator[None]:
+        """Runs the download workers for the duration of the block (re-entrant)."""
+        if self._download_queue is not None:
+            yield
+            return
+
+        # Bounded so that a fast channel cannot buffer unlimited pending photos
+        self._download_queue = asyncio.Queue(maxsize=self.download_workers * 4)
+        workers = [asyncio.create_task(self._download_worker()) for _ in range(self.download_workers)]
+        try:
+            yield
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._download_queue = None
+
+    async def _enqueue_download(self, message: Message, channel_name: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        await self._download_queue.put((message, channel_name, future))
+        return future
+
+    async def _collect(
+        self,
+        entity: Any,
+        channel_username: str,
+        limit: int,
+        since: Optional[datetime] = None,
+        download: bool = True,
+        **iter_kwargs: Any
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[int]]:
+        """
+        Reads up to `limit` messages and downloads their photos.
+
+        Extra keyword arguments (min_id, offset_id, reverse) are passed to
+        iter_messages. If a FloodWaitError interrupts paging, reading resumes
+        after the last message seen. Newest-first reads stop at the first
+        message posted before `since`. With download=False, photos are not
+        downloaded (or passed to the image sink); messages get the path of a
+        photo already on disk.
+
+        Returns:
+            Tuple: Messages buffered by date (YYYY-MM-DD), and every message id read.
+        """
+        data_buffer: Dict[str, List[Dict[str, Any]]] = {}
+        pending_images: List[tuple] = []
+        message_ids: List[int] = []
+        clean_name = channel_username.strip('@')
+
+        offset_id = iter_kwargs.pop('offset_id', 0)
+        fetched, retries = 0, 0
+        while fetched < limit:
+            try:
+                await self.rate_limiter.acquire()
+                async for message in self.client.iter_messages(
+                    entity, limit=limit - fetched, offset_id=offset_id, **iter_kwargs
+                ):
+                    if since is not None and message.date and message.date < since:
+                        break
+                    # One token per history page that Telethon requests
+                    if fetched and fetched % HISTORY_PAGE_SIZE == 0:
+                        await self.rate_limiter.acquire()
+                    offset_id = message.id
+                    fetched += 1
+                    message_ids.append(message.id)
+
+                    if not message.date:
+                        continue
+
+                    try:
+                        msg_date_str = message.date.strftime('%Y-%m-%d')
+
+                        data_item = {
+                            "message_id": message.id,
+                            "channel_name": channel_username,
+                            "channel_title": entity.title,
+                            "message_date": message.date.isoformat(),
+                            "message_text": message.text,
+                            "has_media": bool(message.media),
+                            "image_path": None,
+                            "views": message.views or 0,
+                            "forwards": message.forwards or 0,
+                            "scraped_at": datetime.now(timezone.utc).isoformat()
+                        }
+
+                        if message.photo and download:
+                            future = await self._enqueue_download(message, clean_name)
+                            pending_images.append((data_item, future))
+                        elif message.photo:
+                            file_path = self.image_path(message, clean_name)
+                            data_item["image_path"] = file_path if os.path.exists(file_path) else None
+
+                        if msg_date_str not in data_buffer:
+                            data_buffer[msg_date_str] = []
+                        data_buffer[msg_date_str].append(data_item)
+                        if download:
+                            self.stats["messages"] += 1
+
+                    except Exception as e:
+                        logger.warning(f"Error processing message {message.id}: {e}")
+                        continue
+                break
+            except FloodWaitError as e:
+                retries += 1
+                if retries > self.max_flood_retries:
+                    raise
+                logger.warning(
+                    f"Rate limited while reading {channel_username}. "
+                    f"Sleeping {e.seconds} seconds before resuming."
+                )
+                self.rate_limiter.pause(e.seconds)
+
+        for data_item, future in pending_images:
+            data_item["image_path"] = await future
+
+        return data_buffer, message_ids
+
+    async def refresh_engagement(
+        self,
+        entity: Any,
+        channel_username: str,
+        last_id: int
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[int]]:
+        """
+        Re-reads the newest already-saved messages (at or below last_id, and
+        not below the checkpointed backfill_offset_id) so that saving them
+        again records their current views and forwards.
+
+        Incremental scrapes only read messages above the checkpoint, so without
+        this pass a message is observed once and raw.engagement_deltas never
+        shows its growth. The pass is bounded by REFRESH_MESSAGES and
+        REFRESH_DAYS, and downloads no photos.
+        """
+        if REFRESH_MESSAGES <= 0 or REFRESH_DAYS <= 0:
+            return {}, []
+        data_buffer, message_ids = await self._collect(
+            entity, channel_username, REFRESH_MESSAGES,
+            since=datetime.now(timezone.utc) - timedelta(days=REFRESH_DAYS),
+            download=False, offset_id=last_id + 1,
+            min_id=(self.checkpoints.backfill_offset_id(channel_username) or 1) - 1
+        )
+        self.stats["refreshed"] += len(message_ids)
+        return data_buffer, message_ids
+
     async def scrape_channel(self, channel_username: str, limit: int = 100) -> None:
         """
-        Scrapes messages from a single channel and saves them to JSON.
+        Scrapes new messages from a single channel and merges them into the JSON lake.
+
+        The first scrape of a channel reads the newest `limit` messages. Later
+        scrapes resume above the checkpointed last_message_id, oldest first, so
+        a run capped by `limit` never leaves a gap for the next one, and then
+        refresh the views/forwards of recent messages (refresh_engagement).
         
         Args:
             channel_username (str): The Telegram handle (e.g., @channel).
             limit (int): Maximum number of messages to retrieve.
         """
-        logger.info(f"Starting scrape for {channel_username}...")
-        data_buffer: Dict[str, List[Dict[str, Any]]] = {}
+        # One stage per channel, so a slow channel stands out in the run report
+        with instrumentation.stage(f"scrape_channel[{channel_username}]"):
+            logger.info(f"Starting scrape for {channel_username}...")
+
+            try:
+                async with self.download_pool():
+                    entity = await self._call(self.client.get_entity, channel_username)
+                    last_id = self.checkpoints.last_message_id(channel_username)
+
+                    refresh_buffer, refreshed = {}, []
+                    if last_id is None:
+                        data_buffer, message_ids = await self._collect(entity, channel_username, limit)
+                    else:
+                        data_buffer, message_ids = await self._collect(
+                            entity, channel_username, limit, min_id=last_id, offset_id=last_id, reverse=True
+                        )
+                        refresh_buffer, refreshed = await self.refresh_engagement(entity, channel_username, last_id)
+
+                instrumentation.count("messages", len(message_ids))
+                instrumentation.count("images", sum(
+                    1 for items in data_buffer.values() for item in items if item["image_path"]
+                ))
+                # Refreshed ids are all at or below last_id, so they never collide with new ones
+                for date_key, items in refresh_buffer.items():
+                    data_buffer.setdefault(date_key, []).extend(items)
+                if not message_ids and not refreshed:
+                    logger.info(f"No new messages for {channel_username}.")
+                    return
+
+                if self.save_data(data_buffer, channel_username.strip('@')) and message_ids:
+                    self.checkpoints.record_messages(channel_username, min(message_ids), max(message_ids))
+                logger.info(f"Finished scraping {channel_username} ({len(message_ids)} new messages, "
+                            f"{len(refreshed)} refreshed).")
+
+            except FloodWaitError as e:
+                logger.error(f"Giving up on {channel_username}: still rate limited after "
+                             f"{self.max_flood_retries} retries ({e.seconds} seconds).")
+            except Exception as e:
+                logger.error(f"Critical error scraping {channel_username}: {e}", exc_info=True)
+
+    async def backfill_channel(
+        self,
+        channel_username: str,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        max_batches: int = BACKFILL_MAX_BATCHES
+    ) -> None:
+        """
+        Pages backwards through a channel's history in bounded batches.
+
+        Each batch is saved and checkpointed (backfill_offset_id) before the
+        next one is requested, so an interrupted backfill resumes where it stopped.
+
+        Args:
+            channel_username (str): The Telegram handle (e.g., @channel).
+            batch_size (int): Messages per batch.
+            max_batches (int): Batches to fetch in this run.
+        """
+        checkpoint = self.checkpoints.get(channel_username)
+        if checkpoint.get('backfill_complete'):
+            logger.info(f"Backfill already complete for {channel_username}.")
+            return
 
         try:
-            entity = await self.client.get_entity(channel_username)
-            channel_title = entity.title
-            clean_name = channel_username.strip('@')
-            
-            async for message in self.client.iter_messages(entity, limit=limit):
-                if not message.date:
-                    continue
+            async with self.download_pool():
+                entity = await self._call(self.client.get_entity, channel_username)
 
-                try:
-                    msg_date_str = message.date.strftime('%Y-%m-%d')
-                    image_path = await self.download_image(message, clean_name)
-
-                    data_item = {
-                        "message_id": message.id,
-                        "channel_name": channel_username,
-                        "channel_title": channel_title,
-                        "message_date": message.date.isoformat(),
-                        "message_text": message.text,
-                        "has_media": bool(message.media),
-                        "image_path": image_path,
-                        "views": message.views or 0,
-                        "forwards": message.forwards or 0,
-                        "scraped_at": datetime.now().isoformat()
-                    }
-
-                    if msg_date_str not in data_buffer:
-                        data_buffer[msg_date_str] = []
-                    data_buffer[msg_date_str].append(data_item)
-
-                except Exception as e:
-                    logger.warning(f"Error processing message {message.id}: {e}")
-                    continue
+                for batch in range(max_batches):
+                    offset_id = self.checkpoints.backfill_offset_id(channel_username) or 0
+                    data_buffer, message_ids = await self._collect(
+                        entity, channel_username, batch_size, offset_id=offset_id
+                    )
+
+                    if message_ids:
+                        if not self.save_data(data_buffer, channel_username.strip('@')):
+                            return
+                        self.checkpoints.record_messages(channel_username, min(message_ids), max(message_ids))
+                        logger.info(f"Backfilled {len(message_ids)} messages of {channel_username} "
+                                    f"(batch {batch + 1}, down to id {min(message_ids)}).")
 
-            self.save_data(data_buffer, clean_name)
-            logger.info(f"Finished scraping {channel_username}.")
+                    if len(message_ids) < batch_size:
+                        self.checkpoints.update(channel_username, backfill_complete=True)
+                        logger.info(f"Backfill reached the start of {channel_username}.")
+                        return
 
         except FloodWaitError as e:
-            logger.error(f"Rate limited by Telegram. Must wait {e.seconds} seconds.")
-            # In a real scheduler, we might sleep, but here we just log and exit
+            logger.error(f"Pausing backfill of {channel_username}: still rate limited after "
+                         f"{self.max_flood_retries} retries ({e.seconds} seconds).")
         except Exception as e:
-            logger.error(f"Critical error scraping {channel_username}: {e}", exc_info=True)
+            logger.error(f"Critical error backfilling {channel_username}: {e}", exc_info=True)
 
-    def save_data(self, data_buffer: Dict[str, List[Dict]], channel_name: str) -> None:
-        """Saves buffered data to partitioned JSON files."""
+    async def scrape_channels(
+        self,
+        channels: List[str],
+        limit: int = 100,
+        concurrency: int = CHANNEL_CONCURRENCY,
+        backfill: bool = False
+    ) -> None:
+        """
+        Scrapes several channels at once, sharing one download pool and rate limiter.
+
+        Args:
+            channels (List[str]): Telegram handles to scrape.
+            limit (int): Maximum number of messages to retrieve per channel
+                (messages per batch when backfilling).
+            concurrency (int): Maximum number of channels scraped at the same time.
+            backfill (bool): Page through older history instead of fetching new messages.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def scrape_one(channel: str) -> None:
+            async with semaphore:
+                if backfill:
+                    await self.backfill_channel(channel, batch_size=limit)
+                else:
+                    await self.scrape_channel(channel, limit=limit)
+
+        async with self.download_pool():
+            await asyncio.gather(*(scrape_one(channel) for channel in channels))
+
+        if self.stats["duplicate_images"]:
+            logger.info(
+                f"Downloaded {self.stats['images']} images; "
+                f"{self.stats['duplicate_images']} were duplicates linked to an already stored image."
+            )
+
+    def save_data(self, data_buffer: Dict[str, List[Dict]], channel_name: str) -> bool:
+        """
+        Merges buffered data into partitioned JSON files, or with LAKE_FORMAT=parquet
+        appends a Parquet part file to each date=/channel= partition.
+
+        Messages already in a day's file are kept; re-scraped ones are replaced
+        by the newer copy (fresher views/forwards).
+
+        Returns:
+            bool: True if every partition was written.
+        """
+        if parquet_lake.LAKE_FORMAT == 'parquet':
+            return self._save_parquet(data_buffer, channel_name)
+
+        ok = True
         for date_key, messages in data_buffer.items():
             target_dir = os.path.join(DATA_DIR, 'telegram_messages', date_key)
             os.makedirs(target_dir, exist_ok=True)
             
             file_path = os.path.join(target_dir, f"{channel_name}.json")
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(messages, f, ensure_ascii=False, indent=4)
-            except IOError as e:
+                merged: Dict[int, Dict] = {}
+                if os.path.exists(file_path):
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        merged = {item["message_id"]: item for item in json.load(f)}
+                merged.update((item["message_id"], item) for item in messages)
+
+                tmp_path = f"{file_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(
+                        sorted(merged.values(), key=lambda item: item["message_id"], reverse=True),
+                        f, ensure_ascii=False, indent=4
+                    )
+                os.replace(tmp_path, file_path)
+            except (IOError, json.JSONDecodeError) as e:
                 logger.error(f"Failed to write file {file_path}: {e}")
+                ok = False
+        return ok
+
+    def _save_parquet(self, data_buffer: Dict[str, List[Dict]], channel_name: str) -> bool:
+        # Part files are append-only; `python src/parquet_lake.py compact` merges them
+        ok = True
+        for date_key, messages in data_buffer.items():
+            try:
+                parquet_lake.write_partition(
+                    os.path.join(DATA_DIR, 'telegram_messages'), date_key, channel_name, messages
+                )
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to write partition {date_key}/{channel_name}: {e}")
+                ok = False
+        return ok
+
+@instrumentation.instrumented()
+async def scrape(scraper: MedicalDataScraper, args: argparse.Namespace) -> None:
+    while True:
+        if args.backfill:
+            await scraper.scrape_channels(CHANNELS, limit=args.batch_size, backfill=True)
+        else:
+            await scraper.scrape_channels(CHANNELS, limit=200)
+        if not args.poll_interval:
+            return
+        await asyncio.sleep(args.poll_interval)
 
-async def main():
+
+def setup_logging() -> None:
+    """Log to the console and logs/scraper.log, unless the caller has already configured logging."""
+    if logging.getLogger().handlers:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(LOG_DIR, 'scraper.log')),
+            logging.StreamHandler()
+        ]
+    )
+
+
+async def main(args: argparse.Namespace) -> Dict[str, int]:
+    setup_logging()
     client = TelegramClient('medical_scraper_session', API_ID, API_HASH)
     await client.start(phone=PHONE)
-    
-    scraper = MedicalDataScraper(client)
-    
-    for channel in CHANNELS:
-        await scraper.scrape_channel(channel, limit=200)
+
+    if not args.stream:
+        scraper = MedicalDataScraper(client)
+        await scrape(scraper, args)
+        return scraper.stats
+
+    # Detection needs torch/ultralytics, so it is only imported in streaming mode
+    try:
+        from .stream_detect import DetectionStream
+    except ImportError:
+        from stream_detect import DetectionStream
+
+    async with DetectionStream() as stream:
+        scraper = MedicalDataScraper(client, image_sink=stream.publish)
+        await scrape(scraper, args)
+    return scraper.stats
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape medical Telegram channels into the data lake.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Page through older history instead of fetching new messages.")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE,
+                        help="Messages per backfill batch.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Run YOLO detection on each image as soon as it is downloaded.")
+    parser.add_argument("--poll-interval", type=float, default=0,
+                        help="Keep scraping, waiting this many seconds between passes (0: run once).")
+    with instrumentation.run_report("scrape"):
+        asyncio.run(main(parser.parse_args()))
\ No newline at end of file
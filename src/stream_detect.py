@@ -0,0 +1,255 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+from datetime import datetime, timezone
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, text
+
+try:
+    from .bulk_ingest import upsert_records
+    from . import yolo_detect
+except ImportError:  # executed as a script from src/
+    from bulk_ingest import upsert_records
+    import yolo_detect
+
+logger = logging.getLogger(__name__)
+
+# Images waiting for detection; when full, publishers wait, which in turn
+# stalls the scraper's download workers and its history paging
+QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', '64'))
+# A micro-batch is flushed when it is full or its oldest image has waited this long
+MAX_WAIT = float(os.getenv('STREAM_MAX_WAIT', '1.0'))
+
+
+@dataclass
+class QueuedImage:
+    channel_name: str
+    image_path: str
+    posted_at: Optional[datetime]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class DetectionStream:
+    """
+    Runs YOLO on images as soon as they are downloaded, instead of after the
+    whole scrape.
+
+    Producers (MedicalDataScraper's download workers) `publish` image paths
+    onto a bounded asyncio queue. A consumer groups them into micro-batches
+    of up to batch_size images (or whatever arrived within max_wait seconds),
+    skips content already in raw.detection_cache, and hands the rest to a
+    pool of worker processes that run yolo_detect.detect_images (which labels
+    each image with get_image_category). Up to `workers` batches are in
+    flight; each batch's results are written in one transaction.
+
+    Use as `async with DetectionStream() as stream:` so the queue is drained
+    and the pool shut down on exit.
+    """
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = yolo_detect.BATCH_SIZE,
+        max_wait: float = MAX_WAIT,
+        workers: int = yolo_detect.WORKERS,
+        model_id: Optional[str] = None,
+        detect_shard: Callable[[List[Tuple[str, str]]], List[Dict[str, Any]]] = yolo_detect._detect_shard,
+        initializer: Optional[Callable[..., None]] = yolo_detect._init_worker,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.workers = max(1, workers)
+        self.model_id = model_id
+        self.detect_shard = detect_shard
+        self.initializer = initializer
+        self.stats = {"published": 0, "cached": 0, "inferred": 0, "upserted": 0, "batches": 0,
+                      "publish_wait_s": 0.0}
+        self.latencies: List[float] = []
+        self.post_ages: List[float] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._cached: Set[str] = set()
+        self.engine = None
+
+    async def __aenter__(self) -> "DetectionStream":
+        self.engine = create_engine(yolo_detect.DB_URL)
+        if self.model_id is None:
+            self.model_id = await asyncio.to_thread(yolo_detect.current_model_id)
+        self._cached = await asyncio.to_thread(self._load_cached)
+
+        if yolo_detect.WORKER_ADDRESS and self.detect_shard is yolo_detect._detect_shard:
+            # As in run_detection, the resident worker infers (under the model id
+            # results are cached with), so no model is loaded here
+            self.detect_shard = functools.partial(
+                yolo_detect._import_detect_worker().detect_remote, address=yolo_detect.WORKER_ADDRESS
+            )
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        else:
+            initargs = ()
+            if self.initializer is yolo_detect._init_worker:
+                weights = await asyncio.to_thread(yolo_detect.inference_weights)
+                initargs = (weights, max(1, (os.cpu_count() or 1) // self.workers), yolo_detect.IMGSZ)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=self.initializer, initargs=initargs
+            )
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._write_lock = asyncio.Lock()
+        self._consumer = asyncio.create_task(self._consume())
+        logger.info(
+            f"Streaming detection for {self.model_id}: queue {self.queue_size}, "
+            f"batches of {self.batch_size} (max wait {self.max_wait}s), {self.workers} workers"
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # None tells the consumer to flush what it holds and stop
+        await self._queue.put(None)
+        await self._consumer
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        self._executor.shutdown()
+        self.engine.dispose()
+        self.log_stats()
+
+    def _load_cached(self) -> Set[str]:
+        with self.engine.begin() as conn:
+            yolo_detect.ensure_tables(conn)
+            return {
+                row.image_hash for row in conn.execute(
+                    text(
+                        "SELECT image_hash FROM raw.detection_cache "
+                        "WHERE model_id = :model_id AND detected_classes IS NOT NULL"
+                    ),
+                    {"model_id": self.model_id}
+                )
+            }
+
+    async def publish(self, channel_name: str, image_path: str, posted_at: Optional[datetime] = None) -> None:
+        """Queues a downloaded image; waits while the queue is full."""
+        start = time.monotonic()
+        await self._queue.put(QueuedImage(channel_name, image_path, posted_at))
+        self.stats["publish_wait_s"] += time.monotonic() - start
+        self.stats["published"] += 1
+
+    async def _next_batch(self) -> Tuple[List[QueuedImage], bool]:
+        """Up to batch_size images, waiting at most max_wait after the first; True once closed."""
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch, deadline = [first], time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _consume(self) -> None:
+        closed = False
+        while not closed:
+            batch, closed = await self._next_batch()
+            if not batch:
+                continue
+            # Waits for a free worker, so at most `workers` batches are in flight
+            await self._slots.acquire()
+            task = asyncio.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _process(self, batch: List[QueuedImage]) -> None:
+        try:
+            hashes = await asyncio.to_thread(
+                lambda: {item.image_path: yolo_detect.file_sha256(item.image_path) for item in batch}
+            )
+            to_infer, seen = [], set()
+            for item in batch:
+                image_hash = hashes[item.image_path]
+                if image_hash not in self._cached and image_hash not in seen:
+                    seen.add(image_hash)
+                    to_infer.append((item.channel_name, item.image_path))
+
+            records = []
+            if to_infer:
+                loop = asyncio.get_running_loop()
+                records = await loop.run_in_executor(self._executor, self.detect_shard, to_infer)
+
+            async with self._write_lock:
+                changed = await asyncio.to_thread(self._write, batch, hashes, records)
+            self._cached.update(hashes[record['image_path']] for record in records)
+
+            now, now_utc = time.monotonic(), datetime.now(timezone.utc)
+            self.latencies.extend(now - item.enqueued_at for item in batch)
+            self.post_ages.extend(
+                (now_utc - item.posted_at).total_seconds() for item in batch if item.posted_at
+            )
+            self.stats["batches"] += 1
+            self.stats["cached"] += len(batch) - len(to_infer)
+            self.stats["inferred"] += len(records)
+            self.stats["upserted"] += changed
+        except Exception as e:
+            logger.error(f"Detection batch starting at {batch[0].image_path} failed: {e}")
+        finally:
+            self._slots.release()
+
+    def _write(self, batch: List[QueuedImage], hashes: Dict[str, str], records: List[Dict[str, Any]]) -> int:
+        """Caches new results and their boxes, then points the batch's messages at them."""
+        cache_records, box_records = [], []
+        for record in records:
+            image_hash = hashes[record['image_path']]
+            cache_records.append({**record, 'image_hash': image_hash, 'model_id': self.model_id})
+            box_records.extend(
+                {**box, 'image_hash': image_hash, 'model_id': self.model_id} for box in record['boxes']
+            )
+        image_refs = [
+            {
+                # Filename is message_id.jpg
+                'message_id': int(os.path.basename(item.image_path).split('.')[0]),
+                'channel_name': item.channel_name,
+                'image_path': item.image_path,
+                'image_hash': hashes[item.image_path],
+            }
+            for item in batch
+        ]
+        with self.engine.begin() as conn:
+            if cache_records:
+                upsert_records(conn, 'raw.detection_cache', yolo_detect.CACHE_COLUMNS,
+                               ['image_hash', 'model_id'], cache_records)
+                upsert_records(conn, 'raw.detection_boxes', yolo_detect.BOX_COLUMNS,
+                               ['image_hash', 'model_id', 'box_index'], box_records)
+            return yolo_detect.merge_image_refs(conn, self.model_id, image_refs)
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"Streamed {self.stats['published']} images in {self.stats['batches']} batches: "
+            f"{self.stats['inferred']} inferred, {self.stats['cached']} from cache, "
+            f"{self.stats['upserted']} rows upserted; publishers waited "
+            f"{self.stats['publish_wait_s']:.1f}s on a full queue"
+        )
+        if self.latencies:
+            logger.info(
+                f"Download-to-detection latency: p50 {_percentile(self.latencies, 0.5):.2f}s, "
+                f"p95 {_percentile(self.latencies, 0.95):.2f}s, max {max(self.latencies):.2f}s"
+            )
+        if self.post_ages:
+            logger.info(f"Post-to-detection latency: p50 {_percentile(self.post_ages, 0.5):.1f}s")
@@ -0,0 +1,50 @@
+import os
+import logging
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DB_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
+         f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
+
+CREATE_VERSION_SQL = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    -- Single-row stamp that changes whenever the marts are rebuilt
+    CREATE TABLE IF NOT EXISTS raw.warehouse_version (
+        id integer PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version bigint NOT NULL,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    );
+"""
+
+
+def bump_warehouse_version() -> int:
+    """
+    Increments the warehouse version stamp after a successful `dbt run`.
+    The API drops its response cache when it sees the new version.
+
+    Returns:
+        int: The new version.
+    """
+    engine = create_engine(DB_URL)
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_VERSION_SQL))
+        version = conn.execute(text("""
+            INSERT INTO raw.warehouse_version (id, version, updated_at)
+            VALUES (1, 1, now())
+            ON CONFLICT (id) DO UPDATE SET
+                version = raw.warehouse_version.version + 1,
+                updated_at = now()
+            RETURNING version
+        """)).scalar()
+    logger.info(f"Warehouse version bumped to {version}")
+    return version
+
+
+if __name__ == "__main__":
+    bump_warehouse_version()
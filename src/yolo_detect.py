@@ -1,14 +1,42 @@
 import os
-import pandas as pd
+import time
+import hashlib
+import logging
+import argparse
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import cv2
+import torch
 from ultralytics import YOLO
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+try:
+    from .bulk_ingest import copy_records, upsert_records
+    from . import inference_backends, instrumentation
+except ImportError:  # executed as a script: python src/yolo_detect.py
+    from bulk_ingest import copy_records, upsert_records
+    import inference_backends
+    import instrumentation
+
 load_dotenv()
 
 
 MODEL_PATH = 'yolov8n.pt' 
 IMAGES_DIR = os.path.join('data', 'raw', 'images')
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Inference tuning
+IMGSZ = int(os.getenv('YOLO_IMGSZ', '640'))
+BATCH_SIZE = int(os.getenv('YOLO_BATCH_SIZE', '16'))
+WORKERS = int(os.getenv('YOLO_WORKERS', str(max(1, (os.cpu_count() or 1) // 2))))
+PREFETCH_THREADS = int(os.getenv('YOLO_PREFETCH_THREADS', '4'))
+# pytorch, onnx or openvino, optionally int8 (see inference_backends.py)
+BACKEND = inference_backends.BACKEND
+INT8 = inference_backends.INT8
+# host:port of a resident detect_worker.py to submit images to instead of loading the model here
+WORKER_ADDRESS = os.getenv('YOLO_WORKER_ADDRESS', '')
 DB_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
          f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
 
@@ -34,83 +62,466 @@ def get_image_category(detected_objects):
     else:
         return 'other'
 
-def run_detection():
-    print("Loading YOLO model...")
-    model = YOLO(MODEL_PATH)
-    
-    records = []
-    
-    # Walk through channel folders
-    if not os.path.exists(IMAGES_DIR):
-        print(f"Image directory {IMAGES_DIR} not found.")
-        return
+CACHE_COLUMNS = ['image_hash', 'model_id', 'detected_objects', 'detected_classes', 'avg_confidence', 'image_category']
+BOX_COLUMNS = ['image_hash', 'model_id', 'box_index', 'class_name', 'confidence', 'x1', 'y1', 'x2', 'y2']
+IMAGE_REF_COLUMNS = ['message_id', 'channel_name', 'image_path', 'image_hash']
 
-    print("Starting detection scan (this may take a while)...")
-    
-    for channel_name in os.listdir(IMAGES_DIR):
+CREATE_DETECTIONS_SQL = """
+    CREATE SCHEMA IF NOT EXISTS raw;
+
+    CREATE TABLE IF NOT EXISTS raw.yolo_detections (
+        message_id bigint NOT NULL,
+        channel_name text NOT NULL,
+        image_path text,
+        detected_objects text,
+        avg_confidence double precision,
+        image_category text,
+        image_hash text,
+        model_id text,
+        updated_at timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (channel_name, message_id)
+    );
+    -- Lets the incremental dbt marts pick up only rows changed since their last run
+    ALTER TABLE raw.yolo_detections ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+    -- Distinct class names per image, so object filters use the GIN index instead of string parsing
+    ALTER TABLE raw.yolo_detections ADD COLUMN IF NOT EXISTS detected_classes text[];
+    CREATE INDEX IF NOT EXISTS yolo_detections_classes_idx ON raw.yolo_detections USING gin (detected_classes);
+
+    -- Inference results by image content and model, reused across runs
+    CREATE TABLE IF NOT EXISTS raw.detection_cache (
+        image_hash text NOT NULL,
+        model_id text NOT NULL,
+        detected_objects text,
+        avg_confidence double precision,
+        image_category text,
+        created_at timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (image_hash, model_id)
+    );
+    -- NULL on entries cached before boxes were stored; those images are inferred again
+    ALTER TABLE raw.detection_cache ADD COLUMN IF NOT EXISTS detected_classes text[];
+
+    -- One row per detected box; coordinates are normalized to 0..1 (xyxy)
+    CREATE TABLE IF NOT EXISTS raw.detection_boxes (
+        image_hash text NOT NULL,
+        model_id text NOT NULL,
+        box_index integer NOT NULL,
+        class_name text NOT NULL,
+        confidence double precision NOT NULL,
+        x1 real, y1 real, x2 real, y2 real,
+        PRIMARY KEY (image_hash, model_id, box_index),
+        FOREIGN KEY (image_hash, model_id) REFERENCES raw.detection_cache ON DELETE CASCADE
+    );
+    CREATE INDEX IF NOT EXISTS detection_boxes_class_idx ON raw.detection_boxes (class_name);
+"""
+
+# Point every image at its cached result, touching only rows that changed
+MERGE_DETECTIONS_SQL = """
+    INSERT INTO raw.yolo_detections (
+        message_id, channel_name, image_path, detected_objects, detected_classes,
+        avg_confidence, image_category, image_hash, model_id
+    )
+    SELECT r.message_id, r.channel_name, r.image_path, c.detected_objects, c.detected_classes,
+           c.avg_confidence, c.image_category, r.image_hash, c.model_id
+    FROM _image_refs r
+    JOIN raw.detection_cache c
+        ON c.image_hash = r.image_hash AND c.model_id = :model_id
+    LEFT JOIN raw.yolo_detections y
+        ON y.channel_name = r.channel_name AND y.message_id = r.message_id
+    WHERE y.message_id IS NULL
+       OR (y.image_path, y.image_hash, y.model_id, y.detected_classes, y.avg_confidence, y.image_category)
+          IS DISTINCT FROM
+          (r.image_path, r.image_hash, c.model_id, c.detected_classes, c.avg_confidence, c.image_category)
+    ON CONFLICT (channel_name, message_id) DO UPDATE SET
+        image_path = EXCLUDED.image_path,
+        detected_objects = EXCLUDED.detected_objects,
+        detected_classes = EXCLUDED.detected_classes,
+        avg_confidence = EXCLUDED.avg_confidence,
+        image_category = EXCLUDED.image_category,
+        image_hash = EXCLUDED.image_hash,
+        model_id = EXCLUDED.model_id,
+        updated_at = now()
+"""
+
+def file_sha256(path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_model_id(model_path=MODEL_PATH):
+    """
+    Identifies the model by path and weights hash, e.g. 'yolov8n.pt@3f1a...',
+    plus the backend variant unless it is eager PyTorch at imgsz 640, e.g.
+    'yolov8n.pt@3f1a...+onnx-int8@640'.
+    Downloads the weights first if ultralytics has not fetched them yet.
+    """
+    if not os.path.exists(model_path):
+        YOLO(model_path)
+    variant = inference_backends.variant_name(BACKEND, IMGSZ, INT8)
+    return f"{model_path}@{file_sha256(model_path)[:16]}{variant}"
+
+def inference_weights(model_path=MODEL_PATH):
+    """The model file YOLO() loads for BACKEND, IMGSZ and INT8, exported on first use."""
+    if not os.path.exists(model_path):
+        YOLO(model_path)
+    return inference_backends.export_weights(model_path, file_sha256(model_path), BACKEND, IMGSZ, INT8)
+
+def current_model_id():
+    """The id results are cached under: the resident worker's model when WORKER_ADDRESS is set."""
+    if WORKER_ADDRESS:
+        detect_worker = _import_detect_worker()
+        with detect_worker.DetectionClient(WORKER_ADDRESS) as client:
+            return client.info()['model_id']
+    return get_model_id()
+
+def _import_detect_worker():
+    # detect_worker imports this module, so it is imported on first use
+    try:
+        from . import detect_worker
+    except ImportError:
+        import detect_worker
+    return detect_worker
+
+def ensure_tables(conn):
+    """Creates the detection tables, replacing a legacy keyless raw.yolo_detections."""
+    has_table = conn.execute(text("SELECT to_regclass('raw.yolo_detections') IS NOT NULL")).scalar()
+    if has_table:
+        has_key = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.table_constraints
+                WHERE table_schema = 'raw' AND table_name = 'yolo_detections'
+                AND constraint_type = 'PRIMARY KEY'
+            )
+        """)).scalar()
+        if not has_key:
+            print("Replacing legacy raw.yolo_detections (no primary key) and dependent views...")
+            conn.execute(text("DROP TABLE raw.yolo_detections CASCADE;"))
+    conn.execute(text(CREATE_DETECTIONS_SQL))
+
+def invalidate_cache(model_id):
+    """Deletes every cached detection for one model, forcing re-inference on the next run."""
+    engine = create_engine(DB_URL)
+    with engine.begin() as conn:
+        ensure_tables(conn)
+        deleted = conn.execute(
+            text("DELETE FROM raw.detection_cache WHERE model_id = :model_id"),
+            {"model_id": model_id}
+        ).rowcount
+    print(f"Invalidated {deleted} cached detections for model {model_id}.")
+
+def list_images():
+    """Returns (channel_name, image_path) for every image under IMAGES_DIR."""
+    images = []
+    for channel_name in sorted(os.listdir(IMAGES_DIR)):
         channel_path = os.path.join(IMAGES_DIR, channel_name)
         if not os.path.isdir(channel_path):
             continue
             
-        for img_file in os.listdir(channel_path):
-            if not img_file.endswith(('.jpg', '.png', '.jpeg')):
+        for img_file in sorted(os.listdir(channel_path)):
+            if img_file.endswith(('.jpg', '.png', '.jpeg')):
+                images.append((channel_name, os.path.join(channel_path, img_file)))
+    return images
+
+def load_image(img_path, imgsz=None):
+    """
+    Decodes an image (BGR) and shrinks it so its longer side is imgsz
+    (default IMGSZ), the same scale YOLO's letterbox would apply.
+    """
+    imgsz = imgsz or IMGSZ
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError("could not decode image")
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    if r < 1:
+        img = cv2.resize(img, (round(w * r), round(h * r)), interpolation=cv2.INTER_LINEAR)
+    return img
+
+def detect_images(model, images, batch_size=BATCH_SIZE, prefetch_threads=PREFETCH_THREADS):
+    """
+    Runs batched inference over (channel_name, image_path) pairs, yielding one
+    record per image. The next batch is decoded in a thread pool while the
+    current one is being inferred.
+    """
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=prefetch_threads) as pool:
+        def prefetch(batch):
+            return [(item, pool.submit(load_image, item[1])) for item in batch]
+
+        upcoming = prefetch(batches[0]) if batches else []
+        for index in range(len(batches)):
+            current = upcoming
+            if index + 1 < len(batches):
+                upcoming = prefetch(batches[index + 1])
+
+            decoded, arrays = [], []
+            for item, future in current:
+                try:
+                    arrays.append(future.result())
+                    decoded.append(item)
+                except Exception as e:
+                    print(f"Error processing {item[1]}: {e}")
+            if not arrays:
                 continue
-                
-            img_path = os.path.join(channel_path, img_file)
-            message_id = img_file.split('.')[0] # Filename is message_id.jpg
-            
+
             try:
                 # Run Inference
-                results = model(img_path, verbose=False)
-                result = results[0]
-                
-                # Extract detected classes
-                detected_classes = []
-                confidences = []
-                
-                for box in result.boxes:
-                    class_id = int(box.cls[0])
-                    class_name = model.names[class_id]
-                    conf = float(box.conf[0])
-                    
-                    detected_classes.append(class_name)
-                    confidences.append(conf)
-                
-                # Determine Category
-                category = get_image_category(detected_classes)
+                results = model(arrays, imgsz=IMGSZ, verbose=False)
+            except Exception as e:
+                print(f"Error processing batch starting at {decoded[0][1]}: {e}")
+                continue
+
+            for (channel_name, img_path), result in zip(decoded, results):
+                # Whole-tensor reads instead of a Python loop over boxes
+                class_ids = result.boxes.cls.int().tolist()
+                confidences = result.boxes.conf.tolist()
+                coordinates = result.boxes.xyxyn.tolist()
+                detected_classes = [model.names[class_id] for class_id in class_ids]
                 
-                records.append({
-                    'message_id': int(message_id),
+                yield {
+                    # Filename is message_id.jpg
+                    'message_id': int(os.path.basename(img_path).split('.')[0]),
                     'channel_name': channel_name,
                     'image_path': img_path,
-                    'detected_objects': detected_classes, # Store as list/array
-                    'avg_confidence': sum(confidences)/len(confidences) if confidences else 0,
-                    'image_category': category
-                })
-                
-            except Exception as e:
-                print(f"Error processing {img_path}: {e}")
-
-    # Save to DB
-    if records:
-        df = pd.DataFrame(records)
-        
-        # Convert list to string for simple SQL storage (or use ARRAY if you prefer)
-        df['detected_objects'] = df['detected_objects'].apply(lambda x: ','.join(x))
-        
-        print(f"Detected objects in {len(df)} images. Loading to Database...")
-        
-        engine = create_engine(DB_URL)
+                    # Comma-separated string kept for existing consumers
+                    'detected_objects': ','.join(detected_classes),
+                    'detected_classes': sorted(set(detected_classes)),
+                    'avg_confidence': sum(confidences) / len(confidences) if confidences else 0,
+                    'image_category': get_image_category(detected_classes),
+                    'boxes': [
+                        {'box_index': i, 'class_name': name, 'confidence': conf,
+                         'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2}
+                        for i, (name, conf, (x1, y1, x2, y2))
+                        in enumerate(zip(detected_classes, confidences, coordinates))
+                    ]
+                }
+
+# Per-process model for the inference pool
+_worker_model = None
+
+def _init_worker(model_path, torch_threads, imgsz=None):
+    global _worker_model, IMGSZ
+    torch.set_num_threads(torch_threads)
+    IMGSZ = imgsz or IMGSZ
+    _worker_model = YOLO(model_path, task='detect')
+
+def _detect_shard(images):
+    return list(detect_images(_worker_model, images))
+
+def iter_detections(images, workers=WORKERS, batch_size=BATCH_SIZE):
+    """
+    Yields detection records for the given images.
+
+    With workers > 1 the images are split into shards that a process pool
+    infers in parallel, each process holding its own model and an equal
+    share of the CPU threads. With WORKER_ADDRESS set, the shards are sent to
+    the resident worker, which already has the model loaded.
+    """
+    if WORKER_ADDRESS:
+        print(f"Submitting images to the detection worker at {WORKER_ADDRESS}...")
+        yield from _import_detect_worker().iter_remote_detections(images, batch_size * 4, WORKER_ADDRESS)
+        return
+
+    weights = inference_weights()
+    if workers <= 1:
+        print(f"Loading YOLO model ({BACKEND}{' int8' if INT8 else ''}, imgsz {IMGSZ})...")
+        model = YOLO(weights, task='detect')
+        yield from detect_images(model, images, batch_size)
+        return
+
+    shard_size = batch_size * 4
+    shards = [images[i:i + shard_size] for i in range(0, len(images), shard_size)]
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    print(f"Loading YOLO model ({BACKEND}{' int8' if INT8 else ''}, imgsz {IMGSZ}) in {workers} worker processes...")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(weights, torch_threads, IMGSZ)
+    ) as executor:
+        for records in executor.map(_detect_shard, shards):
+            yield from records
+
+def images_posted_between(conn, images, start, end):
+    """Keeps the (channel_name, image_path) pairs whose message was posted between start and end (UTC dates)."""
+    posted = {
+        (row.channel_name.lstrip('@'), row.message_id) for row in conn.execute(
+            text("""
+                SELECT channel_name, message_id FROM raw.telegram_messages
+                WHERE has_media AND (message_date AT TIME ZONE 'UTC')::date BETWEEN :start AND :end
+            """),
+            {"start": start, "end": end}
+        )
+    }
+    return [
+        (channel_name, img_path) for channel_name, img_path in images
+        # Filename is message_id.jpg
+        if (channel_name, int(os.path.basename(img_path).split('.')[0])) in posted
+    ]
+
+def repo_relative_path(image_path):
+    """
+    An image path relative to the repository root (data/raw/images/...), the
+    form raw.yolo_detections stores whether the path came from run_detection
+    or from the scraper's absolute download paths.
+    """
+    return os.path.relpath(os.path.abspath(image_path), BASE_DIR)
+
+def merge_image_refs(conn, model_id, image_refs):
+    """
+    Points each (message_id, channel_name, image_path, image_hash) at its cached
+    result in raw.yolo_detections. Returns the number of rows inserted or changed.
+
+    Paths are stored repo-relative, so batch and streaming runs over the same
+    image do not rewrite its row.
+    """
+    conn.execute(text("""
+        CREATE TEMP TABLE IF NOT EXISTS _image_refs (
+            message_id bigint, channel_name text, image_path text, image_hash text
+        ) ON COMMIT DROP
+    """))
+    copy_records(conn, '_image_refs', IMAGE_REF_COLUMNS, (
+        {**ref, 'image_path': repo_relative_path(ref['image_path'])} for ref in image_refs
+    ))
+    return conn.execute(text(MERGE_DETECTIONS_SQL), {"model_id": model_id}).rowcount
+
+@instrumentation.instrumented()
+def run_detection(start=None, end=None):
+    """
+    Detects objects in every downloaded image, or with start/end (dates) only
+    in images of messages posted in that range (messages must be loaded first).
+
+    Returns a dict with images, distinct, inferred, upserted, seconds and model_id.
+    """
+    empty = {"images": 0, "distinct": 0, "inferred": 0, "upserted": 0, "seconds": 0.0, "model_id": None}
+    # Walk through channel folders
+    if not os.path.exists(IMAGES_DIR):
+        print(f"Image directory {IMAGES_DIR} not found.")
+        return empty
+
+    images = list_images()
+    engine = create_engine(DB_URL)
+    if images and (start or end):
         with engine.connect() as conn:
-            conn.execute(text("CREATE SCHEMA IF NOT EXISTS raw;"))
-            print("Dropping old table and dependent views...")
-            conn.execute(text("DROP TABLE IF EXISTS raw.yolo_detections CASCADE;"))
-            conn.commit()
-            
-        df.to_sql('yolo_detections', engine, schema='raw', if_exists='replace', index=False)
-        print("Success! Data loaded to raw.yolo_detections")
-    else:
+            images = images_posted_between(conn, images, start or date.min, end or date.max)
+    if not images:
         print("No images processed.")
+        return empty
+
+    model_id = current_model_id()
+    with instrumentation.stage("hash"), ThreadPoolExecutor(max_workers=PREFETCH_THREADS) as pool:
+        hashes = dict(zip((path for _, path in images), pool.map(file_sha256, (path for _, path in images))))
+        instrumentation.count("images", len(images))
+
+    with engine.begin() as conn:
+        ensure_tables(conn)
+        cached = {
+            row.image_hash for row in conn.execute(
+                text(
+                    "SELECT image_hash FROM raw.detection_cache "
+                    "WHERE model_id = :model_id AND detected_classes IS NOT NULL"
+                ),
+                {"model_id": model_id}
+            )
+        }
+
+    # Infer each uncached image content once, however many messages share it
+    to_infer, seen = [], set(cached)
+    for channel_name, img_path in images:
+        if hashes[img_path] not in seen:
+            seen.add(hashes[img_path])
+            to_infer.append((channel_name, img_path))
+
+    # Reposts stored through the image store are hard links to one blob, so they share a hash too
+    distinct = len(set(hashes.values()))
+    print(f"{len(images)} images, {distinct} distinct (dedup ratio {len(images) / distinct:.2f}x).")
+    print(f"{len(images) - len(to_infer)} served from cache for {model_id}.")
+    print(f"Starting detection scan of {len(to_infer)} images (batch size {BATCH_SIZE}, {WORKERS} workers)...")
+    started = time.perf_counter()
+
+    # Boxes are collected while the cache rows stream, then written once their parents exist
+    box_records = []
+
+    def iter_cache_records():
+        for record in iter_detections(to_infer):
+            image_hash = hashes[record['image_path']]
+            for box in record['boxes']:
+                box_records.append({**box, 'image_hash': image_hash, 'model_id': model_id})
+            yield {**record, 'image_hash': image_hash, 'model_id': model_id}
+
+    def iter_image_refs():
+        for channel_name, img_path in images:
+            yield {
+                # Filename is message_id.jpg
+                'message_id': int(os.path.basename(img_path).split('.')[0]),
+                'channel_name': channel_name,
+                'image_path': img_path,
+                'image_hash': hashes[img_path]
+            }
+
+    # New results stream from inference into the cache; raw.yolo_detections is
+    # then upserted from the cache, so dependent views are never dropped
+    with engine.begin() as conn:
+        with instrumentation.stage("infer"):
+            stats = upsert_records(
+                conn, 'raw.detection_cache', CACHE_COLUMNS, ['image_hash', 'model_id'], iter_cache_records()
+            )
+            instrumentation.count("images", stats.rows)
+        elapsed = time.perf_counter() - started
+        with instrumentation.stage("merge"):
+            upsert_records(
+                conn, 'raw.detection_boxes', BOX_COLUMNS, ['image_hash', 'model_id', 'box_index'], box_records
+            )
+            changed = merge_image_refs(conn, model_id, iter_image_refs())
+            instrumentation.count("rows", changed)
+
+    if stats.rows:
+        print(f"Inferred {stats.rows} new images. {stats}")
+        print(f"Detection throughput: {stats.rows / elapsed:.1f} images/s over {elapsed:.1f}s")
+        duplicates = len(images) - distinct
+        print(f"Inference saved by deduplication: {duplicates} duplicate images, "
+              f"~{duplicates * elapsed / stats.rows:.1f}s at this run's rate")
+    print(f"Success! Upserted {changed} rows into raw.yolo_detections.")
+    instrumentation.count("images", len(images))
+    instrumentation.count("inferred", stats.rows)
+    return {
+        "images": len(images),
+        "distinct": distinct,
+        "inferred": stats.rows,
+        "upserted": changed,
+        "seconds": elapsed,
+        "model_id": model_id,
+    }
 
 if __name__ == "__main__":
-    run_detection()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run YOLO detection over downloaded images.")
+    parser.add_argument(
+        "--invalidate",
+        nargs="?",
+        const="current",
+        metavar="MODEL_ID",
+        help="Drop cached detections for MODEL_ID (default: the current model) and exit."
+    )
+    parser.add_argument("--start", type=date.fromisoformat, help="Only images of messages posted from this date.")
+    parser.add_argument("--end", type=date.fromisoformat, help="Only images of messages posted up to this date.")
+    parser.add_argument("--backend", choices=inference_backends.BACKENDS, default=BACKEND,
+                        help="Inference backend (default: YOLO_BACKEND or pytorch).")
+    parser.add_argument("--int8", action="store_true", default=INT8, help="Use int8 weights (onnx/openvino).")
+    parser.add_argument("--imgsz", type=int, default=IMGSZ, help="Inference image size (default: YOLO_IMGSZ or 640).")
+    args = parser.parse_args()
+    try:
+        inference_backends.validate(args.backend, args.int8)
+    except ValueError as e:
+        parser.error(str(e))
+    BACKEND, INT8, IMGSZ = args.backend, args.int8, args.imgsz
+    # The run report summary is logged
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.invalidate:
+        invalidate_cache(get_model_id() if args.invalidate == "current" else args.invalidate)
+    else:
+        with instrumentation.run_report("run_detection"):
+            run_detection(start=args.start, end=args.end)
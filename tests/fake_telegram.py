@@ -0,0 +1,66 @@
+"""
+An in-memory stand-in for TelegramClient, shared by the scraper tests and
+scripts/benchmark_scraper.py and scripts/benchmark_streaming.py.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from telethon.errors import FloodWaitError
+
+from src import scraper
+
+
+class FakeTelegramClient:
+    """Implements the subset of TelegramClient used by MedicalDataScraper."""
+
+    def __init__(self, messages_per_channel: int, latency: float, photo_ratio: float = 0.5,
+                 flood_wait_every: int = 0):
+        self.messages_per_channel = messages_per_channel
+        self.latency = latency
+        self.photo_every = max(1, round(1 / photo_ratio)) if photo_ratio else 0
+        self.flood_wait_every = flood_wait_every
+        self.calls = 0
+
+    def _maybe_flood(self) -> None:
+        self.calls += 1
+        if self.flood_wait_every and self.calls % self.flood_wait_every == 0:
+            raise FloodWaitError(request=None, capture=1)
+
+    async def get_entity(self, username: str):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(title=username.strip('@').title())
+
+    async def iter_messages(self, entity, limit=None, offset_id=0, min_id=0, reverse=False, **kwargs):
+        # Same paging semantics as Telethon: offset_id is exclusive, and reverse
+        # walks oldest-to-newest with offset_id as a lower bound
+        if reverse:
+            ids = range(max(offset_id, min_id) + 1, self.messages_per_channel + 1)
+        else:
+            start = offset_id - 1 if offset_id else self.messages_per_channel
+            ids = range(start, min_id, -1)
+        now = datetime.now(timezone.utc)
+        count = 0
+        for message_id in ids:
+            if limit is not None and count >= limit:
+                return
+            if count % scraper.HISTORY_PAGE_SIZE == 0:
+                await asyncio.sleep(self.latency)
+                self._maybe_flood()
+            has_photo = bool(self.photo_every) and message_id % self.photo_every == 0
+            yield SimpleNamespace(
+                id=message_id,
+                date=now - timedelta(hours=message_id),
+                text=f"Paracetamol 500mg offer #{message_id}",
+                media=object() if has_photo else None,
+                photo=object() if has_photo else None,
+                views=message_id * 3,
+                forwards=message_id % 7,
+            )
+            count += 1
+
+    async def download_media(self, message, file: str):
+        await asyncio.sleep(self.latency)
+        with open(file, 'wb') as f:
+            f.write(b'\xff\xd8\xff\xd9')
+        return file
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from scripts import benchmark_dedup, benchmark_lake, benchmark_scraper, benchmark_suite
+from src import scraper
+
+# The Postgres-free benchmarks at tiny sizes: each report must keep the shape
+# its main() prints and --output writes, and clear the thresholds below
+
+
+def assert_schema(report, schema) -> None:
+    """Every key of `schema` is in `report` with a value of the given type (or matching the nested schema)."""
+    for key, expected in schema.items():
+        assert key in report, f"missing {key!r}"
+        if isinstance(expected, dict):
+            assert_schema(report[key], expected)
+        else:
+            assert isinstance(report[key], expected), f"{key!r} is {type(report[key]).__name__}"
+    json.dumps(report)
+
+
+NUMBER = (int, float)
+
+
+def test_scraper_benchmark():
+    data_dir = scraper.DATA_DIR
+    report = benchmark_scraper.run_benchmark(2, 40, 0, settings=[(1, 1), (2, 4)])
+    # Each run scraped into a temporary directory, not the repo's lake
+    assert scraper.DATA_DIR == data_dir
+
+    assert_schema(report, {"channels": int, "messages_per_channel": int, "latency": NUMBER, "runs": list})
+    assert [(run["concurrency"], run["workers"]) for run in report["runs"]] == [(1, 1), (2, 4)]
+    for run in report["runs"]:
+        assert_schema(run, {"seconds": float, "messages": int, "images": int,
+                            "messages_per_s": float, "images_per_s": float})
+        # Every message of every channel, and a photo on every second one
+        assert run["messages"] == 2 * 40
+        assert run["images"] == 2 * 20
+        assert run["messages_per_s"] > 0
+
+
+def test_dedup_benchmark():
+    report = benchmark_dedup.run_benchmark(distinct=20, repost_ratio=0.6)
+
+    assert_schema(report, {
+        "images": int, "bytes_before": int, "ingest_s": float, "images_per_s": float,
+        "store": {"images": int, "blobs": int, "exact_duplicates": int, "near_duplicates": int,
+                  "dedup_ratio": NUMBER, "bytes_saved": int},
+        "false_merges": int, "missed": {kind: int for kind in benchmark_dedup.REPOST_KINDS},
+        "inference_avoided": int, "lookup_index_us": float, "lookup_linear_us": float,
+    })
+    assert report["store"]["images"] == report["images"]
+    assert report["store"]["blobs"] == 20
+    assert report["false_merges"] == 0
+    # Byte-identical reposts are always matched
+    assert report["missed"]["copy"] == 0
+    assert report["inference_avoided"] == report["images"] - 20
+
+
+def test_lake_benchmark():
+    # 50 messages in each of the 14 x 3 day and channel partitions
+    report = benchmark_lake.run_benchmark(rows=2100, days=14, channels=3)
+
+    assert_schema(report, {"rows": int, "migrate_s": float, "json_bytes": int, "parquet_bytes": int,
+                           "scans": list})
+    assert 0 < report["parquet_bytes"] < report["json_bytes"]
+    scans = {scan["scan"]: scan for scan in report["scans"]}
+    for scan in scans.values():
+        assert_schema(scan, {"rows": int, "seconds": float, "rows_per_s": float})
+    # Every full scan reads every row, and pruning returns what the JSON filter does
+    assert {scan["rows"] for label, scan in scans.items() if "full scan" in label} == {2100}
+    filtered = scans["JSON, 1 channel x 7 days"]["rows"]
+    assert filtered == 7 * 50
+    assert scans["Parquet, 1 channel x 7 days (pruned)"]["rows"] == filtered
+
+
+@pytest.mark.parametrize("metric, before, after, regressed", [
+    ("load_rows_per_s", 1000, 800, False),
+    ("load_rows_per_s", 1000, 700, True),
+    ("dbt_incremental_s", 10, 12, False),
+    ("dbt_incremental_s", 10, 13, True),
+    ("api./api/reports/top-products.p99_ms", 20, 30, True),
+    ("api./api/reports/top-products.errors", 0, 3, True),
+    ("api./api/reports/top-products.errors", 2, 9, False),
+    ("load_rows", 100, 10, False),
+])
+def test_suite_regression_thresholds(metric, before, after, regressed):
+    def results(value):
+        *groups, name = metric.split(".")
+        leaf = {name: value}
+        for group in reversed(groups):
+            leaf = {group: leaf}
+        return {"sizes": {"10000": leaf}}
+
+    found = benchmark_suite.find_regressions(results(after), results(before), tolerance=0.25)
+    assert bool(found) == regressed
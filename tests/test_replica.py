@@ -0,0 +1,76 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import pytest
+from sqlalchemy import text
+
+from api import replica as replica_module
+
+
+def open_files():
+    fd_dir = "/proc/self/fd"
+    paths = set()
+    for fd in os.listdir(fd_dir):
+        try:
+            paths.add(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            pass
+    return paths
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    """Writes snapshot-N.duckdb files and points CURRENT at them, as src/read_replica.py does."""
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs /proc/self/fd")
+    # The module only imports duckdb when API_READ_REPLICA=duckdb
+    monkeypatch.setattr(replica_module, "duckdb", duckdb, raising=False)
+
+    def swap(n: int) -> str:
+        path = str(tmp_path / f"snapshot-{n}.duckdb")
+        conn = duckdb.connect(path)
+        conn.execute(f"CREATE TABLE marts AS SELECT {n} AS snapshot")
+        conn.close()
+        pointer = tmp_path / replica_module.POINTER_FILE
+        pointer.write_text(os.path.basename(path), encoding="utf-8")
+        # A distinct mtime per swap, however fast they follow each other
+        os.utime(pointer, ns=(n * 10**9, n * 10**9))
+        return path
+
+    return swap
+
+
+def test_replaced_snapshots_are_closed(snapshots, tmp_path):
+    replica = replica_module.Replica(str(tmp_path))
+    query = text("SELECT snapshot FROM marts")
+    threads = 4
+    barrier = threading.Barrier(threads)
+
+    def query_on_every_thread():
+        # The barrier makes each thread take a task, so each one opens its own cursor
+        def run():
+            barrier.wait()
+            return replica.execute(query)[0].snapshot
+        return {future.result() for future in [pool.submit(run) for _ in range(threads)]}
+
+    # Like the API's threadpool, the threads outlive the snapshots they queried
+    with ThreadPoolExecutor(threads) as pool:
+        first = snapshots(1)
+        assert query_on_every_thread() == {1}
+        assert first in open_files()
+
+        # Only one thread queries the new snapshot; the others still hold cursors on the old one
+        second = snapshots(2)
+        assert replica.execute(query)[0].snapshot == 2
+        assert first not in open_files()
+
+        # A query still running on a replaced snapshot keeps it open until it finishes
+        with replica.cursor() as cursor:
+            third = snapshots(3)
+            assert replica.execute(query)[0].snapshot == 3
+            assert second in open_files()
+            assert cursor.execute("SELECT snapshot FROM marts").fetchall() == [(2,)]
+        assert second not in open_files()
+        assert third in open_files()
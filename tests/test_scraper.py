@@ -0,0 +1,238 @@
+import os
+import json
+import asyncio
+import glob
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src import loader, scraper
+from src.checkpoints import CheckpointStore
+from tests.fake_telegram import FakeTelegramClient
+
+
+class RecordingBucket(scraper.TokenBucket):
+    """A token bucket that never throttles and records FloodWait pauses instead of sleeping."""
+    def __init__(self):
+        super().__init__(1_000_000, capacity=1_000_000)
+        self.pauses = []
+
+    def pause(self, seconds: float) -> None:
+        self.pauses.append(seconds)
+
+
+class TrackingClient(FakeTelegramClient):
+    """Records iter_messages arguments and the peak number of concurrent downloads."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.history_calls = []
+        self.downloading = 0
+        self.peak_downloads = 0
+
+    async def iter_messages(self, entity, limit=None, offset_id=0, min_id=0, reverse=False, **kwargs):
+        self.history_calls.append({"limit": limit, "offset_id": offset_id, "min_id": min_id, "reverse": reverse})
+        async for message in super().iter_messages(entity, limit, offset_id, min_id, reverse, **kwargs):
+            yield message
+
+    async def download_media(self, message, file: str):
+        self.downloading += 1
+        self.peak_downloads = max(self.peak_downloads, self.downloading)
+        try:
+            return await super().download_media(message, file)
+        finally:
+            self.downloading -= 1
+
+
+class GrowingClient(FakeTelegramClient):
+    """Reports `boost` more views on every message, as if they had been read since the last scrape."""
+    boost = 0
+
+    async def iter_messages(self, *args, **kwargs):
+        async for message in super().iter_messages(*args, **kwargs):
+            message.views += self.boost
+            yield message
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(scraper, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(scraper.parquet_lake, "LAKE_FORMAT", "json")
+    return tmp_path
+
+
+def make_scraper(client, data_dir, **kwargs) -> scraper.MedicalDataScraper:
+    kwargs.setdefault("rate_limiter", RecordingBucket())
+    return scraper.MedicalDataScraper(
+        client, checkpoints=CheckpointStore(str(data_dir / "checkpoints.json")), **kwargs
+    )
+
+
+def saved_ids(data_dir, channel: str):
+    ids = []
+    for path in glob.glob(str(data_dir / "telegram_messages" / "*" / f"{channel.strip('@')}.json")):
+        with open(path, encoding="utf-8") as f:
+            ids.extend(item["message_id"] for item in json.load(f))
+    return sorted(ids)
+
+
+def test_flood_wait_pauses_and_resumes_paging(data_dir):
+    # Every second history page is rate limited
+    client = FakeTelegramClient(350, 0, flood_wait_every=2)
+    instance = make_scraper(client, data_dir, download_workers=2)
+
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=350, concurrency=1))
+
+    assert instance.rate_limiter.pauses and all(seconds == 1 for seconds in instance.rate_limiter.pauses)
+    # Paging resumed after the last message seen: nothing lost, nothing read twice
+    assert saved_ids(data_dir, "@pharma") == list(range(1, 351))
+    assert instance.stats["messages"] == 350
+
+
+def test_flood_wait_gives_up_after_max_retries(data_dir):
+    client = FakeTelegramClient(50, 0, flood_wait_every=1)
+    instance = make_scraper(client, data_dir, max_flood_retries=2)
+
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=50, concurrency=1))
+
+    assert len(instance.rate_limiter.pauses) == 2
+    assert saved_ids(data_dir, "@pharma") == []
+    assert instance.checkpoints.last_message_id("@pharma") is None
+
+
+def test_channel_and_download_concurrency_are_capped(data_dir):
+    client = TrackingClient(40, 0.002)
+    instance = make_scraper(client, data_dir, download_workers=3)
+    active, peak = 0, 0
+    scrape_channel = instance.scrape_channel
+
+    async def tracked_scrape_channel(channel_username, limit=100):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await scrape_channel(channel_username, limit=limit)
+        finally:
+            active -= 1
+
+    instance.scrape_channel = tracked_scrape_channel
+    channels = [f"@channel{i}" for i in range(6)]
+    asyncio.run(instance.scrape_channels(channels, limit=40, concurrency=2))
+
+    assert peak == 2
+    assert 1 < client.peak_downloads <= 3
+    assert instance.stats["messages"] == 6 * 40
+    assert instance.stats["images"] == 6 * 20
+    for channel in channels:
+        assert saved_ids(data_dir, channel) == list(range(1, 41))
+
+
+def test_resumes_above_checkpoint_without_gaps(data_dir):
+    client = TrackingClient(120, 0)
+    instance = make_scraper(client, data_dir)
+
+    # First scrape: the newest 50 messages
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=50, concurrency=1))
+    assert client.history_calls[-1]["min_id"] == 0 and not client.history_calls[-1]["reverse"]
+    assert saved_ids(data_dir, "@pharma") == list(range(71, 121))
+    assert instance.checkpoints.last_message_id("@pharma") == 120
+
+    # 60 new messages arrive; a capped run reads the oldest new ones first,
+    # then refreshes the saved ones newest first, without reading below them
+    client.messages_per_channel = 180
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=50, concurrency=1))
+    assert client.history_calls[-2]["min_id"] == 120 and client.history_calls[-2]["reverse"]
+    assert client.history_calls[-1] == {"limit": scraper.REFRESH_MESSAGES, "offset_id": 121, "min_id": 70,
+                                        "reverse": False}
+    assert instance.checkpoints.last_message_id("@pharma") == 170
+    assert instance.stats["refreshed"] == 50
+
+    # A fresh scraper reads the checkpoint file and picks up the rest
+    resumed = make_scraper(client, data_dir)
+    asyncio.run(resumed.scrape_channels(["@pharma"], limit=50, concurrency=1))
+    assert client.history_calls[-2]["min_id"] == 170
+    assert saved_ids(data_dir, "@pharma") == list(range(71, 181))
+
+    # Nothing new: no pages saved, checkpoint unchanged
+    asyncio.run(resumed.scrape_channels(["@pharma"], limit=50, concurrency=1))
+    assert resumed.stats["messages"] == 10
+    assert resumed.checkpoints.last_message_id("@pharma") == 180
+
+
+def test_failing_image_sink_does_not_stall_the_scrape(data_dir):
+    async def failing_sink(channel_name, image_path, posted_at):
+        raise RuntimeError("sink unavailable")
+
+    client = FakeTelegramClient(30, 0)
+    instance = make_scraper(client, data_dir, download_workers=2, image_sink=failing_sink)
+
+    async def run():
+        await asyncio.wait_for(instance.scrape_channels(["@pharma"], limit=30, concurrency=1), timeout=10)
+
+    asyncio.run(run())
+
+    assert saved_ids(data_dir, "@pharma") == list(range(1, 31))
+    # Images were downloaded before the sink failed, so messages keep their paths
+    with open(glob.glob(str(data_dir / "telegram_messages" / "*" / "pharma.json"))[0], encoding="utf-8") as f:
+        assert any(item["image_path"] for item in json.load(f))
+
+
+@pytest.fixture
+def scratch_warehouse(data_dir, monkeypatch):
+    """A throwaway Postgres database on the POSTGRES_* server, loaded from the test lake."""
+    if not os.getenv("POSTGRES_HOST"):
+        pytest.skip("POSTGRES_* settings are not configured")
+    database = f"test_scraper_{os.getpid()}"
+    server = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@" \
+             f"{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}"
+    admin = create_engine(f"{server}/postgres", isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+            conn.execute(text(f'CREATE DATABASE "{database}"'))
+    except OperationalError:
+        admin.dispose()
+        pytest.skip("Postgres is not reachable (POSTGRES_* settings)")
+
+    monkeypatch.setattr(loader, "DB_URL", f"{server}/{database}")
+    monkeypatch.setattr(loader, "RAW_DIR", str(data_dir / "telegram_messages"))
+    monkeypatch.setattr(loader.parquet_lake, "LAKE_FORMAT", "json")
+    engine = create_engine(loader.DB_URL)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.connect() as conn:
+            conn.execute(text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE datname = :database AND pid <> pg_backend_pid()"
+            ), {"database": database})
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+        admin.dispose()
+
+
+def test_rescrape_records_engagement_growth(scratch_warehouse, data_dir):
+    client = GrowingClient(30, 0)
+    instance = make_scraper(client, data_dir)
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=30, concurrency=1))
+    assert loader.load_raw_data()["engagement_changes"] == 30
+
+    # Nothing new is posted, but every message gained 10 views
+    client.boost = 10
+    asyncio.run(instance.scrape_channels(["@pharma"], limit=30, concurrency=1))
+    assert instance.stats["refreshed"] == 30
+    assert loader.load_raw_data()["engagement_changes"] == 30
+
+    with scratch_warehouse.connect() as conn:
+        deltas = conn.execute(text(
+            "SELECT views_delta FROM raw.engagement_deltas "
+            "WHERE channel_name = '@pharma' AND message_id = 12 ORDER BY captured_at"
+        )).scalars().all()
+        image_paths = conn.execute(text(
+            "SELECT count(*) FROM raw.telegram_messages WHERE image_path IS NOT NULL"
+        )).scalar()
+    # The first capture holds the full count, the refresh only the growth
+    assert deltas == [12 * 3, 10]
+    # Refreshed messages keep the photos downloaded by the first scrape
+    assert image_paths == 15